@@ -0,0 +1 @@
+"""Scaling benchmarks of the engine, run with python -m benchmarks.suite from the root of the repository."""
@@ -0,0 +1,71 @@
+"""
+Compares bars/sec of run() with itertuples() rows against run(row_cursor=True).
+
+Indicators are computed before timing, so only the bar loop is measured.
+
+Usage:
+    python -m benchmarks.bench_row_cursor --rows 5000000
+
+from the root of the repository.
+"""
+import argparse
+import time
+import pandas as pd
+from easy_backtest.backtest_engine import BacktestEngine
+from .synthetic import make_ohlcv
+
+
+class MovingAverageStrategy(BacktestEngine):
+    def preprocess_data(self):
+        # moving_avg is added by prepare(), outside of the timed run
+        return self.data_stream
+
+    def strategy(self, row):
+        long_position = self.position_book.get_position_by_tag("long1")
+        if row.close > row.moving_avg and long_position is None:
+            self.position_book.open_long_position(quantity=1, open_price=row.close, tag="long1", open_time=row.Index, tp=row.close * 1.01, sl=row.close * 0.99)
+
+
+class IdleStrategy(BacktestEngine):
+    def strategy(self, row):
+        pass
+
+
+def prepare(data: pd.DataFrame) -> pd.DataFrame:
+    """The bars with the indicators of the strategies above."""
+    data = data.copy()
+    data["moving_avg"] = data["close"].rolling(window=100).mean()
+    return data
+
+
+def bars_per_second(engine_cls, data: pd.DataFrame, row_cursor: bool) -> float:
+    engine = engine_cls(commission=0.001)
+    engine.data_stream = data
+    start = time.perf_counter()
+    engine.run(row_cursor=row_cursor)
+    return len(data) / (time.perf_counter() - start)
+
+
+def compare(rows: int) -> list:
+    """
+    Returns:
+        list: (strategy name, itertuples bars/sec, row cursor bars/sec) per strategy.
+    """
+    data = prepare(make_ohlcv(rows))
+    results = []
+    for engine_cls in (IdleStrategy, MovingAverageStrategy):
+        itertuples = bars_per_second(engine_cls, data, row_cursor=False)
+        cursor = bars_per_second(engine_cls, data, row_cursor=True)
+        results.append((engine_cls.__name__, itertuples, cursor))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    args = parser.parse_args()
+
+    results = compare(args.rows)
+    print(f"rows: {args.rows:,}")
+    for name, itertuples, cursor in results:
+        print(f"{name:<24} itertuples: {itertuples:>12,.0f} bars/sec   row cursor: {cursor:>12,.0f} bars/sec ({cursor / itertuples:.2f}x)")
@@ -0,0 +1,62 @@
+"""
+Compares two baselines saved by benchmarks/suite.py, case by case.
+
+Exits with status 1 when a case got slower than the threshold allows, so it can gate a CI job.
+Timings are only comparable between baselines taken on the same machine.
+
+Usage:
+    python -m benchmarks.compare benchmarks/baselines/<base>.json benchmarks/baselines/<head>.json --threshold 0.1
+"""
+import argparse
+import json
+import sys
+
+
+def load(path: str) -> dict:
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def compare(base: dict, head: dict, threshold: float) -> tuple:
+    """
+    Returns:
+        tuple: (rows, regressions) where rows are (id, base seconds, head seconds, ratio, verdict)
+            for the cases in both baselines, and regressions counts those slower than 1 + threshold.
+    """
+    base_results = {result["id"]: result for result in base["results"]}
+    rows, regressions = [], 0
+    for result in head["results"]:
+        previous = base_results.get(result["id"])
+        if previous is None:
+            continue
+        ratio = result["seconds"] / previous["seconds"] if previous["seconds"] > 0 else float("inf")
+        if ratio > 1 + threshold:
+            verdict = "slower"
+            regressions += 1
+        elif ratio < 1 / (1 + threshold):
+            verdict = "faster"
+        else:
+            verdict = ""
+        rows.append((result["id"], previous["seconds"], result["seconds"], ratio, verdict))
+    return rows, regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown tolerated, 0.1 for 10%%")
+    args = parser.parse_args()
+
+    base, head = load(args.base), load(args.head)
+    for key in ("machine", "cpu_count", "python", "numpy", "pandas"):
+        if base["meta"].get(key) != head["meta"].get(key):
+            print(f"warning: {key} differs, {base['meta'].get(key)} vs {head['meta'].get(key)}", file=sys.stderr)
+
+    rows, regressions = compare(base, head, args.threshold)
+    print(f"{'case':<72} {'base':>10} {'head':>10} {'ratio':>7}")
+    for case, base_seconds, head_seconds, ratio, verdict in rows:
+        print(f"{case:<72} {base_seconds:>9.4f}s {head_seconds:>9.4f}s {ratio:>6.2f}x {verdict}")
+    print(f"{len(rows)} cases compared, {regressions} slower than {1 + args.threshold:.2f}x "
+          f"({base['meta'].get('commit', '?')[:10]} -> {head['meta'].get('commit', '?')[:10]})")
+    sys.exit(1 if regressions else 0)
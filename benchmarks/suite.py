@@ -0,0 +1,248 @@
+"""
+Scaling benchmarks of the engine over deterministic synthetic data, saved as a JSON baseline.
+
+Times run() for reference strategies (including the moving average strategy of samplebacktest.py)
+from 10^4 to 10^7 bars, one bar run_incremental() calls after 10^4 to 10^6 bars of history,
+PositionBook.incur_tp_sl() with 1 to 10k open positions, get_stats() with
+10^2 to 10^6 trades, pareto_front(), and optimize() by number of workers. Compare two baselines with
+benchmarks.compare.
+
+Usage:
+    python -m benchmarks.suite --scale quick
+    python -m benchmarks.suite --scale full --only run,get_stats --output base.json
+
+from the root of the repository, which makes easy_backtest and samplebacktest importable.
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from easy_backtest.backtest_engine import BacktestEngine
+from easy_backtest.position_book import PositionBook
+from samplebacktest import MyBacktest
+from .synthetic import make_ohlcv, make_results, make_trade_history
+
+SCALES = {
+    "quick": {"bars": [10**4, 10**5], "history": [10**4, 10**5], "positions": [1, 10, 100, 1000], "trades": [10**2, 10**3, 10**4],
+              "results": [10**3], "optimize_bars": 10**4},
+    "default": {"bars": [10**4, 10**5, 10**6], "history": [10**4, 10**5, 10**6], "positions": [1, 10, 100, 1000, 10**4], "trades": [10**2, 10**3, 10**4, 10**5],
+                "results": [10**3, 10**4], "optimize_bars": 10**5},
+    "full": {"bars": [10**4, 10**5, 10**6, 10**7], "history": [10**4, 10**5, 10**6], "positions": [1, 10, 100, 1000, 10**4], "trades": [10**2, 10**3, 10**4, 10**5, 10**6],
+             "results": [10**3, 10**4, 10**5], "optimize_bars": 10**5},
+}
+
+
+class IdleStrategy(BacktestEngine):
+    """The cost of the loop itself."""
+
+    def strategy(self, row):
+        pass
+
+
+class WindowStrategy(BacktestEngine):
+    """Flips a position every window bars, a cheap strategy to optimize over."""
+
+    def strategy(self, row):
+        if row.Index.minute % self.states["params"]["window"]:
+            return
+        if self.position_book.get_position_by_tag("w") is not None:
+            self.position_book.close_position(tag="w", close_price=row.close, close_time=row.Index)
+        else:
+            self.position_book.open_long_position(quantity=1.0, open_price=row.close, tag="w", open_time=row.Index,
+                                                  tp=row.close * 1.01, sl=row.close * 0.99)
+
+
+def measure(setup, fn, repeat: int) -> list:
+    """Seconds taken by fn(setup()) in each of repeat runs, setup is not timed. The engine's prints are silenced."""
+    times = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            subject = setup()
+            began = time.perf_counter()
+            fn(subject)
+            times.append(time.perf_counter() - began)
+    return times
+
+
+def record(name: str, params: dict, times: list, units: int = None, unit: str = None) -> dict:
+    """One benchmark result. With units, the throughput per second of the fastest run is added."""
+    best = min(times)
+    result = {
+        "id": f"{name}[{','.join(f'{key}={value}' for key, value in params.items())}]",
+        "name": name,
+        "params": params,
+        "seconds": best,
+        "median_seconds": statistics.median(times),
+        "repeat": len(times),
+    }
+    if units is not None:
+        result[f"{unit}_per_sec"] = units / best if best > 0 else float("inf")
+    return result
+
+
+def bench_run(scale: dict, repeat: int) -> list:
+    results = []
+    for bars in scale["bars"]:
+        data = make_ohlcv(bars)
+        for engine_cls, row_cursor in [(IdleStrategy, False), (IdleStrategy, True), (MyBacktest, False), (MyBacktest, True)]:
+            def setup():
+                engine = engine_cls(commission=0.001)
+                engine.add_data_stream(data.copy())
+                return engine
+            # 10^7 bar runs take minutes, once is enough
+            times = measure(setup, lambda engine: engine.run(row_cursor=row_cursor), repeat if bars < 10**7 else 1)
+            results.append(record("run", {"strategy": engine_cls.__name__, "row_cursor": row_cursor, "bars": bars}, times, bars, "bars"))
+    return results
+
+
+def bench_run_incremental(scale: dict, repeat: int, calls: int = 50) -> list:
+    results = []
+    for history in scale["history"]:
+        data = make_ohlcv(history + calls + 1)
+
+        def setup():
+            engine = MyBacktest(commission=0.001)
+            engine.add_data_stream(data.iloc[:history].copy())
+            engine.run(row_cursor=True)
+            # the first call copies the history into the engine's bar buffer, later calls append to it
+            engine.run_incremental(data.iloc[history:history + 1], warmup_bars=200)
+            return engine
+
+        def run(engine):
+            for i in range(history + 1, history + calls + 1):
+                engine.run_incremental(data.iloc[i:i + 1], warmup_bars=200)
+        # the cost of a call should not depend on the length of the history
+        times = measure(setup, run, repeat)
+        results.append(record("run_incremental", {"history": history, "calls": calls}, times, calls, "calls"))
+    return results
+
+
+def bench_incur_tp_sl(scale: dict, repeat: int, bars: int = 200) -> list:
+    data = make_ohlcv(bars)
+    high, low, close = (data[name].to_numpy() for name in ("high", "low", "close"))
+    results = []
+    for positions in scale["positions"]:
+        for variant in ("collection", "store", "scheduled"):
+            def setup():
+                book = PositionBook(commission=0.001, portfolio_size=100, columnar=variant == "store")
+                if variant == "scheduled":
+                    book.schedule_exits(high, low)
+                # levels far outside the range of the bars, every position is checked and none closes
+                for k in range(positions):
+                    book.open_long_position(quantity=1.0, open_price=100.0, tag=str(k), tp=1e6, sl=1e-6)
+                return book
+
+            def run(book):
+                for i in range(bars):
+                    book.incur_tp_sl(current_close=close[i], current_high=high[i], current_low=low[i], current_open=close[i],
+                                     current_time=i, bar=i)
+            times = measure(setup, run, repeat)
+            results.append(record("incur_tp_sl", {"positions": positions, "variant": variant, "bars": bars}, times, bars, "bars"))
+    return results
+
+
+def bench_get_stats(scale: dict, repeat: int) -> list:
+    results = []
+    for trades in scale["trades"]:
+        history = make_trade_history(trades)
+        # the statistics accumulated as trades are recorded, and a full recomputation from the trades
+        for variant, initial_portfolio in (("accumulated", 100.0), ("recomputed", 1000.0)):
+            times = measure(lambda: history, lambda history: history.get_stats(initial_portfolio=initial_portfolio, periods_per_year=8760), repeat)
+            results.append(record("get_stats", {"trades": trades, "variant": variant}, times, trades, "trades"))
+    return results
+
+
+def bench_pareto_front(scale: dict, repeat: int) -> list:
+    engine = IdleStrategy(commission=0.001)
+    results = []
+    for count in scale["results"]:
+        for metrics in (["sharpe_ratio", "total_profit"], ["sharpe_ratio", "total_profit", "max_drawdown_percent"]):
+            candidates = make_results(count, metrics)
+            times = measure(lambda: candidates, lambda candidates: engine.pareto_front(candidates, metrics), repeat)
+            results.append(record("pareto_front", {"results": count, "metrics": len(metrics)}, times, count, "results"))
+    return results
+
+
+def bench_optimize(scale: dict, repeat: int, workers: list) -> list:
+    data = make_ohlcv(scale["optimize_bars"])
+    choices = {"window": [2, 3, 5, 7, 11, 13, 17, 19]}
+    results = []
+    for max_workers in workers:
+        def setup():
+            engine = WindowStrategy(commission=0.001)
+            engine.add_data_stream(data)
+            return engine
+        # optimize() saves its results in the working directory
+        with tempfile.TemporaryDirectory() as directory, contextlib.chdir(directory), contextlib.redirect_stderr(io.StringIO()):
+            times = measure(setup, lambda engine: engine.optimize(choices, ["sharpe_ratio"], max_workers=max_workers), repeat)
+        combinations = len(choices["window"])
+        results.append(record("optimize", {"workers": max_workers, "bars": len(data), "combinations": combinations}, times, combinations, "combinations"))
+    return results
+
+
+def metadata(scale: str) -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "scale": scale,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+BENCHMARKS = {
+    "run": bench_run,
+    "run_incremental": bench_run_incremental,
+    "incur_tp_sl": bench_incur_tp_sl,
+    "get_stats": bench_get_stats,
+    "pareto_front": bench_pareto_front,
+    "optimize": bench_optimize,
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=list(SCALES), default="default")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help="comma separated benchmarks to run")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per case, the fastest is kept")
+    parser.add_argument("--workers", default=None, help="comma separated worker counts for optimize, 1 and the CPU count by default")
+    parser.add_argument("--output", default=None, help="defaults to benchmarks/baselines/<commit>.json")
+    args = parser.parse_args()
+
+    meta = metadata(args.scale)
+    workers = [int(w) for w in args.workers.split(",")] if args.workers else sorted({1, os.cpu_count() or 1})
+    results = []
+    for name in args.only.split(","):
+        if name not in BENCHMARKS:
+            sys.exit(f"Unknown benchmark '{name}', expected one of {list(BENCHMARKS)}")
+        print(f"{name}...", file=sys.stderr)
+        extra = (workers,) if name == "optimize" else ()
+        for result in BENCHMARKS[name](SCALES[args.scale], args.repeat, *extra):
+            print(f"  {result['id']:<72} {result['seconds']:>10.4f}s", file=sys.stderr)
+            results.append(result)
+
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", f"{(meta['commit'] or 'local')[:10]}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as baseline_file:
+        json.dump({"meta": meta, "results": results}, baseline_file, indent=2)
+    print(f"Saved {len(results)} results to {output}", file=sys.stderr)
@@ -0,0 +1,72 @@
+"""
+Deterministic synthetic inputs for the benchmarks: OHLCV bars, trade histories and optimizer results.
+The same arguments always give the same data, on any machine, so timings are comparable between commits.
+"""
+import numpy as np
+import pandas as pd
+from easy_backtest.trade_history import TradeHistory
+from easy_backtest.trade_stats import TradeStats
+
+# bars are generated in blocks, bounding the temporaries of 10^7 bar series
+_BLOCK = 1_000_000
+
+
+def make_ohlcv(bars: int, seed: int = 42, freq: str = "min", start: str = "2000-01-01") -> pd.DataFrame:
+    """
+    Geometric random walk bars with volatility regimes, so TP/SL and moving average strategies see
+    both quiet and trending stretches. Open is the previous close, high/low extend past the body.
+    """
+    rng = np.random.default_rng(seed)
+    returns = np.empty(bars)
+    spread = np.empty(bars)
+    volume = np.empty(bars)
+    for first in range(0, bars, _BLOCK):
+        n = min(_BLOCK, bars - first)
+        # volatility switches between regimes every few thousand bars
+        regime = np.repeat(rng.choice([0.0005, 0.001, 0.002], size=n // 5000 + 1), 5000)[:n]
+        returns[first:first + n] = rng.normal(0, 1, n) * regime
+        spread[first:first + n] = np.abs(rng.normal(0, 0.5, n)) * regime
+        volume[first:first + n] = rng.lognormal(3, 1, n)
+    close = 100 * np.exp(np.cumsum(returns))
+    open_ = np.concatenate([[100.0], close[:-1]])
+    return pd.DataFrame({
+        "open": open_,
+        "high": np.maximum(open_, close) * (1 + spread),
+        "low": np.minimum(open_, close) * (1 - spread),
+        "close": close,
+        "volume": volume,
+    }, index=pd.date_range(start, periods=bars, freq=freq))
+
+
+def make_trade_history(trades: int, seed: int = 42, initial_portfolio: float = 100.0) -> TradeHistory:
+    """A history of trades closed one after the other, built from columns rather than recorded one by one."""
+    rng = np.random.default_rng(seed)
+    quantity = rng.uniform(0.5, 2.0, trades)
+    open_price = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, trades)))
+    close_price = open_price * np.exp(rng.normal(0.0002, 0.01, trades))
+    long = rng.random(trades) < 0.5
+    profit = (close_price - open_price) * np.where(long, 1, -1) * quantity
+    portfolio = np.cumsum(np.concatenate([[initial_portfolio], profit]))[:-1]
+    pct = profit / portfolio
+    open_time = pd.date_range("2000-01-01", periods=trades, freq="h").asi8
+    close_time = open_time + rng.integers(1, 60, trades) * 60_000_000_000
+    state = {
+        "columns": {
+            "tag": np.zeros(trades, dtype=np.int32), "mode": (~long).astype(np.int32), "quantity": quantity,
+            "open_price": open_price, "close_price": close_price, "profit": profit, "pct": pct,
+            "open_time": open_time, "close_time": close_time, "symbol": np.full(trades, -1, dtype=np.int32),
+        },
+        "categories": {"tag": ["bench"], "mode": ["long", "short"], "symbol": []},
+        "time_kind": "datetime",
+        "tz": None,
+        "stats": TradeStats.from_trades(initial_portfolio, profit, pct, open_time, close_time),
+    }
+    return TradeHistory.from_arrays(state, copy_columns=False)
+
+
+def make_results(count: int, metrics: list, seed: int = 42) -> list:
+    """Optimizer results with correlated metrics, as pareto_front() receives them."""
+    rng = np.random.default_rng(seed)
+    base = rng.normal(size=count)
+    values = {metric: base + rng.normal(scale=1.0, size=count) for metric in metrics}
+    return [{"params": {"i": i}, **{metric: float(values[metric][i]) for metric in metrics}} for i in range(count)]
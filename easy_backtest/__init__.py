@@ -2,4 +2,18 @@ from .backtest_engine import BacktestEngine
 from .position_book import PositionBook
 from .position import Position
 from .position_collection import PositionCollection
-from .trade_history import TradeHistory
\ No newline at end of file
+from .trade_history import TradeHistory
+from .row_cursor import RowCursor
+from .position_store import PositionStore
+from .shared_data import SharedFrame
+from .scheduler import ChunkedScheduler
+from .indicator_cache import IndicatorCache
+from .param_grid import ParameterGrid
+from .results_log import ResultsLog
+from .result_cache import ResultCache
+from .portfolio_engine import PortfolioBacktestEngine
+from .data_source import DataSource, NumpyMemmapSource, ArrowSource, ParquetSource
+from .range_extrema import RangeExtrema
+from .lower_timeframe import LowerTimeframe
+from .profiler import PhaseProfiler
+from .bar_buffer import BarBuffer
\ No newline at end of file
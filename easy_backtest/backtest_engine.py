@@ -1,27 +1,138 @@
 from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from contextlib import contextmanager
+import copy
 import datetime
 import json
+import math
+import os
 import random
+import time
 from tqdm import tqdm
+from .bar_buffer import BarBuffer
+from .checkpoint import load_checkpoint, save_checkpoint
+from .data_source import DataSource
+from .downsample import METHODS as DOWNSAMPLING_METHODS, downsample as downsample_indices
+from .fingerprint import fingerprint
+from .lower_timeframe import LowerTimeframe
+from .indicator_cache import INDICATORS, IndicatorCache
+from .param_grid import ParameterGrid
+from .param_sweep import simulate_sweep
+from .range_extrema import RangeExtrema
+from .pareto import nondominated_ranks, objective_matrix
+from .result_cache import ResultCache
+from .results_log import ResultsLog, params_key
 from .position_book import PositionBook
-import itertools
+from .profiler import PhaseProfiler
+from .trade_history import TradeHistory
+from .trade_stats import TradeStats
+from .row_cursor import RowCursor
+from .scheduler import ChunkedScheduler
+from .shared_data import SharedFrame
 import numpy as np
 import pandas as pd
 from abc import ABC, abstractmethod
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 
+
+# state of an optimizer worker process, set up once by _init_worker
+_worker = {}
+
+
+def _init_worker(blueprint, data_spec: dict, other_specs: dict):
+    """Pool initializer, attaches the worker to the data streams published by BacktestEngine._worker_pool()."""
+    data, handles, others = None, [], {}
+    if data_spec is not None:
+        data, handle = SharedFrame.attach(data_spec)
+        handles.append(handle)
+    for name, spec in other_specs.items():
+        others[name], handle = SharedFrame.attach(spec)
+        handles.append(handle)
+    _worker.update(blueprint=blueprint, data=data, others=others, handles=handles)
+
+
+def _worker_engine():
+    """
+    A fresh copy of the worker's engine, so each task starts from the same state
+    as if the engine had been pickled for it.
+    """
+    blueprint = _worker["blueprint"]
+    engine = copy.copy(blueprint)
+    engine.states = copy.deepcopy(blueprint.states)
+    # shallow copies share the attached arrays, columns added by preprocess_data stay local to the task,
+    # with a data source run() reads the chunks itself
+    engine.data_stream = _worker["data"].copy(deep=False) if _worker["data"] is not None else None
+    engine.other_data_steams = {name: df.copy(deep=False) for name, df in _worker["others"].items()}
+    return engine
+
+
+def _evaluate_in_worker(param_values):
+    """Evaluates a parameter combination over the whole data stream."""
+    return _worker_engine().evaluate_combination(param_values)
+
+
+def _evaluate_prefix_in_worker(task):
+    """Evaluates a (parameter combination, stop) task over the first stop bars of the data stream."""
+    param_values, stop = task
+    return _worker_engine().evaluate_combination(param_values, stop=stop)
+
+
+def _evaluate_range_in_worker(task):
+    """Evaluates a (parameter combination, start, stop) task over bars [start, stop) of the data stream."""
+    param_values, start, stop = task
+    return _worker_engine().evaluate_combination(param_values, start=start, stop=stop)
+
+
+def _trade_range_in_worker(task):
+    """Like _evaluate_range_in_worker, also returning the trade history, so the result cache is bypassed."""
+    param_values, start, stop = task
+    engine = _worker_engine()
+    engine.result_cache = None
+    result = engine.evaluate_combination(param_values, start=start, stop=stop)
+    return result, engine.get_trade_history()
+
+
 class BacktestEngine(ABC):
-    def __init__(self, commission: float, portfolio_size: float=100):
+    # bump to stop reusing cached results when a change is not visible in the strategy's source,
+    # e.g. in a helper module it calls
+    strategy_version = None
+
+    def __init__(self, commission: float, portfolio_size: float=100, columnar_positions: bool = False,
+                 result_cache: ResultCache = None, scheduled_exits: bool = False):
         self.commission = commission
+        self._portfolio_size = portfolio_size
+        # keep open positions in numpy columns, worth it for strategies holding many positions at once
+        self._columnar_positions = columnar_positions
+        # find each position's TP/SL exit bar when it opens rather than checking it on every bar
+        self._scheduled_exits = scheduled_exits
+        # finer bars resolving bars where both TP and SL are hit, see add_lower_timeframe()
+        self.lower_timeframe = None
         # we store portfolio size in position book in order to calculate pnl based on portfolio size
-        self.position_book = PositionBook(commission=commission, portfolio_size=portfolio_size)
+        self.position_book = self._new_position_book()
         self.data_stream = None
+        # out-of-core alternative to data_stream, see add_data_source()
+        self.data_source = None
         self.other_data_steams = {}
         self.has_run = False
         # use this to store any state information
         self.states = {}
-        self._portfolio_size = portfolio_size
+        # optional on-disk cache of evaluate_combination() results
+        self.result_cache = result_cache
+        # index of the first bar not yet seen by the strategy, where run_incremental() continues
+        self._next_bar = 0
+        # nanoseconds spent per bar by run_incremental(), over the latest bars
+        self._latencies = deque(maxlen=100_000)
+        # history run_incremental() appends to, its frame() is the data stream between calls
+        self._bar_buffer = None
+        # per-phase timings, None unless enable_profiling() was called
+        self.profiler = None
+        # trade histories of the last sweep(), in the order of its results
+        self.sweep_histories = None
+
+    def _new_position_book(self):
+        return PositionBook(commission=self.commission, portfolio_size=self._portfolio_size, columnar=self._columnar_positions,
+                            lower_timeframe=self.lower_timeframe)
 
     def get_portfolio_size(self):
         return self.position_book.get_portfolio_size()
@@ -32,9 +143,58 @@ class BacktestEngine(ABC):
         assert not missing_columns, f"Data stream must contain the following columns: {missing_columns}"
         assert isinstance(data_stream, pd.DataFrame), "Data stream must be a Pandas DataFrame"
         self.data_stream = data_stream
+        # columns added later by preprocess_data are derived from these
+        self._data_columns = list(data_stream.columns)
         print("DATA STREAM ADDED")
         print(self.data_stream.head())
 
+    def add_data_source(self, data_source: DataSource, chunk_size: int = 1_000_000, warmup_bars: int = 0):
+        """
+        Adds a data stream read from disk chunk by chunk instead of held in memory.
+
+        run() then streams through the source, setting data_stream to each chunk and calling
+        preprocess_data() on it, so at most chunk_size + warmup_bars rows are loaded at once.
+
+        Args:
+            data_source (DataSource): e.g. NumpyMemmapSource, ArrowSource or ParquetSource.
+            chunk_size (int): Number of bars processed per chunk.
+            warmup_bars (int): Bars preceding each chunk passed to preprocess_data() but not to
+                strategy(), at least the longest indicator lookback for indicators to match a
+                run over the whole data stream.
+        """
+        required_columns = {"open", "high", "low", "close", "volume"}
+        missing_columns = required_columns - set(data_source.columns)
+        assert not missing_columns, f"Data source must contain the following columns: {missing_columns}"
+        assert chunk_size > 0, "chunk_size must be positive"
+        self.data_source = data_source
+        self._chunk_size = chunk_size
+        self._warmup_bars = warmup_bars
+        # a small head to infer the bar frequency from, replaced by each chunk while running
+        self.data_stream = data_source.read(0, min(len(data_source), 1000))
+        self._data_columns = list(data_source.columns)
+        print(f"DATA SOURCE ADDED: {data_source!r}")
+
+    def add_lower_timeframe(self, source, bar_duration=None):
+        """
+        Adds finer bars of the same instrument, read only for the bars where a position's take profit
+        and stop loss are both within the bar's range, to tell which was hit first instead of assuming
+        the stop loss. See LowerTimeframe.
+
+        Args:
+            source (NumpyMemmapSource or str): The finer bars, or the directory they were written to.
+            bar_duration (optional): Length of the backtested bars, e.g. "1h". Inferred from the data
+                stream's timestamps when omitted, which are taken as the bars' open times.
+        """
+        if bar_duration is None:
+            assert self.data_stream is not None and len(self.data_stream) > 1, "bar_duration is required before a data stream is added"
+            bar_duration = pd.Series(self.data_stream.index).diff().median()
+        self.lower_timeframe = LowerTimeframe(source, bar_duration)
+        self.position_book.lower_timeframe = self.lower_timeframe
+        print(f"LOWER TIMEFRAME ADDED: {self.lower_timeframe!r}")
+
+    def _n_bars(self) -> int:
+        return len(self.data_source) if self.data_source is not None else len(self.data_stream)
+
     def add_other_data_stream(self, data_stream: pd.DataFrame, name: str):
         self.other_data_steams[name] = data_stream
 
@@ -43,6 +203,40 @@ class BacktestEngine(ABC):
         # else you can directly pass in the dataframe via add_data_stream
         return self.data_stream
     
+    @property
+    def indicator_cache(self) -> IndicatorCache:
+        return IndicatorCache.shared()
+
+    def indicator(self, name, column, *args, **kwargs) -> pd.Series:
+        """
+        Computes an indicator over the data stream, memoized in the process wide IndicatorCache.
+        Results are keyed by the content of the source values, so within an optimizer worker an
+        indicator is computed once and reused by every parameter combination that asks for it.
+
+        Args:
+            name (str or callable): One of "sma", "ema", "std", "min", "max", or a function taking the
+                source values followed by args and returning an array of the same length. Prefer module
+                level functions, the function object is part of the cache key.
+            column (str or array-like): Column of the data stream, or values aligned with it.
+            *args, **kwargs: Arguments of the indicator, e.g. the window.
+
+        Returns:
+            pd.Series: Read-only indicator values, indexed like the data stream. A DataFrame when the
+                column holds several, e.g. one per symbol in a portfolio backtest.
+        """
+        assert self.data_stream is not None, "Data stream must be added before computing indicators"
+        if isinstance(name, str) and name not in INDICATORS:
+            raise ValueError(f"Unknown indicator '{name}', expected one of {list(INDICATORS)} or a function.")
+        func = INDICATORS[name] if isinstance(name, str) else name
+        source = self.data_stream[column] if isinstance(column, str) else column
+        values = np.asarray(source)
+        key = (fingerprint(values), name, args, tuple(sorted(kwargs.items())))
+        array = self.indicator_cache.get(key, lambda: func(values, *args, **kwargs))
+        if array.ndim == 2:
+            columns = source.columns if isinstance(source, pd.DataFrame) else None
+            return pd.DataFrame(array, index=self.data_stream.index, columns=columns, copy=False)
+        return pd.Series(array, index=self.data_stream.index, copy=False)
+
     @abstractmethod
     def strategy(self, row):
         pass
@@ -52,29 +246,389 @@ class BacktestEngine(ABC):
         Hook for logic to execute before processing each row.
         Default implementation handles TP/SL triggers.
         """
-        self.position_book.incur_tp_sl(current_close=row.close, current_high=row.high, current_low=row.low, current_open=row.open, current_time=row.Index)
+        self.position_book.incur_tp_sl(current_close=row.close, current_high=row.high, current_low=row.low, current_open=row.open, current_time=row.Index,
+                                       bar=index)
 
     def after_step(self, index, row):
         """Optional hook to execute logic after processing each row."""
         pass
 
-    def run(self):
+    def enable_profiling(self, sample_every: int = 64):
+        """
+        Records the time spent in each phase of the following runs, see PhaseProfiler.
+        evaluate_combination() then adds the report of each run to its result under "profile".
+
+        Args:
+            sample_every (int): Keep the duration of one call in this many for percentiles.
+        """
+        self.profiler = PhaseProfiler(sample_every=sample_every)
+
+    def disable_profiling(self):
+        self.profiler = None
+
+    def get_profile(self) -> dict:
+        """The report of the profiler, see PhaseProfiler.report()."""
+        assert self.profiler is not None, "Profiling must be enabled with enable_profiling()"
+        return self.profiler.report()
+
+    def _profiled(self, name: str, fn):
+        """fn, timed as the phase name when profiling."""
+        return fn if self.profiler is None else self.profiler.wrap(name, fn)
+
+    def _step_functions(self):
+        """before_step, strategy and after_step as the bar loop calls them, timed when profiling."""
+        return self._profiled("before_step", self.before_step), self._profiled("strategy", self.strategy), self._profiled("after_step", self.after_step)
+
+    @contextmanager
+    def _profiled_loop(self):
+        """Measures a bar loop as a whole when profiling."""
+        if self.profiler is None:
+            yield
+            return
+        self.profiler.begin(self.position_book)
+        try:
+            yield
+        finally:
+            self.profiler.end(self.position_book)
+
+    def run(self, row_cursor: bool = False, start: int = None, stop: int = None):
         """
         Executes the backtest by iterating through the data stream.
+
+        Args:
+            row_cursor (bool): If True, rows are served by a reusable RowCursor reading from
+                NumPy arrays extracted once, instead of a namedtuple per row from itertuples().
+                The cursor has the same attribute names but is the same object for every row.
+            start, stop (int, optional): Only run over bars [start, stop) of the preprocessed data,
+                indicators are still computed over the whole data stream.
         """
+        if self.data_source is not None:
+            return self._run_chunked(row_cursor, start, stop)
         assert self.data_stream is not None, "Data stream must be added before running the backtest"
-        df = self.preprocess_data()
-        print(f"DF: {df}")
+        df = self._profiled("preprocess_data", self.preprocess_data)()
+        self._next_bar = slice(start, stop).indices(len(df))[1]
+        if start is not None or stop is not None:
+            df = df.iloc[start:stop]
+        self.has_run = True
+        if self._scheduled_exits:
+            self.position_book.schedule_exits(df["high"], df["low"])
+        rows = RowCursor.for_frame(df) if row_cursor else df.itertuples()
+        before_step, strategy, after_step = self._step_functions()
+        with self._profiled_loop():
+            for i, row in enumerate(rows):
+                before_step(i, row)
+                strategy(row)
+                after_step(i, row)
+
+    def run_incremental(self, new_bars: pd.DataFrame, warmup_bars: int = 1000, row_cursor: bool = False) -> int:
+        """
+        Appends new bars to the data stream and runs the strategy over them only, continuing from
+        the position book and states left by the previous run() or run_incremental().
+
+        The history is kept in a BarBuffer, so appending copies the new bars only and a call costs
+        the same however long the history grows, as long as warmup_bars is bounded.
+
+        Args:
+            new_bars (pd.DataFrame): Bars with the columns of the data stream, after its last bar.
+            warmup_bars (int, optional): Bars of history preprocess_data() is called with before the
+                new ones. Set it to at least the longest indicator lookback, None for the whole history.
+            row_cursor (bool): Serve the new rows through a RowCursor, as in run().
+
+        Returns:
+            int: Number of bars processed. The time spent on each bar is recorded, see get_latency_stats().
+        """
+        assert self.data_source is None, "run_incremental() does not support data sources"
+        clock = time.perf_counter_ns
+        call_began = clock()
+        if self.data_stream is None:
+            self.add_data_stream(new_bars)
+            new_bars = new_bars.iloc[:0]
+        else:
+            missing_columns = set(self._data_columns) - set(new_bars.columns)
+            assert not missing_columns, f"New bars must contain the following columns: {missing_columns}"
+            if len(new_bars) and len(self.data_stream):
+                assert new_bars.index[0] > self.data_stream.index[-1], "New bars must come after the last bar of the data stream"
+        buffer = self._bar_buffer
+        if buffer is None or buffer.frame() is not self.data_stream:
+            # first call since add_data_stream() or run(), the history is copied once.
+            # Columns added by a previous preprocess_data() are dropped, they are recomputed over the tail below
+            buffer = self._bar_buffer = BarBuffer(self.data_stream[self._data_columns])
+        buffer.append(new_bars)
+        history = self.data_stream = buffer.frame()
+
+        first = self._next_bar
+        tail_start = 0 if warmup_bars is None else max(0, first - warmup_bars)
+        # preprocess a copy of the tail, so columns it adds don't leave the history partly filled
+        self.data_stream = history.iloc[tail_start:].copy()
+        try:
+            df = self._profiled("preprocess_data", self.preprocess_data)().iloc[first - tail_start:]
+        finally:
+            self.data_stream = history
+        self.has_run = True
+        if self._scheduled_exits:
+            self.position_book.schedule_exits(df["high"], df["low"], offset=first)
+
+        rows = RowCursor.for_frame(df) if row_cursor else df.itertuples()
+        before_step, strategy, after_step = self._step_functions()
+        with self._profiled_loop():
+            # the first bar also pays for appending and preprocessing, from the call to its decision
+            began = call_began
+            for i, row in enumerate(rows, start=first):
+                before_step(i, row)
+                strategy(row)
+                after_step(i, row)
+                ended = clock()
+                self._latencies.append(ended - began)
+                began = ended
+        self._next_bar = len(history)
+        return len(df)
+
+    def get_latency_stats(self) -> dict:
+        """
+        Time spent deciding on each bar by run_incremental(), over the latest 100,000 bars. The first bar
+        of each call includes appending the new bars and preprocess_data().
+
+        Returns:
+            dict: "bars" measured, and "mean_us", "p50_us", "p99_us", "max_us" in microseconds.
+        """
+        latencies = np.fromiter(self._latencies, dtype=np.float64, count=len(self._latencies)) / 1e3
+        if len(latencies) == 0:
+            return {"bars": 0, "mean_us": 0.0, "p50_us": 0.0, "p99_us": 0.0, "max_us": 0.0}
+        p50, p99 = np.percentile(latencies, [50, 99])
+        return {"bars": len(latencies), "mean_us": float(latencies.mean()), "p50_us": float(p50), "p99_us": float(p99), "max_us": float(latencies.max())}
+
+    def _run_chunked(self, row_cursor: bool, start: int, stop: int):
+        """run() over a data source, one chunk (plus its warm-up bars) in memory at a time."""
+        start, stop, _ = slice(start, stop).indices(len(self.data_source))
+        print(f"RUNNING OVER {max(0, stop - start)} BARS IN CHUNKS OF {self._chunk_size}")
+        self.has_run = True
+        before_step, strategy, after_step = self._step_functions()
+        preprocess_data = self._profiled("preprocess_data", self.preprocess_data)
+        i = 0
+        for chunk, warmup in self.data_source.iter_chunks(self._chunk_size, self._warmup_bars, start, stop):
+            self.data_stream = chunk
+            df = preprocess_data().iloc[warmup:]
+            if self._scheduled_exits:
+                self.position_book.schedule_exits(df["high"], df["low"], offset=i)
+            rows = RowCursor.for_frame(df) if row_cursor else df.itertuples()
+            with self._profiled_loop():
+                for row in rows:
+                    before_step(i, row)
+                    strategy(row)
+                    after_step(i, row)
+                    i += 1
+        self._next_bar = stop
+
+    def strategy_vectorized(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Optional hook used by run_vectorized() instead of the per-row strategy().
+
+        Args:
+            df (pd.DataFrame): The preprocessed data stream.
+
+        Returns:
+            pd.DataFrame: Signals aligned row for row with df, containing:
+                - "entry": 1 to open a long, -1 to open a short, 0 to do nothing
+                - "exit" (optional): True to close the open position at the bar's close
+                - "size" (optional): quantity to open, defaults to 1
+                - "tp" / "sl" (optional): take profit / stop loss prices, NaN for none
+        """
+        raise NotImplementedError("strategy_vectorized() must be implemented to use run_vectorized()")
+
+    def run_vectorized(self):
+        """
+        Executes the backtest from the signals returned by strategy_vectorized().
+
+        Only one position is held at a time. A position is opened at the close of its entry bar,
+        TP/SL are checked from the next bar onwards (stop loss first, as in incur_tp_sl) and an
+        exit signal closes the position at the bar's close. A new entry may happen on the bar
+        the previous position was closed on. Each exit is found in a RangeExtrema index of the highs
+        and lows, so the work scales with the number of trades rather than the number of bars.
+        Trades are recorded in the position book as in run().
+        """
+        assert self.data_stream is not None, "Data stream must be added before running the backtest"
+        df = self._profiled("preprocess_data", self.preprocess_data)()
+        signals = self._profiled("strategy_vectorized", self.strategy_vectorized)(df)
+        assert len(signals) == len(df), "Signals must have the same length as the data stream"
         self.has_run = True
-        for i, row in enumerate(df.itertuples()):
-            self.before_step(i, row)
-            self.strategy(row)
-            self.after_step(i, row)
+        # a following run_incremental() continues after the last bar
+        self._next_bar = len(df)
+
+        n = len(df)
+        index = df.index
+        high = df["high"].to_numpy(dtype=np.float64)
+        low = df["low"].to_numpy(dtype=np.float64)
+        close = df["close"].to_numpy(dtype=np.float64)
+        entry = np.sign(signals["entry"].to_numpy(dtype=np.float64))
+        exit_ = signals["exit"].to_numpy(dtype=bool) if "exit" in signals else np.zeros(n, dtype=bool)
+        size = signals["size"].to_numpy(dtype=np.float64) if "size" in signals else np.ones(n)
+        tp = signals["tp"].to_numpy(dtype=np.float64) if "tp" in signals else np.full(n, np.nan)
+        sl = signals["sl"].to_numpy(dtype=np.float64) if "sl" in signals else np.full(n, np.nan)
+
+        highs, lows = RangeExtrema(high), RangeExtrema(low)
+        entry_bars = np.flatnonzero(entry != 0)
+        exit_bars = np.flatnonzero(exit_)
+        tag = "vectorized"
+        bar = 0
+        while True:
+            k = np.searchsorted(entry_bars, bar)
+            if k == len(entry_bars):
+                break
+            i = int(entry_bars[k])
+            is_long = entry[i] > 0
+            pos_tp = None if np.isnan(tp[i]) else float(tp[i])
+            pos_sl = None if np.isnan(sl[i]) else float(sl[i])
+            self.position_book.open_position(
+                quantity=float(size[i]), open_price=float(close[i]), mode="long" if is_long else "short",
+                tag=tag, tp=pos_tp, sl=pos_sl, open_time=index[i]
+            )
 
+            # TP/SL can trigger up to and including the bar of the next exit signal
+            e = np.searchsorted(exit_bars, i + 1)
+            exit_bar = int(exit_bars[e]) if e < len(exit_bars) else None
+            stop = n if exit_bar is None else exit_bar + 1
+            if is_long:
+                sl_bar = lows.first_at_most(i + 1, pos_sl, stop)
+                tp_bar = highs.first_at_least(i + 1, pos_tp, min(sl_bar + 1, stop))
+            else:
+                sl_bar = highs.first_at_least(i + 1, pos_sl, stop)
+                tp_bar = lows.first_at_most(i + 1, pos_tp, min(sl_bar + 1, stop))
+
+            if sl_bar < stop and sl_bar == tp_bar and self.lower_timeframe is not None:
+                bar = sl_bar
+                close_price = pos_sl if self.lower_timeframe.stop_loss_first(index[bar], is_long, pos_tp, pos_sl) else pos_tp
+            elif sl_bar < stop and sl_bar <= tp_bar:
+                bar, close_price = sl_bar, pos_sl
+            elif tp_bar < stop:
+                bar, close_price = tp_bar, pos_tp
+            elif exit_bar is not None:
+                bar, close_price = exit_bar, float(close[exit_bar])
+            else:
+                # position is still open at the end of the data, as in run()
+                break
+            self.position_book.close_position(tag=tag, close_price=close_price, close_amt=1, close_time=index[bar])
+
+    def strategy_sweep(self, df: pd.DataFrame, params: dict) -> dict:
+        """
+        Optional hook used by sweep(), the signals of many parameter sets at once.
+
+        Args:
+            df (pd.DataFrame): The preprocessed data stream.
+            params (dict): Parameter name -> (1, sets) array of its value in each set, so that
+                e.g. close[:, None] * (1 + params["tp_pct"]) is a (bars, sets) array.
+
+        Returns:
+            dict: Signals as in strategy_vectorized(): "entry", and optionally "exit", "size", "tp", "sl",
+                plus "tp_pct" / "sl_pct" for TP/SL relative to the entry price. Each is a scalar, a 1-D
+                array with one value per bar, or a (bars, sets), (1, sets) or (bars, 1) array.
+        """
+        raise NotImplementedError("strategy_sweep() must be implemented to use sweep()")
+
+    def sweep(self, param_choices: dict, constraints=None, vectorized_constraints=False, batch_size: int = 1024) -> list:
+        """
+        Backtests every parameter combination in one pass over the bars, for strategies that fit
+        run_vectorized() (one position at a time, signals known in advance).
+
+        strategy_sweep() returns the signals of a batch of combinations at once, and the position of
+        each combination is kept in arrays along a parameter axis, so a bar is processed for all of
+        them with a few NumPy operations. Trades follow the same rules as run_vectorized().
+        preprocess_data() is called once, parameters only reach strategy_sweep().
+
+        Args:
+            param_choices (dict): Dictionary of parameter names and their possible values.
+            constraints (callable, optional): A function that checks if a parameter combination is valid.
+            vectorized_constraints (bool): If True, constraints receives a dict of parameter arrays and
+                returns a boolean mask, see ParameterGrid.iter_shards().
+            batch_size (int): Combinations simulated together, bounds the size of (bars, sets) signals.
+
+        Returns:
+            list: {"params": ..., **stats} per combination, as evaluate_combination() returns them.
+                Their trade histories are kept in sweep_histories, in the same order.
+        """
+        assert self.data_stream is not None, "Data stream must be added before running the backtest"
+        grid = ParameterGrid(param_choices)
+        self.param_names = grid.names
+
+        df = self.preprocess_data()
+        index = df.index
+        high = df["high"].to_numpy(dtype=np.float64)
+        low = df["low"].to_numpy(dtype=np.float64)
+        close = df["close"].to_numpy(dtype=np.float64)
+        periods_per_year = self._infer_periods_per_year()
+        print(f"Sweeping over {len(df)} bars the combinations of a grid of {len(grid)}, please wait...")
+
+        results, histories = [], []
+        for batch in grid.iter_batches(batch_size, constraints, vectorized=vectorized_constraints):
+            values = grid.decode(batch)
+            signals = self.strategy_sweep(df, {name: array[None, :] for name, array in values.items()})
+            trades = simulate_sweep(high, low, close, signals, len(batch), self.commission)
+
+            # group the trades by set, keeping the order they were closed in (a radix sort for 16 bit keys)
+            keys = trades["set"].astype(np.uint16) if len(batch) <= 1 << 16 else trades["set"]
+            order = np.argsort(keys, kind="stable")
+            trades = {name: column[order] for name, column in trades.items()}
+            bounds = np.searchsorted(trades["set"], np.arange(len(batch) + 1))
+            for k in range(len(batch)):
+                history = self._sweep_history({name: column[bounds[k]:bounds[k + 1]] for name, column in trades.items()}, index)
+                params = grid.as_dict(grid[int(batch[k])])
+                results.append({"params": params, **history.get_stats(initial_portfolio=self._portfolio_size, periods_per_year=periods_per_year)})
+                histories.append(history)
+        self.sweep_histories = histories
+        self._next_bar = len(df)
+        return results
+
+    def _sweep_history(self, trades: dict, index: pd.Index) -> TradeHistory:
+        """
+        Trade history of one parameter set of a sweep, built from its trade columns as run_vectorized()
+        would have recorded them, without going through the position book trade by trade.
+        """
+        profit = trades["profit"]
+        # the portfolio size before each trade, accumulated in order as the position book does
+        portfolio = np.cumsum(np.concatenate([[float(self._portfolio_size)], profit]))[:-1]
+        pct = profit / portfolio
+        if isinstance(index, pd.DatetimeIndex):
+            times, time_kind, tz = index.asi8, "datetime", index.tz
+        else:
+            times, time_kind, tz = np.asarray(index, dtype=np.int64), "int", None
+        open_time, close_time = times[trades["open_bar"]], times[trades["close_bar"]]
+        # modes are coded in the order they first occur, as the position book would have
+        side = trades["side"]
+        first_side = side[0] if len(side) else 1
+        mode = (side != first_side).astype(np.int32)
+        modes = (["long", "short"] if first_side > 0 else ["short", "long"])[:1 + int(mode.any())] if len(side) else []
+        state = {
+            "columns": {
+                "tag": np.zeros(len(profit), dtype=np.int32), "mode": mode, "quantity": trades["quantity"],
+                "open_price": trades["open_price"], "close_price": trades["close_price"], "profit": profit, "pct": pct,
+                "open_time": open_time, "close_time": close_time, "symbol": np.full(len(profit), -1, dtype=np.int32),
+            },
+            "categories": {"tag": ["vectorized"] if len(profit) else [], "mode": modes, "symbol": []},
+            "time_kind": time_kind if len(profit) else None,
+            "tz": tz,
+            "stats": TradeStats.from_trades(self._portfolio_size, profit, pct, open_time, close_time),
+        }
+        return TradeHistory.from_arrays(state, copy_columns=False)
 
     def get_trade_history(self):
         return self.position_book.trade_history
 
+    def save_checkpoint(self, path: str):
+        """
+        Saves the positions, trades, portfolio size, states and last processed bar to a compact binary
+        file, without the market data. See easy_backtest.checkpoint for the format.
+        """
+        save_checkpoint(self, path)
+
+    def load_checkpoint(self, path: str) -> dict:
+        """
+        Restores the state saved by save_checkpoint(). Add the same data stream first, then continue
+        with run_incremental() from the restored bar.
+
+        Returns:
+            dict: The checkpoint's header.
+        """
+        return load_checkpoint(self, path)
+
     def _infer_periods_per_year(self):
         """
         Infer the number of trading periods per year from the data stream
@@ -113,49 +667,205 @@ class BacktestEngine(ABC):
 
     def get_trading_stats(self):
         periods_per_year = self._infer_periods_per_year()
-        return self.position_book.trade_history.get_stats(
+        return self._profiled("get_stats", self.position_book.trade_history.get_stats)(
             initial_portfolio=self._portfolio_size,
             periods_per_year=periods_per_year
         )
     
-    def evaluate_combination(self, param_values):
+    def evaluate_combination(self, param_values, stop: int = None, start: int = None):
         """
-        Evaluates a single parameter combination by running the backtest.
+        Evaluates a single parameter combination by running the backtest,
+        over bars [start, stop) only if they are given.
+        With a result_cache, a combination already run on the same data and strategy code is not run again.
+        When profiling, the profile of the run is added to the result under "profile".
         """
         params = dict(zip(self.param_names, param_values))
         self.states["params"] = params
 
         # Reset and run the backtest
-        position_book = PositionBook(self.commission, self._portfolio_size)  # Reset the position book
-        self.position_book = position_book
+        self.position_book = self._new_position_book()  # Reset the position book
         self.has_run = False
-        self.run()
+        if self.result_cache is not None:
+            key = self.result_cache.key(self, params, stop, start)
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                stats, trade_history = cached
+                if trade_history is not None:
+                    self.position_book.trade_history = trade_history
+                    self.has_run = True
+                return {"params": params, **stats}
+
+        if self.profiler is not None:
+            self.profiler.reset()
+        self.run(start=start, stop=stop)
 
         # Get stats and evaluate the target metric
         stats = self.get_trading_stats()
+        if self.result_cache is not None:
+            self.result_cache.put(key, self, stats, self.get_trade_history())
+        if self.profiler is not None:
+            return {"params": params, **stats, "profile": self.profiler.report()}
         return {"params": params, **stats}
-    
-    def pareto_front(self, results, metrics):
+
+    @contextmanager
+    def _worker_pool(self, max_workers: int):
+        """
+        Process pool for the optimizers. The numeric columns of the data streams are published once
+        in shared memory and the engine is sent once to each worker, so tasks only carry the
+        parameter combination. Submit tasks with executor.submit(_evaluate_in_worker, combo).
+        """
+        blueprint = self._worker_blueprint()
+        # workers read a data source themselves
+        data = SharedFrame(self.data_stream) if self.data_source is None else None
+        others = {}
+        try:
+            for name, df in self.other_data_steams.items():
+                others[name] = SharedFrame(df)
+            other_specs = {name: shared.spec for name, shared in others.items()}
+            data_spec = data.spec if data is not None else None
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                     initargs=(blueprint, data_spec, other_specs)) as executor:
+                yield executor
+        finally:
+            for shared in [data, *others.values()]:
+                if shared is not None:
+                    shared.close()
+
+    def _worker_blueprint(self):
+        """
+        Copy of the engine sent to each worker, without its data streams and the state of past runs:
+        the bar history of run_incremental(), its latencies and the trade histories of a sweep.
+        """
+        blueprint = copy.copy(self)
+        blueprint.data_stream = None
+        blueprint.other_data_steams = {}
+        blueprint.position_book = blueprint._new_position_book()
+        blueprint._bar_buffer = None
+        blueprint._latencies = deque(maxlen=self._latencies.maxlen)
+        blueprint.sweep_histories = None
+        return blueprint
+
+    def _evaluate_all(self, param_combinations, total: int, max_workers: int = None, log: ResultsLog = None):
+        """
+        Evaluates every parameter combination in worker processes.
+
+        Args:
+            param_combinations (iterable): Parameter tuples, consumed lazily.
+            total (int): Number of combinations, None if they are generated on the fly.
+            log (ResultsLog, optional): Log to append results to as they complete, instead of keeping them.
+
+        Returns:
+            list: Results in the order of param_combinations, None with a log.
+        """
+        max_workers = max_workers or os.cpu_count() or 1
+        with self._worker_pool(max_workers) as executor:
+            return self._evaluate_in_pool(executor, max_workers, _evaluate_in_worker, param_combinations, total, log)
+
+    def _evaluate_in_pool(self, executor, max_workers: int, fn, tasks, total: int, log: ResultsLog = None):
+        """
+        Runs fn over tasks in a pool from _worker_pool(). Tasks are sent in adaptive chunks
+        with a bounded number in flight, see ChunkedScheduler.
+
+        Args:
+            total (int): Number of tasks, None when tasks are generated on the fly and it is not known.
+
+        Returns:
+            list: Results in the order of tasks, None if they were appended to log.
+        """
+        results = None if log is not None else [None] * (total or 0)
+        scheduler = ChunkedScheduler(executor, max_workers)
+        with tqdm(total=total, desc="Optimizing Parameters") as pbar:
+            for i, result in scheduler.run(fn, tasks, total=total):
+                if log is not None:
+                    log.append(result)
+                else:
+                    if i >= len(results):
+                        results.extend([None] * (i + 1 - len(results)))
+                    results[i] = result
+                pbar.update(1)
+        return results
+
+    def _skip_completed(self, grid: ParameterGrid, indices: np.ndarray, log: ResultsLog) -> np.ndarray:
+        """Drops the combinations whose results are already in the log."""
+        completed = log.completed()
+        if not completed:
+            return indices
+        pending = np.fromiter((params_key(grid.as_dict(grid[int(i)])) not in completed for i in indices),
+                              dtype=bool, count=len(indices))
+        print(f"{len(indices) - int(pending.sum())} combinations already in {log.path}, skipping them")
+        return indices[pending]
+
+    @staticmethod
+    def _pending_combinations(grid: ParameterGrid, constraints, vectorized: bool, completed: set):
+        """Combinations of grid accepted by constraints and not in completed, filtered one shard of indices at a time."""
+        for shard in grid.iter_shards(constraints=constraints, vectorized=vectorized):
+            for i in shard:
+                combination = grid[int(i)]
+                if not completed or params_key(grid.as_dict(combination)) not in completed:
+                    yield combination
+
+    @staticmethod
+    def _valid_combinations(grid: ParameterGrid, constraints, vectorized: bool) -> list:
+        """
+        Every combination of grid accepted by constraints, without an array of all their indices.
+        Raises ValueError when the constraints accept none, there would be nothing to choose from.
+        """
+        if not constraints:
+            return list(grid)
+        combinations = [grid[int(i)] for shard in grid.iter_shards(constraints=constraints, vectorized=vectorized) for i in shard]
+        if not combinations:
+            raise ValueError(f"The constraints accept none of the {len(grid)} parameter combinations.")
+        return combinations
+
+    def _pareto_from_log(self, log: ResultsLog, metrics, minimize=None):
+        """Pareto front of every result in the log, reading only the metric columns for the sort."""
+        df = log.to_dataframe()
+        if df.empty:
+            return []
+        ranks = nondominated_ranks(objective_matrix(df[metrics].to_dict("records"), metrics, minimize))
+        return log.read(np.flatnonzero(ranks == 0))
+
+    def pareto_ranks(self, results, metrics, minimize=None):
+        """
+        Ranks results by non-dominated sorting: 0 for the Pareto front, 1 for the front
+        that remains once it is removed, and so on.
+
+        Args:
+            results (list): List of dictionaries containing parameter stats.
+            metrics (list): List of metrics to optimize, maximized unless listed in minimize.
+            minimize (list, optional): Metrics where lower is better.
+
+        Returns:
+            list: Front rank of each result.
+        """
+        return nondominated_ranks(objective_matrix(results, metrics, minimize)).tolist()
+
+    def pareto_fronts(self, results, metrics, minimize=None):
+        """
+        Groups results by front, see pareto_ranks().
+
+        Returns:
+            list: One list of results per front, best front first, results keep their order.
+        """
+        ranks = self.pareto_ranks(results, metrics, minimize)
+        fronts = [[] for _ in range(max(ranks, default=-1) + 1)]
+        for res, rank in zip(results, ranks):
+            fronts[rank].append(res)
+        return fronts
+
+    def pareto_front(self, results, metrics, minimize=None):
         """
         Finds the Pareto front for multi-objective optimization.
 
         Args:
             results (list): List of dictionaries containing parameter stats.
             metrics (list): List of metrics to optimize.
+            minimize (list, optional): Metrics where lower is better, the others are maximized.
 
         Returns:
             list: Pareto-optimal parameter sets.
         """
-        pareto_set = []
-        for res in results:
-            dominated = False
-            for other in results:
-                if all(other[metric] >= res[metric] for metric in metrics) and any(other[metric] > res[metric] for metric in metrics):
-                    dominated = True
-                    break
-            if not dominated:
-                pareto_set.append(res)
-        return pareto_set
+        return [res for res, rank in zip(results, self.pareto_ranks(results, metrics, minimize)) if rank == 0]
     
     
 
@@ -181,7 +891,8 @@ class BacktestEngine(ABC):
         return result
 
     
-    def optimize_random(self, param_choices: dict, optimize_metrics: list, constraints=None, n_samples=1000):
+    def optimize_random(self, param_choices: dict, optimize_metrics: list, constraints=None, n_samples=1000, max_workers=None,
+                        vectorized_constraints=False, minimize_metrics=None, results_path=None, seed=None):
         """
         Optimizes the strategy parameters using random search with parallel processing.
 
@@ -190,44 +901,54 @@ class BacktestEngine(ABC):
             optimize_metrics (list): Metrics to optimize.
             constraints (callable, optional): A function that checks if a parameter combination is valid.
             n_samples (int): Number of random samples to evaluate.
+            max_workers (int, optional): Number of worker processes, defaults to the number of CPUs.
+            vectorized_constraints (bool): If True, constraints receives a dict of parameter arrays and
+                returns a boolean mask, see ParameterGrid.iter_shards().
+            minimize_metrics (list, optional): Metrics of optimize_metrics where lower is better.
+            results_path (str, optional): JSON Lines log results are appended to as they complete, see
+                ResultsLog. Combinations already in the log are skipped, and the Pareto front is taken
+                over the whole log. Without it, results are saved to a JSON file at the end.
+            seed (int, optional): Seed of the random sample. With results_path it defaults to 0, so
+                running again with the same log draws the same sample and finishes the interrupted search.
 
         Returns:
             list: Pareto-optimal results.
         """
         assert self.data_stream is not None, "Data stream must be added before optimizing."
+        if seed is None and results_path:
+            seed = 0
 
-        self.param_names = list(param_choices.keys())
-        param_combinations = list(itertools.product(*param_choices.values()))
-
+        grid = ParameterGrid(param_choices)
+        self.param_names = grid.names
         if constraints:
-            param_combinations = [combo for combo in param_combinations if constraints(dict(zip(self.param_names, combo)))]
+            valid = sum(len(shard) for shard in grid.iter_shards(constraints=constraints, vectorized=vectorized_constraints))
+        else:
+            valid = len(grid)
 
-        # Randomly select parameter combinations
-        sampled_combinations = random.sample(param_combinations, min(n_samples, len(param_combinations)//10))
+        # Randomly select parameter combinations, without building the grid
+        sampled = np.asarray(grid.sample(min(n_samples, valid // 10), constraints, vectorized=vectorized_constraints, seed=seed),
+                             dtype=np.int64)
+        log = ResultsLog(results_path) if results_path else None
+        if log is not None:
+            sampled = self._skip_completed(grid, sampled, log)
+        sampled_combinations = [grid[int(i)] for i in sampled]
 
-        results = []
         print(f"{len(sampled_combinations)} random combinations to test, please wait...")
-
-        with ProcessPoolExecutor() as executor:
-            with tqdm(total=len(sampled_combinations), desc="Optimizing Parameters") as pbar:
-                futures = [
-                    executor.submit(self.evaluate_combination, combo)
-                    for combo in sampled_combinations
-                ]
-                for future in futures:
-                    results.append(future.result())
-                    pbar.update(1)
+        results = self._evaluate_all(sampled_combinations, len(sampled_combinations), max_workers, log)
+        if log is not None:
+            return self._pareto_from_log(log, optimize_metrics, minimize_metrics)
 
         # Save results to a JSON file
         with open(f"optimization_results_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}.json", "w") as json_file:
-            json.dump(results, json_file, indent=4)
+            json.dump(results, json_file, indent=4, default=str)
 
         # Extract Pareto-optimal results
-        pareto_set = self.pareto_front(results, optimize_metrics)
+        pareto_set = self.pareto_front(results, optimize_metrics, minimize_metrics)
         return pareto_set
 
 
-    def optimize(self, param_choices: dict, optimize_metrics: list, constraints=None):
+    def optimize(self, param_choices: dict, optimize_metrics: list, constraints=None, max_workers=None,
+                 vectorized_constraints=False, minimize_metrics=None, results_path=None):
         """
         Optimizes the strategy parameters using grid search with parallel processing.
 
@@ -235,6 +956,13 @@ class BacktestEngine(ABC):
             param_choices (dict): Dictionary of parameter names and their possible values.
             optimize_target (str): The metric to maximize. Default is "sharpe_ratio".
             constraints (callable, optional): A function that checks if a parameter combination is valid.
+            max_workers (int, optional): Number of worker processes, defaults to the number of CPUs.
+            vectorized_constraints (bool): If True, constraints receives a dict of parameter arrays and
+                returns a boolean mask, see ParameterGrid.iter_shards().
+            minimize_metrics (list, optional): Metrics of optimize_metrics where lower is better.
+            results_path (str, optional): JSON Lines log results are appended to as they complete, see
+                ResultsLog. Combinations already in the log are skipped, and the Pareto front is taken
+                over the whole log. Without it, results are saved to a JSON file at the end.
 
         Returns:
             dict: Best parameters and their corresponding stats.
@@ -243,56 +971,274 @@ class BacktestEngine(ABC):
         # assert not self.has_run, "Engine must be reset before optimization."
 
         # Generate all parameter combinations
-        self.param_names = list(param_choices.keys())  # Store for evaluate_combination
-        param_combinations = list(itertools.product(*param_choices.values()))
-
-        if constraints:
-            param_combinations = [combo for combo in param_combinations if constraints(dict(zip(self.param_names, combo)))]
-
-        # Initialize tracking
-        best_params = None
-        best_target_value = float("-inf")
-        best_stats = None
-        best_trade_history = None
-        results = []
-        print(f"{len(param_combinations)} combinations to test, please wait...")
+        grid = ParameterGrid(param_choices)
+        self.param_names = grid.names  # Store for evaluate_combination
+        log = ResultsLog(results_path) if results_path else None
+        completed = log.completed() if log is not None else set()
+        if constraints or completed:
+            # valid and pending combinations are found one shard at a time as the workers consume them,
+            # so their number is only known at the end
+            param_combinations = self._pending_combinations(grid, constraints, vectorized_constraints, completed)
+            total = None
+            print(f"Testing the combinations of a grid of {len(grid)}{f', {len(completed)} already in {log.path}' if completed else ''}, please wait...")
+        else:
+            param_combinations = iter(grid)
+            total = len(grid)
+            print(f"{total} combinations to test, please wait...")
         # Run parameter combinations in parallel
-        with ProcessPoolExecutor() as executor:
-            with tqdm(total=len(param_combinations), desc="Optimizing Parameters") as pbar:
-                futures = [
-                    executor.submit(self.evaluate_combination, combo)
-                    for combo in param_combinations
-                ]
-                for future in futures:
-                    results.append(future.result())
-                    pbar.update(1)
+        results = self._evaluate_all(param_combinations, total, max_workers, log)
+        if log is not None:
+            return self._pareto_from_log(log, optimize_metrics, minimize_metrics)
 
         # Update the position_book with the best trade history for future plotting
         with open(f"optimization_results{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}.json", "w") as json_file:
-            json.dump(results, json_file, indent=4)
-        pareto_set = self.pareto_front(results, optimize_metrics)
+            json.dump(results, json_file, indent=4, default=str)
+        pareto_set = self.pareto_front(results, optimize_metrics, minimize_metrics)
         return pareto_set
     
-    def plot_trading_stats(self, table_format="multi_row"):
+    def _rank_order(self, results, metrics, minimize) -> np.ndarray:
+        """Indices of results from best to worst, by Pareto rank then by the first metric."""
+        points = objective_matrix(results, metrics, minimize)
+        ranks = nondominated_ranks(points)
+        return np.lexsort((-points[:, 0], ranks))
+
+    def _select_survivors(self, results, metrics, minimize, keep: float) -> list:
+        """
+        Indices of the best fraction of results, by Pareto rank then by the first metric.
+        """
+        order = self._rank_order(results, metrics, minimize)
+        n_keep = max(1, math.ceil(len(results) * keep))
+        return sorted(order[:n_keep].tolist())
+
+    def optimize_halving(self, param_choices: dict, optimize_metrics: list, constraints=None, min_fraction=0.1, keep=1/3,
+                         max_workers=None, vectorized_constraints=False, minimize_metrics=None):
+        """
+        Optimizes the strategy parameters by successive halving over the length of the data stream.
+
+        Every valid combination is first run over the first min_fraction of the bars. The best keep
+        fraction of them, by Pareto rank over optimize_metrics, is run again over a span 1/keep times
+        longer, and so on until the survivors are run over the whole data stream. All rounds share
+        one process pool. Results are reported as in optimize(), from the full length runs.
+
+        Args:
+            param_choices (dict): Dictionary of parameter names and their possible values.
+            optimize_metrics (list): Metrics to optimize.
+            constraints (callable, optional): A function that checks if a parameter combination is valid.
+            min_fraction (float): Fraction of the bars used in the first round.
+            keep (float): Fraction of the combinations kept after each round.
+            max_workers (int, optional): Number of worker processes, defaults to the number of CPUs.
+            vectorized_constraints (bool): If True, constraints receives a dict of parameter arrays and
+                returns a boolean mask, see ParameterGrid.iter_shards().
+            minimize_metrics (list, optional): Metrics of optimize_metrics where lower is better.
+
+        Returns:
+            list: Pareto-optimal results of the last round.
+        """
+        assert self.data_stream is not None, "Data stream must be added before optimizing."
+        assert 0 < min_fraction <= 1, "min_fraction must be in (0, 1]"
+        assert 0 < keep < 1, "keep must be in (0, 1)"
+
+        grid = ParameterGrid(param_choices)
+        self.param_names = grid.names
+        candidates = self._valid_combinations(grid, constraints, vectorized_constraints)
+
+        n_bars = self._n_bars()
+        fraction = min_fraction
+        max_workers = max_workers or os.cpu_count() or 1
+        with self._worker_pool(max_workers) as executor:
+            while True:
+                stop = None if fraction >= 1 else max(1, math.ceil(n_bars * fraction))
+                print(f"{len(candidates)} combinations to test over {stop or n_bars} bars, please wait...")
+                tasks = ((combo, stop) for combo in candidates)
+                results = self._evaluate_in_pool(executor, max_workers, _evaluate_prefix_in_worker, tasks, len(candidates))
+                if stop is None:
+                    break
+                survivors = self._select_survivors(results, optimize_metrics, minimize_metrics, keep)
+                candidates = [candidates[i] for i in survivors]
+                fraction = min(1.0, fraction / keep)
+
+        with open(f"optimization_results_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}.json", "w") as json_file:
+            json.dump(results, json_file, indent=4, default=str)
+        pareto_set = self.pareto_front(results, optimize_metrics, minimize_metrics)
+        return pareto_set
+
+    def walk_forward(self, param_choices: dict, optimize_metrics: list, train_bars: int, test_bars: int, anchored=False,
+                     constraints=None, max_workers=None, vectorized_constraints=False, minimize_metrics=None):
+        """
+        Walk-forward optimization: grid search over each training window, then a run of the chosen
+        parameters over the test window that follows it.
+
+        Test windows of test_bars bars follow each other from bar train_bars to the end of the data.
+        Training windows are the train_bars bars before each test window, or every bar before it
+        when anchored. All windows share one process pool and the data published to it, and their
+        grid searches are submitted together. Indicators are computed over the whole data stream, so
+        within a worker the IndicatorCache serves them to every window. The best combination of a
+        window is the first of the Pareto front, by the first metric.
+
+        The out-of-sample trades of all windows are stitched into the engine's trade history, so
+        get_trading_stats() and plot_trading_stats() report on them afterwards. Each test window
+        starts without open positions.
+
+        Args:
+            param_choices (dict): Dictionary of parameter names and their possible values.
+            optimize_metrics (list): Metrics to optimize.
+            train_bars (int): Length of the training windows, the first window's if anchored.
+            test_bars (int): Length of the test windows, and the step between windows.
+            anchored (bool): Training windows all start at the first bar.
+            constraints (callable, optional): A function that checks if a parameter combination is valid.
+            max_workers (int, optional): Number of worker processes, defaults to the number of CPUs.
+            vectorized_constraints (bool): If True, constraints receives a dict of parameter arrays and
+                returns a boolean mask, see ParameterGrid.iter_shards().
+            minimize_metrics (list, optional): Metrics of optimize_metrics where lower is better.
+
+        Returns:
+            list: One dict per window with its "train" and "test" bar ranges, the chosen "params",
+                their "in_sample" result and their "out_of_sample" result.
+        """
+        assert self.data_stream is not None, "Data stream must be added before optimizing."
+        n_bars = self._n_bars()
+        assert train_bars > 0 and test_bars > 0, "train_bars and test_bars must be positive"
+        assert train_bars < n_bars, "train_bars leaves no bars to test on"
+
+        grid = ParameterGrid(param_choices)
+        self.param_names = grid.names
+        candidates = self._valid_combinations(grid, constraints, vectorized_constraints)
+
+        windows = [
+            {"train": (0 if anchored else test_start - train_bars, test_start), "test": (test_start, min(test_start + test_bars, n_bars))}
+            for test_start in range(train_bars, n_bars, test_bars)
+        ]
+        max_workers = max_workers or os.cpu_count() or 1
+        with self._worker_pool(max_workers) as executor:
+            print(f"{len(windows)} windows of {len(candidates)} combinations to test, please wait...")
+            tasks = ((combo, *window["train"]) for window in windows for combo in candidates)
+            results = self._evaluate_in_pool(executor, max_workers, _evaluate_range_in_worker, tasks, len(windows) * len(candidates))
+            for k, window in enumerate(windows):
+                window_results = results[k * len(candidates):(k + 1) * len(candidates)]
+                best = window_results[int(self._rank_order(window_results, optimize_metrics, minimize_metrics)[0])]
+                window["params"] = best["params"]
+                window["in_sample"] = best
+
+            print(f"Running {len(windows)} out-of-sample windows...")
+            tasks = [(tuple(window["params"][name] for name in grid.names), *window["test"]) for window in windows]
+            out_of_sample = self._evaluate_in_pool(executor, max_workers, _trade_range_in_worker, iter(tasks), len(tasks))
+
+        # stitch the test windows' trades, relative to the portfolio carried over from window to window
+        stitched = TradeHistory(initial_portfolio=self._portfolio_size)
+        portfolio = self._portfolio_size
+        for window, (result, history) in zip(windows, out_of_sample):
+            window["out_of_sample"] = result
+            for trade in history.trades:
+                stitched.record_trade(trade.tag, trade.mode, trade.quantity, trade.open_price, trade.close_price, trade.profit,
+                                      trade.profit / portfolio, trade.open_time, trade.close_time, trade.symbol)
+                portfolio += trade.profit
+        self.position_book = self._new_position_book()
+        self.position_book.trade_history = stitched
+        self.position_book.portfolio_size = portfolio
+        self.has_run = True
+        return windows
+
+    def _close_chunks(self, start: int, stop: int):
+        """Yields the close prices of bars [start, stop) to plot, as frames with one column per line, chunk by chunk."""
+        if self.data_source is not None:
+            for chunk, _ in self.data_source.iter_chunks(self._chunk_size, 0, start, stop):
+                yield chunk[["close"]]
+        else:
+            yield self.data_stream[["close"]].iloc[start:stop]
+
+    def _price_lines(self, start: int, stop: int, max_points: int, downsample: str) -> dict:
+        """
+        Close prices of bars [start, stop), each line reduced to about max_points with the given downsampling
+        method (or kept whole when downsample is None). Chunks of a data source are reduced one by one,
+        each with its share of max_points, so the full series is never in memory.
+
+        Returns:
+            dict: line name -> (index, values)
+        """
+        total = max(stop - start, 1)
+        pieces = {}
+        for chunk in self._close_chunks(start, stop):
+            for name in chunk.columns:
+                values = chunk[name].to_numpy(dtype=np.float64)
+                if downsample is not None:
+                    kept = downsample_indices(values, max(3, round(max_points * len(values) / total)), downsample)
+                    pieces.setdefault(name, []).append((chunk.index[kept], values[kept]))
+                else:
+                    pieces.setdefault(name, []).append((chunk.index, values))
+        return {name: (parts[0][0].append([index for index, _ in parts[1:]]), np.concatenate([values for _, values in parts]))
+                for name, parts in pieces.items()}
+
+    @staticmethod
+    def _trade_segments(trades: pd.DataFrame):
+        """
+        x and y of one line made of every trade's open to close segment. Segments are separated by a
+        gap point with a NaN price, so x stays a typed array that plotly serializes as a whole.
+        """
+        open_time, close_time = (trades[name].dt.tz_localize(None) if isinstance(trades[name].dtype, pd.DatetimeTZDtype)
+                                 else trades[name] for name in ("open_time", "close_time"))
+        open_time, close_time = open_time.to_numpy(), close_time.to_numpy()
+        x = np.empty(3 * len(trades), dtype=open_time.dtype)
+        y = np.full(3 * len(trades), np.nan)
+        x[0::3], x[1::3], x[2::3] = open_time, close_time, close_time
+        y[0::3] = trades["open_price"].to_numpy(dtype=np.float64)
+        y[1::3] = trades["close_price"].to_numpy(dtype=np.float64)
+        return x, y
+
+    def plot_trading_stats(self, table_format="multi_row", max_points: int = 5000, downsample: str = "lttb",
+                           start: int = None, stop: int = None, show: bool = True, write_html: str = None,
+                           write_image: str = None):
         """
         Plots an OHLC chart with trades represented as red (short) or green (long) dotted lines,
         displays cumulative PnL as a subplot, and shows trading stats in a table format below the chart.
 
+        Lines are drawn with WebGL, all long trades as one line broken by gaps and all short trades as
+        another, and the close and cumulative PnL series are downsampled to max_points, so figures of
+        10^7 bars and 10^5 trades stay light. To see full detail over a part of the backtest, plot the
+        bars [start, stop) only; trades overlapping them are kept.
+
         Args:
             table_format (str): Format for stats table. Options:
                 - "single_row" - All metrics in one horizontal row (original)
                 - "multi_row" - Metrics grouped into multiple rows by category (easier to read)
                 - "two_column" - Vertical two-column layout with metric names and values
+            max_points (int): Points kept per price or PnL line.
+            downsample (str): "lttb" (keeps the shape of the line), "minmax" (keeps every high and low
+                of the buckets) or None to plot every point.
+            start (int): First bar to plot, as in run().
+            stop (int): Bar to stop plotting at, as in run().
+            show (bool): Opens the figure, turn it off on headless machines.
+            write_html (str): Path of a standalone HTML file to save the figure to.
+            write_image (str): Path of a static image to save the figure to, its extension giving the
+                format (png, svg, pdf...). Requires the kaleido package.
+
+        Returns:
+            go.Figure: the figure, to customize or save further.
         """
         assert self.data_stream is not None, "Data stream must be added before plotting trades"
         assert self.has_run, "Backtest must be run before plotting trades"
+        assert downsample is None or downsample in DOWNSAMPLING_METHODS, \
+            f"downsample must be one of {DOWNSAMPLING_METHODS} or None"
+        start, stop, _ = slice(start, stop).indices(self._n_bars())
 
         # Get trade history and stats
         trade_history_df = self.get_trade_history().to_dataframe()
         trading_stats = self.get_trading_stats()
-
-        # Calculate cumulative PnL
-        trade_history_df["cumulative_pnl"] = trade_history_df["profit"].cumsum() + self._portfolio_size
+        prices = self._price_lines(start, stop, max_points, downsample)
+
+        # Calculate cumulative PnL, then keep the trades overlapping the plotted bars
+        cumulative_pnl = (trade_history_df["profit"].cumsum() + self._portfolio_size).to_numpy()
+        pnl_time = trade_history_df["close_time"]
+        if len(trade_history_df) and (start > 0 or stop < self._n_bars()):
+            index = next(iter(prices.values()))[0] if prices else pd.Index([])
+            if len(index):
+                visible = ((trade_history_df["close_time"] >= index[0]) & (trade_history_df["open_time"] <= index[-1])).to_numpy()
+            else:
+                visible = np.zeros(len(trade_history_df), dtype=bool)
+            trade_history_df = trade_history_df[visible]
+            pnl_time, cumulative_pnl = pnl_time[visible], cumulative_pnl[visible]
+        if downsample is not None:
+            kept = downsample_indices(cumulative_pnl, max_points, downsample)
+            pnl_time, cumulative_pnl = pnl_time.iloc[kept], cumulative_pnl[kept]
 
         # Create subplots with 3 rows: one for cumulative PnL, one for OHLC, and one for the table
         fig = make_subplots(
@@ -318,28 +1264,29 @@ class BacktestEngine(ABC):
         #     col=1
         # )
         # due to performance reason, we shall use simple line chart :)
-        fig.add_trace(
-            go.Scatter(
-            x=self.data_stream.index,
-            y=self.data_stream["close"],
-            mode="lines",
-            line=dict(color="yellow"),
-            name="Close Price"
-            ),
-            row=2,
-            col=1
-        )
+        for name, (index, values) in prices.items():
+            fig.add_trace(
+                go.Scattergl(
+                    x=index,
+                    y=values,
+                    mode="lines",
+                    line=dict(color="yellow") if len(prices) == 1 else None,
+                    name="Close Price" if len(prices) == 1 else f"{name} Close"
+                ),
+                row=2,
+                col=1
+            )
 
-        # Plot trades as dotted lines
-        for _, trade in trade_history_df.iterrows():
-            color = "green" if trade["mode"] == "long" else "red"
+        # Plot trades as dotted lines, one line per side
+        for mode, color in (("long", "green"), ("short", "red")):
+            x, y = self._trade_segments(trade_history_df[trade_history_df["mode"] == mode])
             fig.add_trace(
-                go.Scatter(
-                    x=[trade["open_time"], trade["close_time"]],
-                    y=[trade["open_price"], trade["close_price"]],
+                go.Scattergl(
+                    x=x,
+                    y=y,
                     mode="lines+markers",
                     line=dict(color=color, dash="dot"),
-                    name=f"Trade ({trade['mode']})"
+                    name=f"Trades ({mode})"
                 ),
                 row=2,
                 col=1
@@ -347,9 +1294,9 @@ class BacktestEngine(ABC):
 
         # Add cumulative PnL line chart
         fig.add_trace(
-            go.Scatter(
-                x=trade_history_df["close_time"],
-                y=trade_history_df["cumulative_pnl"],
+            go.Scattergl(
+                x=pnl_time,
+                y=cumulative_pnl,
                 mode="lines",
                 line=dict(color="blue"),
                 name="Cumulative PnL"
@@ -519,5 +1466,11 @@ class BacktestEngine(ABC):
         fig.update_yaxes(title_text="Price", row=2, col=1)
 
         fig.update_xaxes(rangeslider_visible=False)
-        fig.show()
+        if write_html is not None:
+            fig.write_html(write_html)
+        if write_image is not None:
+            fig.write_image(write_image)
+        if show:
+            fig.show()
+        return fig
     
\ No newline at end of file
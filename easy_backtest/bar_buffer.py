@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+
+class BarBuffer:
+    """
+    A growing history of bars, kept as one numpy array per column with spare capacity.
+
+    Appending copies the new bars only, the arrays double when full, so the amortized cost of an
+    append does not depend on the length of the history. frame() returns a DataFrame whose columns
+    and index are views of the arrays, built in time independent of the history length as well.
+    """
+
+    def __init__(self, frame: pd.DataFrame, capacity: int = 1024):
+        self.columns = list(frame.columns)
+        self._size = 0
+        capacity = max(capacity, len(frame))
+        self._arrays = {name: np.empty(capacity, dtype=frame[name].dtype) for name in self.columns}
+        # datetime indexes are kept as int64 nanoseconds and rebuilt with their dtype, time zone included
+        self._index_dtype = frame.index.dtype
+        self._datetime = isinstance(frame.index, pd.DatetimeIndex)
+        self._index = np.empty(capacity, dtype=np.int64 if self._datetime else frame.index.dtype)
+        self._frame = None
+        self.append(frame)
+
+    def __len__(self):
+        return self._size
+
+    def _grow(self, size: int):
+        capacity = len(self._index)
+        while capacity < size:
+            capacity *= 2
+        for name, array in self._arrays.items():
+            grown = np.empty(capacity, dtype=array.dtype)
+            grown[:self._size] = array[:self._size]
+            self._arrays[name] = grown
+        grown = np.empty(capacity, dtype=self._index.dtype)
+        grown[:self._size] = self._index[:self._size]
+        self._index = grown
+
+    def append(self, frame: pd.DataFrame):
+        """Copies the bars of frame, which must have at least the buffer's columns, after the last bar."""
+        size = self._size + len(frame)
+        if size > len(self._index):
+            self._grow(size)
+        for name, array in self._arrays.items():
+            array[self._size:size] = frame[name].to_numpy()
+        self._index[self._size:size] = frame.index.asi8 if self._datetime else frame.index.to_numpy()
+        self._size = size
+        self._frame = None
+
+    def frame(self) -> pd.DataFrame:
+        """The bars so far, as a DataFrame sharing the buffer's memory: copy it before modifying it."""
+        if self._frame is None:
+            n = self._size
+            if self._datetime:
+                index = pd.DatetimeIndex(self._index[:n], dtype=self._index_dtype, copy=False)
+            else:
+                index = pd.Index(self._index[:n], dtype=self._index_dtype, copy=False)
+            # Series of the right dtype and index, so nothing is inferred, realigned or consolidated
+            self._frame = pd.DataFrame({name: pd.Series(array[:n], index=index, dtype=array.dtype, copy=False)
+                                        for name, array in self._arrays.items()}, index=index, copy=False)
+        return self._frame
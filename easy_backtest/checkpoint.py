@@ -0,0 +1,165 @@
+import json
+import os
+import pickle
+import tempfile
+import numpy as np
+from .position import Position
+from .position_store import PositionStore
+from .trade_history import TradeHistory
+
+MAGIC = b"EBCKPT\x00\x00"
+VERSION = 1
+# buffers start at multiples of this, so they can be used in place
+_ALIGNMENT = 64
+
+# numeric fields of open positions, stored as one array each
+_POSITION_COLUMNS = ("quantity", "open_price", "commission", "mode", "tp", "sl")
+
+
+def _padding(offset: int) -> int:
+    return -offset % _ALIGNMENT
+
+
+def _position_columns(positions: list) -> dict:
+    return {
+        "quantity": np.array([pos.quantity for pos in positions], dtype=np.float64),
+        "open_price": np.array([pos.open_price for pos in positions], dtype=np.float64),
+        "commission": np.array([pos.commission for pos in positions], dtype=np.float64),
+        "mode": np.array([1 if pos.is_long() else -1 for pos in positions], dtype=np.int8),
+        "tp": np.array([np.nan if pos.tp is None else pos.tp for pos in positions], dtype=np.float64),
+        "sl": np.array([np.nan if pos.sl is None else pos.sl for pos in positions], dtype=np.float64),
+    }
+
+
+def save_checkpoint(engine, path: str):
+    """
+    Writes the state of engine to path: open positions and trades as arrays, the portfolio size,
+    the user states and the position of the last processed bar. Market data is not included.
+
+    The file holds a JSON header followed by the raw bytes of each array, and is written atomically.
+    """
+    book = engine.position_book
+    history = book.trade_history
+    trades = history.to_arrays()
+    positions = list(book.position_collection)
+    strategy = type(engine)
+    meta = {
+        "version": VERSION,
+        "strategy": f"{strategy.__module__}.{strategy.__qualname__}",
+        "portfolio_size": book.portfolio_size,
+        "initial_portfolio": engine._portfolio_size,
+        "commission": engine.commission,
+        "has_run": engine.has_run,
+        "next_bar": engine._next_bar,
+        "columnar": isinstance(book.position_collection, PositionStore),
+        "symbols": list(getattr(book.position_collection, "symbols", [])),
+        "trades": len(history),
+        "positions": len(positions),
+    }
+    # small or arbitrary Python objects, everything sized by the number of bars or trades is an array
+    objects = {
+        "states": engine.states,
+        "trade_categories": trades["categories"],
+        "trade_time_kind": trades["time_kind"],
+        "trade_tz": trades["tz"],
+        "trade_stats": trades["stats"],
+        "position_fields": [(pos.tag, pos.open_time, pos.symbol) for pos in positions],
+    }
+    arrays = {"objects": np.frombuffer(pickle.dumps(objects, protocol=pickle.HIGHEST_PROTOCOL), dtype=np.uint8)}
+    arrays.update({f"trades.{name}": column for name, column in trades["columns"].items()})
+    arrays.update({f"positions.{name}": column for name, column in _position_columns(positions).items()})
+
+    # layout: magic, header length, JSON header, then each array's raw bytes, aligned
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        layout[name] = [array.dtype.str, len(array), offset]
+        offset += array.nbytes + _padding(array.nbytes)
+    header = json.dumps({**meta, "arrays": layout}).encode()
+    prefix = len(MAGIC) + 8 + len(header)
+    header += b" " * _padding(prefix)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as checkpoint_file:
+            checkpoint_file.write(MAGIC)
+            checkpoint_file.write(len(header).to_bytes(8, "little"))
+            checkpoint_file.write(header)
+            for array in arrays.values():
+                checkpoint_file.write(np.ascontiguousarray(array).data)
+                checkpoint_file.write(b"\x00" * _padding(array.nbytes))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _read_header(checkpoint_file, path: str) -> dict:
+    if checkpoint_file.read(len(MAGIC)) != MAGIC:
+        raise ValueError(f"{path} is not a backtest checkpoint.")
+    length = int.from_bytes(checkpoint_file.read(8), "little")
+    meta = json.loads(checkpoint_file.read(length))
+    if meta["version"] > VERSION:
+        raise ValueError(f"Checkpoint version {meta['version']} is newer than the supported version {VERSION}.")
+    return meta
+
+
+def read_meta(path: str) -> dict:
+    """Reads the header of a checkpoint, without loading its arrays."""
+    with open(path, "rb") as checkpoint_file:
+        meta = _read_header(checkpoint_file, path)
+    del meta["arrays"]
+    return meta
+
+
+def load_checkpoint(engine, path: str):
+    """
+    Restores the state saved by save_checkpoint() into engine, replacing its position book and states.
+    The engine keeps its own data streams, add the same market data before continuing the run.
+    The engine must be of the same strategy class and start from the same portfolio size.
+    """
+    with open(path, "rb") as checkpoint_file:
+        meta = _read_header(checkpoint_file, path)
+        strategy = type(engine)
+        if meta["strategy"] != f"{strategy.__module__}.{strategy.__qualname__}":
+            raise ValueError(f"Checkpoint of {meta['strategy']} cannot be restored into {strategy.__qualname__}.")
+        if meta["initial_portfolio"] != engine._portfolio_size:
+            raise ValueError(f"Checkpoint of a backtest started with a portfolio of {meta['initial_portfolio']} "
+                             f"cannot be restored into an engine with a portfolio of {engine._portfolio_size}.")
+        # one read into a buffer the arrays are views of, the trade columns are then used as they are
+        data = np.empty(os.fstat(checkpoint_file.fileno()).st_size - checkpoint_file.tell(), dtype=np.uint8)
+        checkpoint_file.readinto(data)
+    arrays = {name: np.frombuffer(data, dtype=dtype, count=length, offset=offset)
+              for name, (dtype, length, offset) in meta.pop("arrays").items()}
+    objects = pickle.loads(arrays["objects"])
+    trade_columns = {name[len("trades."):]: array for name, array in arrays.items() if name.startswith("trades.")}
+    positions = {name: arrays[f"positions.{name}"] for name in _POSITION_COLUMNS}
+
+    book = engine._new_position_book()
+    book.trade_history = TradeHistory.from_arrays({
+        "columns": trade_columns,
+        "categories": objects["trade_categories"],
+        "time_kind": objects["trade_time_kind"],
+        "tz": objects["trade_tz"],
+        "stats": objects["trade_stats"],
+    }, copy_columns=False)
+    book.portfolio_size = meta["portfolio_size"]
+    for i, (tag, open_time, symbol) in enumerate(objects["position_fields"]):
+        book.position_collection.add_position(Position(
+            quantity=float(positions["quantity"][i]),
+            open_price=float(positions["open_price"][i]),
+            commission=float(positions["commission"][i]),
+            mode="long" if positions["mode"][i] == 1 else "short",
+            tag=tag,
+            tp=None if np.isnan(positions["tp"][i]) else float(positions["tp"][i]),
+            sl=None if np.isnan(positions["sl"][i]) else float(positions["sl"][i]),
+            open_time=open_time,
+            symbol=symbol,
+            # levels moved since the entry, e.g. a trailed stop, are restored as they were
+            validate=False,
+        ))
+    engine.position_book = book
+    engine.states = objects["states"]
+    engine.has_run = meta["has_run"]
+    engine._next_bar = meta["next_bar"]
+    return meta
@@ -0,0 +1,239 @@
+import hashlib
+import json
+import os
+from abc import ABC, abstractmethod
+import numpy as np
+import pandas as pd
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as error:
+        raise ImportError("Reading Arrow and Parquet files requires pyarrow, install it with `pip install pyarrow`") from error
+    return pyarrow
+
+
+def _file_fingerprint(paths) -> str:
+    """Identity of files by path, size and modification time, hashing their content would read them whole."""
+    digest = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        stat = os.stat(path)
+        digest.update(f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+    return digest.hexdigest()
+
+
+class DataSource(ABC):
+    """
+    Base of the out-of-core data streams given to BacktestEngine.add_data_source().
+
+    A source knows its length and columns and reads a range of rows into a DataFrame, so run()
+    can stream through it chunk by chunk with bounded memory. Sources only hold file paths once
+    pickled, optimizer workers reopen the files themselves.
+    """
+
+    columns: list = []
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    @abstractmethod
+    def read(self, start: int, stop: int) -> pd.DataFrame:
+        """Reads rows [start, stop) into a DataFrame."""
+        pass
+
+    @abstractmethod
+    def fingerprint(self) -> str:
+        """Identity of the underlying data, used by the result cache."""
+        pass
+
+    def iter_chunks(self, chunk_size: int, warmup: int = 0, start: int = 0, stop: int = None):
+        """
+        Yields (frame, warmup) for consecutive chunks of rows [start, stop). Each frame is preceded by
+        up to warmup rows before its chunk, so indicators computed per chunk see enough history.
+        The second value is the number of those leading rows, to skip when iterating.
+        """
+        assert chunk_size > 0, "chunk_size must be positive"
+        stop = len(self) if stop is None else min(stop, len(self))
+        for chunk_start in range(start, stop, chunk_size):
+            read_start = max(0, chunk_start - warmup)
+            yield self.read(read_start, min(chunk_start + chunk_size, stop)), chunk_start - read_start
+
+
+class NumpyMemmapSource(DataSource):
+    """
+    A directory of .npy files, one per column plus one for the index, memory-mapped so that only
+    the pages of the rows being read are loaded. Create one from a DataFrame with write().
+    """
+
+    INDEX_FILE = "__index__.npy"
+    META_FILE = "meta.json"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        meta_path = os.path.join(directory, self.META_FILE)
+        if os.path.exists(meta_path):
+            with open(meta_path) as meta_file:
+                self._meta = json.load(meta_file)
+        else:
+            names = sorted(name[:-4] for name in os.listdir(directory) if name.endswith(".npy") and name != self.INDEX_FILE)
+            self._meta = {"columns": names, "index_name": None, "tz": None}
+        self.columns = list(self._meta["columns"])
+        self._arrays = None
+        lengths = {len(array) for array in self._open().values()}
+        assert len(lengths) == 1, f"Columns of {directory} differ in length"
+        self._length = lengths.pop()
+
+    @classmethod
+    def write(cls, df: pd.DataFrame, directory: str) -> "NumpyMemmapSource":
+        """Saves the columns and index of df to directory and returns a source reading them."""
+        os.makedirs(directory, exist_ok=True)
+        tz = None
+        if isinstance(df.index, pd.DatetimeIndex):
+            tz = str(df.index.tz) if df.index.tz is not None else None
+            index = df.index.tz_convert("UTC").tz_localize(None) if tz else df.index
+            np.save(os.path.join(directory, cls.INDEX_FILE), index.to_numpy())
+        else:
+            np.save(os.path.join(directory, cls.INDEX_FILE), df.index.to_numpy())
+        for name in df.columns:
+            np.save(os.path.join(directory, f"{name}.npy"), df[name].to_numpy())
+        with open(os.path.join(directory, cls.META_FILE), "w") as meta_file:
+            json.dump({"columns": [str(name) for name in df.columns], "index_name": df.index.name, "tz": tz}, meta_file)
+        return cls(directory)
+
+    def _paths(self):
+        return [os.path.join(self.directory, self.INDEX_FILE), *(os.path.join(self.directory, f"{name}.npy") for name in self.columns)]
+
+    def _open(self) -> dict:
+        if self._arrays is None:
+            paths = self._paths()
+            arrays = {}
+            if os.path.exists(paths[0]):
+                arrays[None] = np.load(paths[0], mmap_mode="r")
+            for name, path in zip(self.columns, paths[1:]):
+                arrays[name] = np.load(path, mmap_mode="r")
+            self._arrays = arrays
+        return self._arrays
+
+    def array(self, name):
+        """The memory-mapped values of a column, or of the index for None (None without an index file)."""
+        return self._open().get(name)
+
+    def __getstate__(self):
+        # memory maps are reopened on first use after unpickling
+        state = self.__dict__.copy()
+        state["_arrays"] = None
+        return state
+
+    def __len__(self):
+        return self._length
+
+    def read(self, start: int, stop: int) -> pd.DataFrame:
+        arrays = self._open()
+        if None in arrays:
+            index = arrays[None][start:stop]
+            if index.dtype.kind == "M":
+                index = pd.DatetimeIndex(index, name=self._meta["index_name"])
+                if self._meta["tz"]:
+                    index = index.tz_localize("UTC").tz_convert(self._meta["tz"])
+            else:
+                index = pd.Index(index, name=self._meta["index_name"])
+        else:
+            index = pd.RangeIndex(start, min(stop, self._length))
+        return pd.DataFrame({name: arrays[name][start:stop] for name in self.columns}, index=index, copy=False)
+
+    def fingerprint(self) -> str:
+        return _file_fingerprint(path for path in self._paths() if os.path.exists(path))
+
+    def __repr__(self):
+        return f"NumpyMemmapSource(directory={self.directory!r}, rows={self._length})"
+
+
+class _BatchedSource(DataSource):
+    """Base of the pyarrow backed sources, read a batch (record batch or row group) at a time."""
+
+    def __init__(self, path: str, index_column: str = None):
+        self.path = path
+        self.index_column = index_column
+        self._reader = None
+        reader = self._open()
+        schema = reader.schema_arrow if hasattr(reader, "schema_arrow") else reader.schema
+        pandas_metadata = schema.pandas_metadata or {}
+        index_columns = [name for name in pandas_metadata.get("index_columns", []) if isinstance(name, str)]
+        self.columns = [name for name in schema.names if name != index_column and name not in index_columns]
+        self._offsets = np.cumsum([0, *self._batch_rows(reader)])
+
+    @abstractmethod
+    def _open(self):
+        pass
+
+    @abstractmethod
+    def _batch_rows(self, reader) -> list:
+        pass
+
+    @abstractmethod
+    def _read_batches(self, reader, first: int, last: int):
+        """Reads batches [first, last) into a pyarrow Table."""
+        pass
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_reader"] = None
+        return state
+
+    def __len__(self):
+        return int(self._offsets[-1])
+
+    def read(self, start: int, stop: int) -> pd.DataFrame:
+        stop = min(stop, len(self))
+        first = int(np.searchsorted(self._offsets, start, side="right")) - 1
+        last = int(np.searchsorted(self._offsets, stop, side="left"))
+        table = self._read_batches(self._open(), first, last)
+        df = table.slice(start - int(self._offsets[first]), stop - start).to_pandas()
+        if self.index_column is not None:
+            df = df.set_index(self.index_column)
+        return df
+
+    def fingerprint(self) -> str:
+        return _file_fingerprint([self.path])
+
+    def __repr__(self):
+        return f"{type(self).__name__}(path={self.path!r}, rows={len(self)})"
+
+
+class ArrowSource(_BatchedSource):
+    """
+    An Arrow IPC (Feather v2) file, memory-mapped so record batches are read without copying.
+    Only the batches overlapping a chunk are touched, write files with several batches for bounded memory.
+    """
+
+    def _open(self):
+        if self._reader is None:
+            pyarrow = _require_pyarrow()
+            self._reader = pyarrow.ipc.open_file(pyarrow.memory_map(self.path, "r"))
+        return self._reader
+
+    def _batch_rows(self, reader) -> list:
+        return [reader.get_batch(i).num_rows for i in range(reader.num_record_batches)]
+
+    def _read_batches(self, reader, first: int, last: int):
+        pyarrow = _require_pyarrow()
+        return pyarrow.Table.from_batches([reader.get_batch(i) for i in range(first, last)], schema=reader.schema)
+
+
+class ParquetSource(_BatchedSource):
+    """A Parquet file, read lazily one row group at a time."""
+
+    def _open(self):
+        if self._reader is None:
+            pyarrow = _require_pyarrow()
+            self._reader = pyarrow.parquet.ParquetFile(self.path, memory_map=True)
+        return self._reader
+
+    def _batch_rows(self, reader) -> list:
+        return [reader.metadata.row_group(i).num_rows for i in range(reader.num_row_groups)]
+
+    def _read_batches(self, reader, first: int, last: int):
+        return reader.read_row_groups(list(range(first, last)), use_pandas_metadata=True)
@@ -0,0 +1,73 @@
+import warnings
+import numpy as np
+
+METHODS = ("lttb", "minmax")
+
+
+def lttb(values, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: keeps the first and last points, and from each of n_out - 2
+    buckets in between the point forming the largest triangle with the point kept before it and the
+    average of the next bucket. Points are taken as evenly spaced, the line keeps its visual shape.
+
+    Returns:
+        np.ndarray: sorted indices of the kept points, all of them when there are no more than n_out.
+    """
+    y = np.asarray(values, dtype=np.float64)
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    with warnings.catch_warnings():
+        # buckets of NaN only, e.g. a symbol before its listing, average to NaN and keep their first point
+        warnings.simplefilter("ignore", RuntimeWarning)
+        for bucket in range(n_out - 2):
+            lo, hi = edges[bucket], edges[bucket + 1]
+            # the last bucket looks ahead at the final point only
+            next_lo, next_hi = (hi, edges[bucket + 2]) if bucket + 2 < len(edges) else (n - 1, n)
+            next_x = (next_lo + next_hi - 1) / 2
+            next_y = np.nanmean(y[next_lo:next_hi]) if next_hi > next_lo else y[-1]
+            x = np.arange(lo, hi)
+            area = np.abs((a - next_x) * (y[lo:hi] - y[a]) - (a - x) * (next_y - y[a]))
+            a = lo + int(np.argmax(np.nan_to_num(area, nan=-1.0))) if hi > lo else a
+            kept[bucket + 1] = a
+    return np.unique(kept)
+
+
+def min_max(values, n_out: int) -> np.ndarray:
+    """
+    Keeps the lowest and highest point of each of n_out / 2 equal buckets, plus the first and last
+    points. Unlike lttb() every spike survives, at the cost of a noisier line.
+
+    Returns:
+        np.ndarray: sorted indices of the kept points, all of them when there are no more than n_out.
+    """
+    y = np.asarray(values, dtype=np.float64)
+    n = len(y)
+    if n <= n_out or n_out < 4:
+        return np.arange(n)
+    buckets = n_out // 2
+    size = -(-n // buckets)
+    padded = np.full(buckets * size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(buckets, size)
+    # NaN never wins, buckets of NaN only (or of padding only, past the end) keep nothing
+    missing = np.isnan(padded)
+    lows = np.argmin(np.where(missing, np.inf, padded), axis=1)
+    highs = np.argmax(np.where(missing, -np.inf, padded), axis=1)
+    starts = np.arange(buckets) * size
+    valid = ~missing.all(axis=1)
+    kept = np.concatenate([[0, n - 1], (starts + lows)[valid], (starts + highs)[valid]])
+    return np.unique(kept)
+
+
+def downsample(values, n_out: int, method: str = "lttb") -> np.ndarray:
+    """Indices of the points kept by the given method, "lttb" or "minmax"."""
+    if method == "lttb":
+        return lttb(values, n_out)
+    if method == "minmax":
+        return min_max(values, n_out)
+    raise ValueError(f"Unknown downsampling method '{method}', expected one of {METHODS}")
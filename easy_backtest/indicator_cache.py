@@ -0,0 +1,90 @@
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+
+def _pandas(values: np.ndarray):
+    # 2D values hold one column per symbol, each computed on its own
+    return pd.DataFrame(values) if values.ndim == 2 else pd.Series(values)
+
+
+def _rolling(method):
+    def compute(values: np.ndarray, window: int, **kwargs) -> np.ndarray:
+        return getattr(_pandas(values).rolling(window=window, **kwargs), method)().to_numpy()
+    return compute
+
+
+def _ema(values: np.ndarray, span: int, adjust: bool = False) -> np.ndarray:
+    return _pandas(values).ewm(span=span, adjust=adjust).mean().to_numpy()
+
+
+# built-in indicators, each takes the source values followed by its arguments
+INDICATORS = {
+    "sma": _rolling("mean"),
+    "std": _rolling("std"),
+    "min": _rolling("min"),
+    "max": _rolling("max"),
+    "ema": _ema,
+}
+
+
+class IndicatorCache:
+    """
+    Memoizes indicator arrays, keyed by the fingerprint of their source data, the indicator and its arguments.
+
+    Least recently used entries are evicted once the cached arrays exceed max_bytes. Since every caller
+    shares them, cached arrays are handed out as read-only views. IndicatorCache.shared() is the cache
+    of the current process, so in the optimizer every evaluation running in a worker shares it.
+    """
+
+    _shared = None
+
+    def __init__(self, max_bytes: int = 512 * 1024 ** 2):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict = OrderedDict()
+
+    @classmethod
+    def shared(cls) -> "IndicatorCache":
+        """Returns the cache shared by all engines of this process."""
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def get(self, key, compute) -> np.ndarray:
+        """Returns the array cached under key, calling compute() to build it on a miss."""
+        array = self._entries.get(key)
+        if array is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+        else:
+            self.misses += 1
+            array = np.asarray(compute())
+            if array.nbytes <= self.max_bytes:
+                self._entries[key] = array
+                self.nbytes += array.nbytes
+                self._evict()
+        # hand out read-only views, leaving the flags of whatever compute() returned alone
+        view = array.view()
+        view.flags.writeable = False
+        return view
+
+    def _evict(self):
+        while self.nbytes > self.max_bytes:
+            _, array = self._entries.popitem(last=False)
+            self.nbytes -= array.nbytes
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __repr__(self):
+        return f"IndicatorCache(entries={len(self)}, nbytes={self.nbytes}, max_bytes={self.max_bytes})"
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+from .data_source import NumpyMemmapSource
+
+
+def _nanoseconds(time) -> int:
+    """A bar timestamp as nanoseconds since the epoch, in UTC for timezone-aware ones, as NumpyMemmapSource stores them."""
+    time = pd.Timestamp(time)
+    if time.tz is not None:
+        time = time.tz_convert("UTC").tz_localize(None)
+    return time.value
+
+
+class LowerTimeframe:
+    """
+    Finer bars of the instrument being backtested, read only for the bars where both the take profit
+    and the stop loss of a position are within the bar's range and the order they were hit in matters.
+
+    The fine bars are kept in a NumpyMemmapSource with a timestamp index. A bar's fine bars are found by
+    binary search over the memory-mapped index, so only the few pages it touches and the highs and lows
+    of those fine bars are ever loaded, whatever the length of the fine history.
+    """
+
+    def __init__(self, source, bar_duration):
+        """
+        source: a NumpyMemmapSource, or its directory, with a datetime index sorted in time
+        bar_duration: length of the backtested bars, whose timestamps are their open time
+        """
+        self.source = NumpyMemmapSource(source) if isinstance(source, str) else source
+        assert isinstance(self.source, NumpyMemmapSource), "The lower timeframe must be a NumpyMemmapSource"
+        missing_columns = {"high", "low"} - set(self.source.columns)
+        assert not missing_columns, f"Lower timeframe must contain the following columns: {missing_columns}"
+        self.bar_duration = pd.Timedelta(bar_duration)
+        assert self.bar_duration > pd.Timedelta(0), "bar_duration must be positive"
+        # how ambiguous bars were resolved: by the fine bars, or as stop loss first when they could not tell
+        self.counts = {"tp": 0, "sl": 0, "unresolved": 0}
+
+    def _fine_bars(self, time):
+        index = self.source.array(None)
+        assert index is not None and index.dtype.kind == "M", "The lower timeframe needs a datetime index"
+        start = _nanoseconds(time)
+        first, last = np.searchsorted(index.view(np.int64), [start, start + self.bar_duration.value])
+        return self.source.array("high")[first:last], self.source.array("low")[first:last]
+
+    def stop_loss_first(self, time, is_long: bool, tp: float, sl: float) -> bool:
+        """
+        Whether the stop loss of a position was hit before its take profit during the bar opened at time.
+        Stop loss first when a single fine bar covers both, or when there are no fine bars for the bar.
+        """
+        high, low = self._fine_bars(time)
+        if is_long:
+            sl_hits, tp_hits = low <= sl, high >= tp
+        else:
+            sl_hits, tp_hits = high >= sl, low <= tp
+        sl_bar = int(sl_hits.argmax()) if sl_hits.any() else len(high)
+        tp_bar = int(tp_hits.argmax()) if tp_hits.any() else len(high)
+        if sl_bar == tp_bar:
+            self.counts["unresolved"] += 1
+            return True
+        sl_first = sl_bar < tp_bar
+        self.counts["sl" if sl_first else "tp"] += 1
+        return sl_first
+
+    def __repr__(self):
+        return f"LowerTimeframe(source={self.source!r}, bar_duration={self.bar_duration})"
@@ -0,0 +1,138 @@
+import itertools
+import math
+import random
+import numpy as np
+
+
+def _choice_array(values: list) -> np.ndarray:
+    array = np.asarray(values)
+    if array.dtype.kind not in "biuf" and not all(isinstance(value, str) for value in values):
+        # e.g. mixed types, which numpy would coerce to strings
+        array = np.empty(len(values), dtype=object)
+        array[:] = values
+    return array
+
+
+class ParameterGrid:
+    """
+    Lazy cartesian product of parameter choices, in the order of itertools.product.
+
+    Combinations are never materialized: any of them can be decoded from its integer index, so the
+    grid supports len(), indexing, sampling without replacement and iteration in shards of indices.
+    Constraints are either a function of one combination dict, or, with vectorized=True, a function
+    of a dict of parameter arrays (one entry per combination of a shard) returning a boolean mask.
+    """
+
+    def __init__(self, param_choices: dict):
+        self.names = list(param_choices.keys())
+        self.choices = [list(values) for values in param_choices.values()]
+        self.sizes = [len(values) for values in self.choices]
+        self._arrays = [_choice_array(values) for values in self.choices]
+
+    def __len__(self):
+        return math.prod(self.sizes)
+
+    def __getitem__(self, index: int) -> tuple:
+        n = len(self)
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError(f"Combination {index} is out of range for a grid of {n}.")
+        combination = []
+        for values, size in zip(reversed(self.choices), reversed(self.sizes)):
+            index, digit = divmod(index, size)
+            combination.append(values[digit])
+        return tuple(reversed(combination))
+
+    def __iter__(self):
+        return itertools.product(*self.choices)
+
+    def decode(self, indices: np.ndarray) -> dict:
+        """Returns the parameter values of many combinations at once, as a dict of arrays."""
+        indices = np.asarray(indices, dtype=np.int64)
+        decoded = {}
+        for name, array, size in zip(reversed(self.names), reversed(self._arrays), reversed(self.sizes)):
+            indices, digits = np.divmod(indices, size)
+            decoded[name] = array[digits]
+        return {name: decoded[name] for name in self.names}
+
+    def as_dict(self, combination: tuple) -> dict:
+        return dict(zip(self.names, combination))
+
+    def _mask(self, indices: np.ndarray, constraints, vectorized: bool) -> np.ndarray:
+        if vectorized:
+            mask = np.asarray(constraints(self.decode(indices)), dtype=bool)
+            return np.broadcast_to(mask, indices.shape)
+        return np.fromiter((constraints(self.as_dict(self[int(i)])) for i in indices), dtype=bool, count=len(indices))
+
+    def iter_shards(self, shard_size: int = 1 << 16, constraints=None, vectorized: bool = False):
+        """
+        Iterates over the grid in shards of combination indices.
+
+        Args:
+            shard_size (int): Number of candidate combinations per shard.
+            constraints (callable, optional): Keeps only the combinations it accepts.
+            vectorized (bool): If True, constraints receives a dict of parameter arrays for the whole
+                shard and returns a boolean mask, e.g. lambda p: p["short_window"] < p["long_window"].
+
+        Yields:
+            np.ndarray: Indices of the valid combinations of each shard, shards may be empty.
+        """
+        n = len(self)
+        for start in range(0, n, shard_size):
+            indices = np.arange(start, min(start + shard_size, n), dtype=np.int64)
+            if constraints is not None:
+                indices = indices[self._mask(indices, constraints, vectorized)]
+            yield indices
+
+    def iter_batches(self, batch_size: int, constraints=None, vectorized: bool = False, shard_size: int = 1 << 16):
+        """
+        Iterates over the valid combination indices in batches of batch_size, the last one possibly
+        smaller. Constraints are applied one shard at a time, so memory does not grow with the grid.
+        """
+        assert batch_size > 0, "batch_size must be positive"
+        pending = np.empty(0, dtype=np.int64)
+        for shard in self.iter_shards(shard_size, constraints, vectorized):
+            pending = np.concatenate([pending, shard])
+            full = len(pending) // batch_size * batch_size
+            for first in range(0, full, batch_size):
+                yield pending[first:first + batch_size]
+            pending = pending[full:]
+        if len(pending):
+            yield pending
+
+    def valid_indices(self, constraints=None, vectorized: bool = False) -> np.ndarray:
+        """Indices of every combination accepted by constraints, 8 bytes per combination."""
+        shards = list(self.iter_shards(constraints=constraints, vectorized=vectorized))
+        return np.concatenate(shards) if shards else np.empty(0, dtype=np.int64)
+
+    def sample(self, n: int, constraints=None, vectorized: bool = False, seed=None) -> list:
+        """
+        Draws up to n distinct valid combination indices uniformly at random, without building the grid.
+
+        Returns:
+            list: Indices in the order they were drawn, fewer than n if the grid has fewer valid combinations.
+        """
+        rng = random.Random(seed)
+        total = len(self)
+        if constraints is None:
+            return rng.sample(range(total), min(n, total))
+        if total <= 4 * n:
+            # small grid, cheaper to filter it all than to reject samples
+            valid = self.valid_indices(constraints, vectorized).tolist()
+            return rng.sample(valid, min(n, len(valid)))
+
+        sampled, seen = [], set()
+        while len(sampled) < n and len(seen) < total:
+            batch = []
+            while len(batch) < max(n - len(sampled), 64) and len(seen) < total:
+                index = rng.randrange(total)
+                if index not in seen:
+                    seen.add(index)
+                    batch.append(index)
+            batch = np.asarray(batch, dtype=np.int64)
+            sampled.extend(batch[self._mask(batch, constraints, vectorized)].tolist())
+        return sampled[:n]
+
+    def __repr__(self):
+        return f"ParameterGrid({dict(zip(self.names, self.sizes))}, combinations={len(self)})"
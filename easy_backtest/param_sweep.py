@@ -0,0 +1,125 @@
+import numpy as np
+
+# keys of the signals returned by strategy_sweep(), with their defaults
+SIGNALS = {"entry": 0.0, "exit": False, "size": 1.0, "tp": np.nan, "sl": np.nan, "tp_pct": np.nan, "sl_pct": np.nan}
+
+
+def _broadcast(value, n_bars: int, n_sets: int, dtype) -> np.ndarray:
+    """
+    A (bars, sets) view of a signal: scalars apply everywhere, 1-D values are per bar, 2-D values
+    are (bars, sets), (1, sets) or (bars, 1).
+    """
+    array = np.asarray(value, dtype=dtype)
+    if array.ndim == 1:
+        assert len(array) == n_bars, "1-D signals must have one value per bar, use (1, sets) arrays for values per set"
+        array = array[:, None]
+    return np.broadcast_to(array, (n_bars, n_sets))
+
+
+def simulate_sweep(high: np.ndarray, low: np.ndarray, close: np.ndarray, signals: dict, n_sets: int, commission: float) -> dict:
+    """
+    Runs the single position logic of run_vectorized() for n_sets parameter sets at once.
+
+    The state of each set's position (side, quantity, open price, TP, SL, open bar) is kept in arrays
+    along the set axis, and every bar updates all of them with a few array operations: TP/SL is
+    checked first (stop loss first), then exit signals close at the bar's close, then entries open at
+    the bar's close. A set can enter again on the bar its previous position was closed on.
+
+    Args:
+        high, low, close (np.ndarray): Prices per bar.
+        signals (dict): Values of SIGNALS, see _broadcast() for their shapes. tp_pct/sl_pct set TP/SL
+            relative to the entry price, in the favourable/adverse direction of the position, and take
+            precedence over tp/sl.
+        n_sets (int): Number of parameter sets.
+        commission (float): Commission rate, charged on the close notional as in Position.close_position().
+
+    Returns:
+        dict: Arrays with one entry per closed trade, in the order they were closed: "set", "side"
+            (1 long, -1 short), "quantity", "open_bar", "open_price", "close_bar", "close_price", "profit".
+    """
+    n_bars = len(close)
+    entry = _broadcast(signals.get("entry", SIGNALS["entry"]), n_bars, n_sets, np.float64)
+    exit_ = _broadcast(signals.get("exit", SIGNALS["exit"]), n_bars, n_sets, bool)
+    size = _broadcast(signals.get("size", SIGNALS["size"]), n_bars, n_sets, np.float64)
+    if "tp_pct" in signals:
+        tp, tp_relative = _broadcast(signals["tp_pct"], n_bars, n_sets, np.float64), True
+    else:
+        tp, tp_relative = _broadcast(signals.get("tp", SIGNALS["tp"]), n_bars, n_sets, np.float64), False
+    if "sl_pct" in signals:
+        sl, sl_relative = _broadcast(signals["sl_pct"], n_bars, n_sets, np.float64), True
+    else:
+        sl, sl_relative = _broadcast(signals.get("sl", SIGNALS["sl"]), n_bars, n_sets, np.float64), False
+    any_exit = exit_.strides[0] != 0 or bool(exit_[0].any())
+
+    # position state along the set axis. TP/SL are kept signed (negated for shorts) so one comparison
+    # checks both sides, and are NaN while a set is flat so they never trigger
+    is_open = np.zeros(n_sets, dtype=bool)
+    is_long = np.zeros(n_sets, dtype=bool)
+    quantity = np.zeros(n_sets)
+    open_price = np.zeros(n_sets)
+    signed_tp = np.full(n_sets, np.nan)
+    signed_sl = np.full(n_sets, np.nan)
+    open_bar = np.zeros(n_sets, dtype=np.int64)
+    n_open = 0
+    events = []
+
+    for t in range(n_bars):
+        if n_open:
+            # the adverse and favourable price of the bar for each side, signed like TP/SL
+            sl_hit = np.where(is_long, low[t], -high[t]) <= signed_sl
+            tp_hit = np.where(is_long, high[t], -low[t]) >= signed_tp
+            tp_hit &= ~sl_hit
+            closing = sl_hit | tp_hit
+            if any_exit:
+                closing |= exit_[t] & is_open
+            sets = np.flatnonzero(closing)
+            if len(sets):
+                long = is_long[sets]
+                price = np.where(sl_hit[sets], signed_sl[sets], np.where(tp_hit[sets], signed_tp[sets], np.nan))
+                price = np.where(np.isnan(price), close[t], np.where(long, price, -price))
+                # fancy indexing copies, a set reopening on this bar won't change the recorded state
+                events.append((sets, long, quantity[sets], open_bar[sets], open_price[sets], t, price))
+                is_open[sets] = False
+                signed_tp[sets] = np.nan
+                signed_sl[sets] = np.nan
+                n_open -= len(sets)
+
+        row = entry[t]
+        sets = np.flatnonzero((row != 0) & ~is_open)
+        if len(sets):
+            price = close[t]
+            long = row[sets] > 0
+            is_open[sets] = True
+            is_long[sets] = long
+            quantity[sets] = size[t, sets]
+            open_price[sets] = price
+            open_bar[sets] = t
+            sign = np.where(long, 1.0, -1.0)
+            # relative levels are a fraction of the entry price away from it, favourable for TP, adverse for SL
+            signed_tp[sets] = price * (sign + tp[t, sets]) if tp_relative else sign * tp[t, sets]
+            signed_sl[sets] = price * (sign - sl[t, sets]) if sl_relative else sign * sl[t, sets]
+            n_open += len(sets)
+
+    return _collect(events, commission)
+
+
+def _collect(events: list, commission: float) -> dict:
+    if not events:
+        empty = np.empty(0)
+        return {"set": np.empty(0, dtype=np.int64), "side": np.empty(0, dtype=np.int8), "quantity": empty, "open_bar": np.empty(0, dtype=np.int64),
+                "open_price": empty, "close_bar": np.empty(0, dtype=np.int64), "close_price": empty, "profit": empty}
+    sets, is_long, quantity, open_bar, open_price, close_bar, close_price = zip(*events)
+    counts = [len(s) for s in sets]
+    trades = {
+        "set": np.concatenate(sets),
+        "side": np.where(np.concatenate(is_long), 1, -1).astype(np.int8),
+        "quantity": np.concatenate(quantity),
+        "open_bar": np.concatenate(open_bar),
+        "open_price": np.concatenate(open_price),
+        "close_bar": np.repeat(np.array(close_bar, dtype=np.int64), counts),
+        "close_price": np.concatenate(close_price),
+    }
+    # as Position.close_position(): price difference times quantity, less commission on the close notional
+    trades["profit"] = ((trades["close_price"] - trades["open_price"]) * trades["side"] * trades["quantity"]
+                        - commission * trades["quantity"] * trades["close_price"])
+    return trades
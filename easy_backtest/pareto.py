@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+
+def objective_matrix(results: list, metrics: list, minimize=None) -> np.ndarray:
+    """
+    Stacks the metrics of each result into an (n_results, n_metrics) float array where larger is better.
+    Metrics listed in minimize are negated, timedeltas are converted to seconds and missing values
+    (NaN, NaT) become -inf, so they never dominate another result.
+    """
+    minimize = set(minimize or [])
+    unknown = minimize - set(metrics)
+    if unknown:
+        raise ValueError(f"Metrics to minimize must also be optimized, got {sorted(unknown)}.")
+    points = np.empty((len(results), len(metrics)))
+    for j, metric in enumerate(metrics):
+        column = pd.Series([result[metric] for result in results], dtype=object)
+        column = pd.to_timedelta(column).dt.total_seconds() if column.map(lambda v: isinstance(v, pd.Timedelta)).any() \
+            else column.astype(float)
+        points[:, j] = -column.to_numpy(dtype=float) if metric in minimize else column.to_numpy(dtype=float)
+    points[np.isnan(points)] = -np.inf
+    return points
+
+
+def _lexicographic_order(points: np.ndarray) -> np.ndarray:
+    """Sorts by the first objective descending, then the next ones, so dominating points come first."""
+    return np.lexsort(-points.T[::-1])
+
+
+def _ranks_2d(points: np.ndarray) -> np.ndarray:
+    """
+    Sort-and-sweep for two objectives. Within a front taken in sort order the second objective is
+    increasing, so a front dominates a point iff its last member does, and fronts are binary searched.
+    """
+    ranks = np.empty(len(points), dtype=np.int64)
+    x, y = points[:, 0].tolist(), points[:, 1].tolist()
+    # last member (x, y) of each front
+    last_x, last_y = [], []
+    for i in _lexicographic_order(points).tolist():
+        xi, yi = x[i], y[i]
+        lo, hi = 0, len(last_y)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            # earlier points have x >= xi, the member dominates unless it is no better on y or equal
+            if last_y[mid] > yi or (last_y[mid] == yi and last_x[mid] > xi):
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == len(last_y):
+            last_x.append(xi)
+            last_y.append(yi)
+        else:
+            last_x[lo], last_y[lo] = xi, yi
+        ranks[i] = lo
+    return ranks
+
+
+class _Front:
+    """Members of one front, one growable array per objective, for vectorized dominance checks."""
+
+    def __init__(self, n_objectives: int):
+        self.columns = np.empty((n_objectives, 16))
+        self.size = 0
+
+    def append(self, point: np.ndarray):
+        if self.size == self.columns.shape[1]:
+            self.columns = np.concatenate([self.columns, np.empty_like(self.columns)], axis=1)
+        self.columns[:, self.size] = point
+        self.size += 1
+
+    def dominates(self, point: np.ndarray) -> bool:
+        columns = self.columns[:, :self.size]
+        # members were placed earlier in lexicographic order, so they are at least as good on the
+        # first objective. Comparing contiguous columns is much faster than all(axis=1) on rows.
+        at_least = columns[1] >= point[1] if len(point) > 1 else np.ones(self.size, dtype=bool)
+        for j in range(2, len(point)):
+            at_least &= columns[j] >= point[j]
+        if not at_least.any():
+            return False
+        # a member at least as good everywhere dominates unless it is the same point
+        return bool((columns[:, at_least] != point[:, None]).any())
+
+
+def _ranks_nd(points: np.ndarray) -> np.ndarray:
+    """
+    Efficient non-dominated sort with binary search over fronts (ENS-BS). Points are taken in
+    lexicographic order, so only points already placed can dominate the current one, and each
+    front is checked against it with one NumPy expression.
+    """
+    ranks = np.empty(len(points), dtype=np.int64)
+    fronts = []
+    for i in _lexicographic_order(points).tolist():
+        point = points[i]
+        lo, hi = 0, len(fronts)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if fronts[mid].dominates(point):
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == len(fronts):
+            fronts.append(_Front(points.shape[1]))
+        fronts[lo].append(point)
+        ranks[i] = lo
+    return ranks
+
+
+def nondominated_ranks(points: np.ndarray) -> np.ndarray:
+    """
+    Non-dominated sorting of points where every objective is maximized.
+
+    Args:
+        points (np.ndarray): (n_points, n_objectives) array.
+
+    Returns:
+        np.ndarray: Front of every point, 0 for the Pareto front, 1 for the front once it is removed, etc.
+    """
+    points = np.asarray(points, dtype=float)
+    if len(points) == 0:
+        return np.empty(0, dtype=np.int64)
+    if points.shape[1] == 2:
+        return _ranks_2d(points)
+    return _ranks_nd(points)
@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+from .backtest_engine import BacktestEngine
+from .position_book import PositionBook
+from .result_cache import ResultCache
+
+
+class CrossSection:
+    """
+    One bar of every symbol, as served by PortfolioBacktestEngine.run().
+
+    Fields are read as arrays aligned with symbols, e.g. bar.close[k] is the close of symbols[k],
+    NaN where a symbol has no bar at this timestamp. bar.Index is the timestamp. The same object
+    is reused for every bar, copy values out rather than storing bar itself.
+    """
+    __slots__ = ("Index", "position", "symbols", "_fields", "_index")
+
+    def __init__(self, symbols: list, fields: dict, index: pd.Index):
+        self.symbols = symbols
+        self._fields = fields
+        self._index = index
+        self.position = -1
+        self.Index = None
+
+    def seek(self, i: int):
+        self.position = i
+        self.Index = self._index[i]
+        return self
+
+    def __getattr__(self, name):
+        # only called for names that are not slots, i.e. fields
+        try:
+            return self._fields[name][self.position]
+        except KeyError:
+            raise AttributeError(f"CrossSection has no field '{name}'") from None
+
+    @property
+    def available(self) -> np.ndarray:
+        """Mask of the symbols with a bar at this timestamp."""
+        return ~np.isnan(self._fields["close"][self.position])
+
+    def __repr__(self):
+        return f"CrossSection(Index={self.Index!r}, symbols={len(self.symbols)})"
+
+
+class PortfolioBacktestEngine(BacktestEngine):
+    """
+    Backtests a strategy over a basket of symbols in one event loop.
+
+    add_data_streams() aligns the OHLCV frames of every symbol once onto the union of their
+    timestamps. The data stream then is one wide frame with (field, symbol) columns, so
+    data_stream["close"] is a frame of closes with one column per symbol. run() extracts every field
+    into a (bars, symbols) array and calls strategy() with a CrossSection per bar. Positions are
+    opened with a symbol and kept in a PositionStore. TP/SL is checked for every symbol at once,
+    each position against its own symbol's bar, and trades carry a symbol column.
+
+    Methods working on a single data stream, add_data_stream(), add_data_source(), add_lower_timeframe(),
+    run_vectorized(), run_incremental() and sweep(), raise TypeError.
+    """
+
+    def __init__(self, commission: float, portfolio_size: float = 100, result_cache: ResultCache = None):
+        self.symbols = []
+        super().__init__(commission, portfolio_size, columnar_positions=True, result_cache=result_cache)
+
+    def _new_position_book(self):
+        return PositionBook(commission=self.commission, portfolio_size=self._portfolio_size, columnar=True, symbols=self.symbols)
+
+    def add_data_streams(self, data_streams: dict):
+        """
+        Adds the data of every symbol, aligned onto the union of their indexes.
+
+        Args:
+            data_streams (dict): symbol -> OHLCV DataFrame. Columns present in every frame are kept.
+        """
+        assert data_streams, "At least one data stream is required"
+        required_columns = {"open", "high", "low", "close", "volume"}
+        for symbol, data_stream in data_streams.items():
+            assert isinstance(data_stream, pd.DataFrame), "Data stream must be a Pandas DataFrame"
+            missing_columns = required_columns - set(data_stream.columns)
+            assert not missing_columns, f"Data stream of {symbol} must contain the following columns: {missing_columns}"
+
+        frames = list(data_streams.values())
+        fields = [name for name in frames[0].columns if all(name in frame.columns for frame in frames[1:])]
+        index = frames[0].index
+        for frame in frames[1:]:
+            index = index.union(frame.index)
+        aligned = {symbol: frame.reindex(index) for symbol, frame in data_streams.items()}
+        self.symbols = list(data_streams)
+        self.data_stream = pd.concat(
+            {field: pd.DataFrame({symbol: aligned[symbol][field] for symbol in self.symbols}) for field in fields}, axis=1
+        )
+        self._data_columns = list(self.data_stream.columns)
+        self.position_book = self._new_position_book()
+        print(f"{len(self.symbols)} DATA STREAMS ADDED, {len(index)} BARS")
+
+    def add_field(self, name: str, values: pd.DataFrame):
+        """
+        Adds or replaces a field of every symbol, e.g. from preprocess_data().
+
+        Args:
+            values (pd.DataFrame): One column per symbol, indexed like the data stream,
+                e.g. self.data_stream["close"].rolling(20).mean().
+        """
+        block = values.reindex(columns=self.symbols)
+        block.columns = pd.MultiIndex.from_product([[name], self.symbols])
+        data_stream = self.data_stream
+        if name in data_stream.columns.get_level_values(0):
+            data_stream = data_stream.drop(columns=name, level=0)
+        self.data_stream = pd.concat([data_stream, block], axis=1)
+
+    def run(self, row_cursor: bool = False, start: int = None, stop: int = None):
+        """
+        Executes the backtest over every symbol, calling strategy() with one CrossSection per bar.
+
+        Args:
+            row_cursor (bool): Unused, bars are always served from arrays.
+            start, stop (int, optional): Only run over bars [start, stop) of the preprocessed data.
+        """
+        assert self.data_stream is not None, "Data streams must be added before running the backtest"
+        df = self._profiled("preprocess_data", self.preprocess_data)()
+        self._next_bar = slice(start, stop).indices(len(df))[1]
+        if start is not None or stop is not None:
+            df = df.iloc[start:stop]
+        self.has_run = True
+
+        fields = {}
+        for field in df.columns.get_level_values(0).unique():
+            block = df[field].reindex(columns=self.symbols)
+            if all(dtype.kind in "biuf" for dtype in block.dtypes):
+                fields[field] = np.ascontiguousarray(block.to_numpy())
+        bar = CrossSection(self.symbols, fields, df.index)
+        before_step, strategy, after_step = self._step_functions()
+        with self._profiled_loop():
+            for i in range(len(df)):
+                bar.seek(i)
+                before_step(i, bar)
+                strategy(bar)
+                after_step(i, bar)
+
+    def _close_chunks(self, start: int, stop: int):
+        # one close line per symbol, trades of every symbol are drawn over them
+        yield self.data_stream["close"].reindex(columns=self.symbols).iloc[start:stop]
+
+    # work on a single data stream, calling them on the portfolio engine raises TypeError
+    def add_data_stream(self, data_stream: pd.DataFrame):
+        """Not supported, add the data of every symbol with add_data_streams()."""
+        self._unsupported("add_data_stream", "add the data of every symbol with add_data_streams()")
+
+    def add_data_source(self, data_source, chunk_size: int = 1_000_000, warmup_bars: int = 0):
+        """Not supported, the data of every symbol is held in memory."""
+        self._unsupported("add_data_source", "the aligned data of every symbol is held in memory")
+
+    def add_lower_timeframe(self, source, bar_duration=None):
+        """Not supported, ambiguous TP/SL bars are resolved with the stop loss."""
+        self._unsupported("add_lower_timeframe", "bars hitting both TP and SL are resolved with the stop loss")
+
+    def run_vectorized(self):
+        """Not supported, use run()."""
+        self._unsupported("run_vectorized", "use run()")
+
+    def run_incremental(self, new_bars, warmup_bars: int = 1000, row_cursor: bool = False):
+        """Not supported, add the bars with add_data_streams() and run() again."""
+        self._unsupported("run_incremental", "add the bars with add_data_streams() and run() again")
+
+    def sweep(self, param_choices: dict, constraints=None, vectorized_constraints=False, batch_size: int = 1024):
+        """Not supported, use optimize()."""
+        self._unsupported("sweep", "use optimize()")
+
+    @staticmethod
+    def _unsupported(method: str, alternative: str):
+        raise TypeError(f"{method}() is not supported by PortfolioBacktestEngine, {alternative}.")
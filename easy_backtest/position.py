@@ -2,7 +2,10 @@ from datetime import datetime
 
 
 class Position:
-    def __init__(self, quantity: float, open_price: float, commission: float, mode: str, tag: str = None, tp: float = None, sl: float = None, open_time: datetime = None, close_time: datetime = None):
+    # called with the position whenever tp or sl is set, e.g. by a PositionBook with scheduled exits
+    _on_levels_changed = None
+
+    def __init__(self, quantity: float, open_price: float, commission: float, mode: str, tag: str = None, tp: float = None, sl: float = None, open_time: datetime = None, close_time: datetime = None, symbol: str = None, validate: bool = True):
         """
         quantity: the quantity of the position
         open_price: the price at which the position is opened
@@ -11,6 +14,9 @@ class Position:
         tag: an optional tag for the position
         tp: the take profit price for the position
         sl: the stop loss price for the position
+        symbol: the instrument the position is on, for portfolio backtests
+        validate: checks that tp and sl are on the right side of the open price, turned off to restore
+            a position whose levels have moved since it was opened, e.g. a stop trailed past the entry
         """
         self.quantity = quantity
         self.open_price = open_price
@@ -18,12 +24,12 @@ class Position:
         assert mode in ["long", "short"], "Invalid position mode, must be 'long' or 'short'"
         self.mode = mode
         self.tag = tag
-        if mode == "long":
+        if validate and mode == "long":
             if tp:
                 assert tp > open_price, "Long position: take profit price must be greater than the open price"
             if sl:
                 assert sl < open_price, "Long position: Stop loss price must be less than the open price"
-        elif mode == "short":
+        elif validate and mode == "short":
             if tp:
                 assert tp < open_price, "Short position: take profit price must be less than the open price"
             if sl:
@@ -32,6 +38,27 @@ class Position:
         self.sl = sl
         self.open_time = open_time
         self.close_time = close_time
+        self.symbol = symbol
+
+    @property
+    def tp(self):
+        return self._tp
+
+    @tp.setter
+    def tp(self, value):
+        self._tp = value
+        if self._on_levels_changed is not None:
+            self._on_levels_changed(self)
+
+    @property
+    def sl(self):
+        return self._sl
+
+    @sl.setter
+    def sl(self, value):
+        self._sl = value
+        if self._on_levels_changed is not None:
+            self._on_levels_changed(self)
 
     def __repr__(self):
         return f"Position(quantity={self.quantity}, price={self.open_price}, commission={self.commission})"
@@ -1,14 +1,42 @@
 from datetime import datetime
+import heapq
+import itertools
 from .position_collection import PositionCollection
+from .position_store import PositionStore
 from .position import Position
+from .range_extrema import RangeExtrema
 from .trade_history import TradeHistory
 
 class PositionBook:
-    def __init__(self, commission: float, portfolio_size: float):
+    def __init__(self, commission: float, portfolio_size: float, columnar: bool = False, symbols: list = None, lower_timeframe=None):
+        """
+        commission: the commission charged for each position
+        portfolio_size: the starting portfolio size
+        columnar: keep open positions in a PositionStore (numpy columns) instead of a PositionCollection,
+                  which makes PnL and TP/SL checks vectorized when many positions are open at once
+        symbols: instruments positions can be opened on, prices can then be given as arrays aligned
+                 with symbols (requires columnar)
+        lower_timeframe: a LowerTimeframe telling which of TP and SL was hit first on bars where both are,
+                         instead of assuming the stop loss
+        """
+        assert columnar or not symbols, "Symbols require columnar positions"
         self.commission = commission
-        self.position_collection = PositionCollection()
-        self.trade_history = TradeHistory()
+        self.position_collection = PositionStore(symbols=symbols) if columnar else PositionCollection()
+        self.trade_history = TradeHistory(initial_portfolio=portfolio_size)
         self.portfolio_size = portfolio_size
+        self.lower_timeframe = lower_timeframe
+        # positions opened and fully closed so far, e.g. for the profiler
+        self.positions_opened = 0
+        self.positions_closed = 0
+        # scheduled TP/SL exits, see schedule_exits()
+        self._exit_index = None
+        self._exit_queue = []
+        self._exit_entries = {}
+        self._exit_order = itertools.count()
+        # the order each position was scheduled in, kept when it is rescheduled so exits due on the same
+        # bar close in the order the positions were opened, as when every position is checked per bar
+        self._exit_sequence = {}
+        self.current_bar = -1
 
     def get_portfolio_size(self):
         return self.portfolio_size
@@ -16,24 +44,45 @@ class PositionBook:
     def get_position_by_tag(self, tag: str):
         return self.position_collection.find_by_tag(tag)
 
-    def open_long_position(self, quantity: float, open_price: float, tag: str = None, tp: float = None, sl: float = None, open_time: datetime = None):
-        self.open_position(quantity=quantity, open_price=open_price, mode="long", tag=tag, tp=tp, sl=sl, open_time=open_time)
+    def get_positions_by_symbol(self, symbol: str):
+        if isinstance(self.position_collection, PositionStore):
+            return self.position_collection.by_symbol(symbol)
+        return [pos for pos in self.position_collection if pos.symbol == symbol]
 
+    def open_long_position(self, quantity: float, open_price: float, tag: str = None, tp: float = None, sl: float = None, open_time: datetime = None, symbol: str = None):
+        self.open_position(quantity=quantity, open_price=open_price, mode="long", tag=tag, tp=tp, sl=sl, open_time=open_time, symbol=symbol)
 
-    def open_short_position(self, quantity: float, open_price: float, tag: str = None, tp: float = None, sl: float = None, open_time: datetime = None):
-        self.open_position(quantity=quantity, open_price=open_price, mode="short", tag=tag, tp=tp, sl=sl, open_time=open_time)
 
-    def open_position(self, quantity: float, open_price: float, mode: str, tag: str = None, tp: float = None, sl: float = None, open_time: datetime = None):
+    def open_short_position(self, quantity: float, open_price: float, tag: str = None, tp: float = None, sl: float = None, open_time: datetime = None, symbol: str = None):
+        self.open_position(quantity=quantity, open_price=open_price, mode="short", tag=tag, tp=tp, sl=sl, open_time=open_time, symbol=symbol)
+
+    def open_position(self, quantity: float, open_price: float, mode: str, tag: str = None, tp: float = None, sl: float = None, open_time: datetime = None, symbol: str = None):
         """Opens a new position."""
-        pos = Position(quantity=quantity, open_price=open_price, commission=self.commission, mode=mode, tag=tag, tp=tp, sl=sl, open_time=open_time)
-        self.position_collection.add_position(pos)
+        pos = Position(quantity=quantity, open_price=open_price, commission=self.commission, mode=mode, tag=tag, tp=tp, sl=sl, open_time=open_time, symbol=symbol)
+        # a PositionStore hands out a view of the position it stores
+        pos = self.position_collection.add_position(pos) or pos
+        self.positions_opened += 1
+        self._schedule_exit(pos)
+
+    def update_tp_sl(self, tag: str, tp: float = None, sl: float = None):
+        """
+        Sets the take profit and stop loss of an open position, None removing them.
+        Same as setting pos.tp and pos.sl, which with scheduled exits searches the exit again.
+        """
+        pos = self.position_collection.find_by_tag(tag)
+        if pos is None:
+            raise ValueError(f"Position with tag '{tag}' not found.")
+        pos.tp, pos.sl = tp, sl
 
     def close_position(self, tag: str, close_price: float, close_amt: float = 1, close_time: datetime = None):
         """Closes a position with the given tag."""
         pos: Position = self.position_collection.find_by_tag(tag)
         if pos is None:
             raise ValueError(f"Position with tag '{tag}' not found.")
+        return self._close(pos, close_price=close_price, close_amt=close_amt, close_time=close_time)
 
+    def _close(self, pos: Position, close_price: float, close_amt: float = 1, close_time: datetime = None):
+        """Closes the given position and records the trade."""
         result = pos.close_position(close_price=close_price, close_amt=close_amt)
 
         # update the portfolio amount, note the result['pct'] represents the percentage pnl based on
@@ -44,7 +93,7 @@ class PositionBook:
         self.portfolio_size += profit_amt
         
         # add to trade history
-        self.trade_history.add_trade(
+        self.trade_history.record_trade(
             tag=pos.tag,
             mode=pos.mode,
             quantity=pos.quantity,
@@ -53,37 +102,155 @@ class PositionBook:
             profit=profit_amt,
             pct=percent_change,
             open_time=pos.open_time,
-            close_time=close_time
+            close_time=close_time,
+            symbol=pos.symbol
         )
 
 
         if close_amt == 1 or result["remaining"] == 0:
             self.position_collection.remove_position(pos)
+            self.positions_closed += 1
+            self._cancel_exit(pos)
+            self._exit_sequence.pop(id(pos), None)
+            pos._on_levels_changed = None
 
         return result
 
     def get_all_pnls(self, current_price: float):
         """Calculates the PnL for all open positions."""
+        if isinstance(self.position_collection, PositionStore):
+            positions, profits, pcts = self.position_collection.get_pnls(current_price)
+            return {pos.tag: {"profit": profit, "pct": pct} for pos, profit, pct in zip(positions, profits.tolist(), pcts.tolist())}
         return {pos.tag: pos.get_pnl(current_price) for pos in self.position_collection}
 
-    def incur_tp_sl(self, current_close: float, current_high: float, current_low: float, current_open: float, current_time: datetime):
-        """Closes positions based on take profit (TP) and stop loss (SL)."""
+    def get_unrealized_pnl(self, current_price: float):
+        """Calculates the total PnL of all open positions."""
+        if isinstance(self.position_collection, PositionStore):
+            return self.position_collection.unrealized_pnl(current_price)
+        return sum(pos.get_pnl(current_price)["profit"] for pos in self.position_collection)
+
+    def get_exposure(self, current_price: float):
+        """Calculates the gross and net notional of all open positions."""
+        if isinstance(self.position_collection, PositionStore):
+            return self.position_collection.exposure(current_price)
+        gross = sum(pos.quantity for pos in self.position_collection) * current_price
+        net = sum(pos.quantity if pos.is_long() else -pos.quantity for pos in self.position_collection) * current_price
+        return {"gross": gross, "net": net}
+
+    def get_margin(self, leverage: float = 1):
+        """Calculates the capital tied up by all open positions at their open price."""
+        if isinstance(self.position_collection, PositionStore):
+            return self.position_collection.margin(leverage)
+        return sum(pos.quantity * pos.open_price for pos in self.position_collection) / leverage
+
+    def schedule_exits(self, high, low, offset: int = 0):
+        """
+        Finds the TP/SL exit of each position when it opens instead of checking every position on every bar.
+
+        The exit bar of a position is known at entry from its TP/SL and the highs and lows that follow,
+        so it is searched once in a RangeExtrema index of high and low and queued. incur_tp_sl() then only
+        closes the positions due on its bar, and costs nothing on bars where no exit triggers.
+        Positions already open are scheduled from the first bar given.
+
+        Args:
+            high, low (array-like): Highs and lows of the bars to come.
+            offset (int): Bar number of high[0], the numbering incur_tp_sl() is called with. Positions
+                without an exit within these bars are scheduled again when the next bars are given.
+        """
+        self._exit_index = (RangeExtrema(high), RangeExtrema(low), offset)
+        self._exit_queue = []
+        self._exit_entries = {}
+        self._exit_sequence = {}
+        self.current_bar = offset - 1
+        for pos in self.position_collection:
+            self._schedule_exit(pos)
+
+    def _schedule_exit(self, pos: Position, start: int = None):
+        """Queues the first bar from start (by default the next bar) on which pos hits its SL or TP."""
+        if self._exit_index is None:
+            return
+        # setting pos.tp or pos.sl, e.g. to trail a stop, searches its exit again
+        pos._on_levels_changed = self._schedule_exit
+        self._cancel_exit(pos)
+        order = self._exit_sequence.get(id(pos))
+        if order is None:
+            order = self._exit_sequence[id(pos)] = next(self._exit_order)
+        # read once, fields of a PositionView are properties
+        tp, sl = pos.tp, pos.sl
+        if tp is None and sl is None:
+            return
+        high, low, offset = self._exit_index
+        start = (self.current_bar + 1 if start is None else start) - offset
+        # stop loss first, a take profit only counts when it triggers before or on the stop loss bar
+        if pos.is_long():
+            sl_bar = low.first_at_most(start, sl)
+            tp_bar = high.first_at_least(start, tp, sl_bar + 1)
+        else:
+            sl_bar = high.first_at_least(start, sl)
+            tp_bar = low.first_at_most(start, tp, sl_bar + 1)
+        due = min(sl_bar, tp_bar)
+        if due >= len(high):
+            return
+        # both on the same bar, the price is decided when the bar comes and its time is known
+        price = None if sl_bar == tp_bar else sl if sl_bar < tp_bar else tp
+        # a cancelled entry of the same position may still be queued, the fresh count keeps entries comparable
+        entry = [offset + due, order, next(self._exit_order), pos, price, tp, sl, True]
+        self._exit_entries[id(pos)] = entry
+        heapq.heappush(self._exit_queue, entry)
+
+    def _cancel_exit(self, pos: Position):
+        entry = self._exit_entries.pop(id(pos), None)
+        if entry is not None:
+            # left in the queue, skipped when popped
+            entry[-1] = False
+
+    def incur_tp_sl(self, current_close: float, current_high: float, current_low: float, current_open: float, current_time: datetime,
+                    bar: int = None):
+        """
+        Closes positions based on take profit (TP) and stop loss (SL).
+        With symbols, prices may be arrays aligned with them, each position is checked against its own symbol.
+        With scheduled exits (see schedule_exits()) and the bar number given, only the positions due on
+        that bar are closed.
+        """
+        if bar is not None and self._exit_index is not None:
+            self.current_bar = bar
+            queue = self._exit_queue
+            while queue and queue[0][0] <= bar:
+                _, _, _, pos, price, tp, sl, live = heapq.heappop(queue)
+                if not live:
+                    continue
+                del self._exit_entries[id(pos)]
+                if price is None:
+                    price = sl if self._stop_loss_first(pos, current_time, tp, sl) else tp
+                self._close(pos, close_price=price, close_amt=1, close_time=current_time)
+            return
+        if isinstance(self.position_collection, PositionStore):
+            stop_loss_first = None
+            if self.lower_timeframe is not None:
+                stop_loss_first = lambda pos: self._stop_loss_first(pos, current_time, pos.tp, pos.sl)
+            for pos, close_price in self.position_collection.triggered(current_high, current_low, stop_loss_first):
+                self._close(pos, close_price=close_price, close_amt=1, close_time=current_time)
+            return
         for pos in list(self.position_collection):
-            # Check stop loss first
-            if pos.sl is not None:
-                if pos.is_long() and current_low <= pos.sl:
-                    self.close_position(tag=pos.tag, close_price=pos.sl, close_amt=1, close_time=current_time)
-                    continue  # Position closed, skip TP check
-                elif pos.is_short() and current_high >= pos.sl:
-                    self.close_position(tag=pos.tag, close_price=pos.sl, close_amt=1, close_time=current_time)
-                    continue  # Position closed, skip TP check
-            
+            # read once, tp and sl are properties
+            tp, sl = pos.tp, pos.sl
+            tp_hit = tp is not None and (current_high >= tp if pos.is_long() else current_low <= tp)
+            # Check stop loss first, unless the lower timeframe shows the take profit was hit before it
+            if sl is not None:
+                if (pos.is_long() and current_low <= sl) or (pos.is_short() and current_high >= sl):
+                    if not tp_hit or self._stop_loss_first(pos, current_time, tp, sl):
+                        self.close_position(tag=pos.tag, close_price=sl, close_amt=1, close_time=current_time)
+                        continue  # Position closed, skip TP check
+
             # Check take profit if position wasn't closed by SL
-            if pos.tp is not None:
-                if pos.is_long() and current_high >= pos.tp:
-                    self.close_position(tag=pos.tag, close_price=pos.tp, close_amt=1, close_time=current_time)
-                elif pos.is_short() and current_low <= pos.tp:
-                    self.close_position(tag=pos.tag, close_price=pos.tp, close_amt=1, close_time=current_time)
+            if tp_hit:
+                self.close_position(tag=pos.tag, close_price=tp, close_amt=1, close_time=current_time)
+
+    def _stop_loss_first(self, pos: Position, current_time: datetime, tp: float, sl: float) -> bool:
+        """Whether pos hit its stop loss before its take profit on a bar where both are hit."""
+        if self.lower_timeframe is None:
+            return True
+        return self.lower_timeframe.stop_loss_first(current_time, pos.is_long(), tp, sl)
 
     def __repr__(self):
         return f"Positions(position_collection={self.position_collection}, trade_history={self.trade_history})"
@@ -2,31 +2,50 @@ from typing import List, Optional
 from .position import Position
 
 class PositionCollection:
+    """
+    Open positions in insertion order, with a tag index so lookups and removals take constant time.
+    Tags must be unique among open positions. Untagged positions are allowed but can only be
+    reached by iterating the collection.
+    """
+
     def __init__(self):
-        self.positions: List[Position] = []
+        # id(position) -> position, dicts keep insertion order and delete in constant time
+        self._positions: dict = {}
+        self._tags: dict = {}
+
+    @property
+    def positions(self) -> List[Position]:
+        return list(self._positions.values())
 
     def add_position(self, position: Position):
         """Adds a new position to the collection."""
-        self.positions.append(position)
+        if position.tag is not None:
+            if position.tag in self._tags:
+                raise ValueError(f"Position with tag '{position.tag}' already exists.")
+            self._tags[position.tag] = position
+        self._positions[id(position)] = position
 
     def remove_position(self, position: Position):
         """Removes a position from the collection."""
-        self.positions.remove(position)
+        if self._positions.pop(id(position), None) is None:
+            raise ValueError(f"{position} is not in the collection.")
+        if position.tag is not None:
+            del self._tags[position.tag]
 
     def find_by_tag(self, tag: str) -> Optional[Position]:
         """Finds a position by its tag."""
-        for position in self.positions:
-            if position.tag == tag:
-                return position
-        return None
+        if tag is None:
+            return next((position for position in self._positions.values() if position.tag is None), None)
+        return self._tags.get(tag)
 
     def __len__(self):
-        return len(self.positions)
+        return len(self._positions)
 
     def __getitem__(self, index):
         return self.positions[index]
 
     def __iter__(self):
+        # iterate over a snapshot so positions can be closed while iterating
         return iter(self.positions)
 
     def __repr__(self):
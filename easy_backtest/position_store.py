@@ -0,0 +1,236 @@
+from types import SimpleNamespace
+from typing import Optional
+import numpy as np
+from .position import Position
+
+LONG = 1
+SHORT = -1
+
+
+def _column(name: str, to_python=float, to_column=None, notify: bool = False):
+    """
+    Property reading and writing one field of a PositionView from its store's column.
+    With notify, setting it calls the view's _on_levels_changed, as Position does for tp and sl.
+    """
+    def getter(self):
+        return to_python(getattr(self._store, name)[self._slot])
+
+    def setter(self, value):
+        getattr(self._store, name)[self._slot] = value if to_column is None else to_column(value)
+        if notify and self._on_levels_changed is not None:
+            self._on_levels_changed(self)
+
+    return property(getter, setter)
+
+
+def _optional_price(value):
+    return None if np.isnan(value) else float(value)
+
+
+class PositionView(Position):
+    """
+    A Position whose fields live in the columns of a PositionStore.
+    It behaves like a regular Position, reads and writes go straight to the store's arrays.
+    """
+    quantity = _column("quantity")
+    open_price = _column("open_price")
+    commission = _column("commission")
+    mode = _column("mode", to_python=lambda value: "long" if value == LONG else "short",
+                   to_column=lambda value: LONG if value == "long" else SHORT)
+    tp = _column("tp", to_python=_optional_price, to_column=lambda value: np.nan if value is None else value, notify=True)
+    sl = _column("sl", to_python=_optional_price, to_column=lambda value: np.nan if value is None else value, notify=True)
+    open_time = _column("open_time", to_python=lambda value: value)
+
+    def __init__(self, store, slot: int, position: Position):
+        self._store = store
+        self._slot = slot
+        super().__init__(quantity=position.quantity, open_price=position.open_price, commission=position.commission,
+                         mode=position.mode, tag=position.tag, tp=position.tp, sl=position.sl,
+                         open_time=position.open_time, close_time=position.close_time, symbol=position.symbol,
+                         validate=False)
+
+
+class PositionStore:
+    """
+    Struct-of-arrays alternative to PositionCollection, for strategies holding many positions at once.
+
+    quantity, open_price, commission, mode, tp, sl and open_time are kept in growable numpy columns,
+    so PnL, exposure, margin and TP/SL checks for every open position are one vectorized expression.
+    Positions are handed out as PositionView objects, which keep the Position API.
+    Removed positions leave a hole that is reclaimed when the store grows, so slots keep insertion order.
+
+    With a list of symbols, each position's symbol is stored as its index in that list, and prices
+    can be given as arrays aligned with the symbols: every position is then valued at its own
+    symbol's price, in the same vectorized expression.
+    """
+
+    def __init__(self, capacity: int = 64, symbols: list = None):
+        self._size = 0
+        self._count = 0
+        self._views: list = []
+        self._tags: dict = {}
+        self.symbols = list(symbols or [])
+        self._symbol_codes = {symbol: code for code, symbol in enumerate(self.symbols)}
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.quantity = np.zeros(capacity)
+        self.open_price = np.zeros(capacity)
+        self.commission = np.zeros(capacity)
+        self.mode = np.zeros(capacity, dtype=np.int8)
+        self.tp = np.full(capacity, np.nan)
+        self.sl = np.full(capacity, np.nan)
+        self.open_time = np.empty(capacity, dtype=object)
+        # index in symbols, -1 for positions without a symbol
+        self.symbol_code = np.full(capacity, -1, dtype=np.int32)
+
+    _COLUMNS = ("alive", "quantity", "open_price", "commission", "mode", "tp", "sl", "open_time", "symbol_code")
+
+    def _reserve_slot(self) -> int:
+        if self._size == len(self.alive):
+            if self._count <= self._size // 2:
+                self._compact()
+            else:
+                for name in self._COLUMNS:
+                    column = getattr(self, name)
+                    grown = np.zeros(2 * len(column), dtype=column.dtype)
+                    grown[:len(column)] = column
+                    setattr(self, name, grown)
+        self._size += 1
+        return self._size - 1
+
+    def _compact(self):
+        """Moves the open positions to the front of the columns, keeping their order."""
+        slots = self._live_slots()
+        for name in self._COLUMNS:
+            column = getattr(self, name)
+            column[:len(slots)] = column[slots]
+        self.alive[len(slots):] = False
+        self._views = [self._views[slot] for slot in slots]
+        for slot, view in enumerate(self._views):
+            view._slot = slot
+        self._size = len(slots)
+
+    def _live_slots(self) -> np.ndarray:
+        return np.flatnonzero(self.alive[:self._size])
+
+    def add_position(self, position: Position) -> PositionView:
+        """Adds a new position to the store and returns its view."""
+        if position.tag is not None and position.tag in self._tags:
+            raise ValueError(f"Position with tag '{position.tag}' already exists.")
+        if position.symbol is not None and position.symbol not in self._symbol_codes:
+            raise ValueError(f"Unknown symbol '{position.symbol}'.")
+        slot = self._reserve_slot()
+        self.alive[slot] = True
+        self.symbol_code[slot] = self._symbol_codes.get(position.symbol, -1)
+        self._count += 1
+        view = PositionView(self, slot, position)
+        if slot == len(self._views):
+            self._views.append(view)
+        else:
+            self._views[slot] = view
+        if position.tag is not None:
+            self._tags[position.tag] = view
+        return view
+
+    def remove_position(self, position: Position):
+        """Removes a position from the store. The view keeps a copy of its last values."""
+        view = position if isinstance(position, PositionView) and position._store is self else self._tags.get(position.tag)
+        if view is None or view._store is not self:
+            raise ValueError(f"{position} is not in the store.")
+        slot = view._slot
+        self.alive[slot] = False
+        self._count -= 1
+        self._views[slot] = None
+        if view.tag is not None:
+            del self._tags[view.tag]
+        view._store = SimpleNamespace(**{name: getattr(self, name)[slot:slot + 1].copy() for name in self._COLUMNS})
+        view._slot = 0
+
+    def find_by_tag(self, tag: str) -> Optional[PositionView]:
+        """Finds a position by its tag."""
+        if tag is None:
+            return next((view for view in self if view.tag is None), None)
+        return self._tags.get(tag)
+
+    def _arrays(self):
+        slots = self._live_slots()
+        return slots, self.quantity[slots], self.open_price[slots], self.commission[slots], self.mode[slots]
+
+    def _prices(self, price, slots) -> np.ndarray:
+        """The price of each position in slots, price being a scalar or an array aligned with symbols."""
+        if np.ndim(price) == 0:
+            return price
+        codes = self.symbol_code[slots]
+        # NaN for positions without a symbol, so they never trigger nor count
+        return np.where(codes >= 0, np.asarray(price, dtype=np.float64)[np.maximum(codes, 0)], np.nan)
+
+    def get_pnls(self, current_price):
+        """
+        Returns the PnL of every open position, in the same terms as Position.get_pnl.
+
+        Returns:
+            tuple: (positions, profit, pct) where profit and pct are numpy arrays aligned with positions.
+        """
+        slots, quantity, open_price, commission, mode = self._arrays()
+        move = (self._prices(current_price, slots) - open_price) * mode * (1 - commission)
+        return [self._views[slot] for slot in slots], move * quantity, move / open_price
+
+    def unrealized_pnl(self, current_price) -> float:
+        """Total PnL of all open positions if they were closed at current_price."""
+        slots, quantity, open_price, commission, mode = self._arrays()
+        return float(np.nansum((self._prices(current_price, slots) - open_price) * mode * (1 - commission) * quantity))
+
+    def exposure(self, current_price) -> dict:
+        """Gross (long + short) and net (long - short) notional of all open positions at current_price."""
+        slots, quantity, _, _, mode = self._arrays()
+        notional = quantity * self._prices(current_price, slots)
+        return {"gross": float(np.nansum(notional)), "net": float(np.nansum(notional * mode))}
+
+    def margin(self, leverage: float = 1) -> float:
+        """Capital tied up by all open positions, based on their notional at the open price."""
+        _, quantity, open_price, _, _ = self._arrays()
+        return float(np.sum(quantity * open_price) / leverage)
+
+    def triggered(self, current_high, current_low, stop_loss_first=None):
+        """
+        Finds the positions whose stop loss or take profit is hit within the given range.
+        As in PositionBook.incur_tp_sl, the stop loss wins when both are hit, unless
+        stop_loss_first(position) says otherwise for the positions where both are.
+        With arrays of highs and lows aligned with symbols, each position is checked against its symbol's bar.
+
+        Returns:
+            list: (position, close_price) pairs in insertion order.
+        """
+        n = self._size
+        alive, mode, tp, sl = self.alive[:n], self.mode[:n], self.tp[:n], self.sl[:n]
+        if np.ndim(current_high) or np.ndim(current_low):
+            slots = slice(0, n)
+            current_high, current_low = self._prices(current_high, slots), self._prices(current_low, slots)
+        long = mode == LONG
+        sl_hit = alive & np.where(long, current_low <= sl, current_high >= sl)
+        tp_reached = alive & np.where(long, current_high >= tp, current_low <= tp)
+        if stop_loss_first is not None:
+            for slot in np.flatnonzero(sl_hit & tp_reached):
+                sl_hit[slot] = stop_loss_first(self._views[slot])
+        tp_hit = tp_reached & ~sl_hit
+        return [(self._views[slot], float(sl[slot] if sl_hit[slot] else tp[slot]))
+                for slot in np.flatnonzero(sl_hit | tp_hit)]
+
+    def by_symbol(self, symbol) -> list:
+        """Open positions on the given symbol, in insertion order."""
+        code = self._symbol_codes.get(symbol)
+        if code is None:
+            return []
+        slots = np.flatnonzero(self.alive[:self._size] & (self.symbol_code[:self._size] == code))
+        return [self._views[slot] for slot in slots]
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        return self._views[self._live_slots()[index]]
+
+    def __iter__(self):
+        return iter([self._views[slot] for slot in self._live_slots()])
+
+    def __repr__(self):
+        return f"PositionStore(positions={list(self)})"
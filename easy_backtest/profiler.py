@@ -0,0 +1,117 @@
+from collections import deque
+import gc
+import sys
+import time
+import numpy as np
+
+
+class _Phase:
+    __slots__ = ("calls", "total_ns", "samples")
+
+    def __init__(self, max_samples: int):
+        self.calls = 0
+        self.total_ns = 0
+        self.samples = deque(maxlen=max_samples)
+
+
+class PhaseProfiler:
+    """
+    Timings of the phases of a backtest: preprocess_data, before_step, strategy, after_step and
+    get_stats, with bars per second, positions opened and closed, and allocations over the bar loop.
+
+    Enabled with BacktestEngine.enable_profiling(), the engine then calls wrapped versions of its
+    methods. Every call adds to its phase's cumulative time, and every sample_every-th call's duration
+    is kept for percentiles. When profiling is disabled the methods are called as they are, so the
+    bar loop costs the same as without this class.
+    """
+
+    def __init__(self, sample_every: int = 64, max_samples: int = 100_000):
+        assert sample_every > 0, "sample_every must be positive"
+        self.sample_every = sample_every
+        self.max_samples = max_samples
+        self.reset()
+
+    def reset(self):
+        """Clears everything recorded so far."""
+        self.phases = {}
+        self.loop_ns = 0
+        self.positions_opened = 0
+        self.positions_closed = 0
+        self.allocated_blocks = 0
+        self.gc_collections = [0, 0, 0]
+        self._began = None
+
+    def _phase(self, name: str) -> _Phase:
+        if name not in self.phases:
+            self.phases[name] = _Phase(self.max_samples)
+        return self.phases[name]
+
+    def wrap(self, name: str, fn):
+        """fn timed as the phase name."""
+        phase = self._phase(name)
+        every = self.sample_every
+        clock = time.perf_counter_ns
+
+        def timed(*args, **kwargs):
+            began = clock()
+            result = fn(*args, **kwargs)
+            elapsed = clock() - began
+            phase.calls += 1
+            phase.total_ns += elapsed
+            if phase.calls % every == 0:
+                phase.samples.append(elapsed)
+            return result
+
+        return timed
+
+    def begin(self, position_book):
+        """Marks the start of a bar loop."""
+        self._began = (time.perf_counter_ns(), sys.getallocatedblocks(), [stats["collections"] for stats in gc.get_stats()],
+                       position_book.positions_opened, position_book.positions_closed)
+
+    def end(self, position_book):
+        """Marks the end of the bar loop started by begin()."""
+        began, blocks, collections, opened, closed = self._began
+        self.loop_ns += time.perf_counter_ns() - began
+        # blocks still allocated at the end of the loop, e.g. trades recorded and objects kept in states
+        self.allocated_blocks += sys.getallocatedblocks() - blocks
+        for generation, stats in enumerate(gc.get_stats()):
+            self.gc_collections[generation] += stats["collections"] - collections[generation]
+        self.positions_opened += position_book.positions_opened - opened
+        self.positions_closed += position_book.positions_closed - closed
+        self._began = None
+
+    def report(self) -> dict:
+        """
+        Returns:
+            dict: "bars", "loop_s", "bars_per_sec", "positions_opened", "positions_closed",
+                "allocated_blocks" (net, over the bar loops), "gc_collections" (per generation) and
+                "phases", with per phase "calls", "total_s", "mean_us" and, over the sampled calls,
+                "p50_us", "p99_us" and "max_us". Only plain numbers, so it can be stored as JSON.
+        """
+        phases = {}
+        for name, phase in self.phases.items():
+            samples = np.fromiter(phase.samples, dtype=np.float64, count=len(phase.samples)) / 1e3
+            p50, p99, peak = (np.percentile(samples, 50), np.percentile(samples, 99), samples.max()) if len(samples) else (0.0, 0.0, 0.0)
+            phases[name] = {
+                "calls": phase.calls,
+                "total_s": phase.total_ns / 1e9,
+                "mean_us": phase.total_ns / phase.calls / 1e3 if phase.calls else 0.0,
+                "p50_us": float(p50),
+                "p99_us": float(p99),
+                "max_us": float(peak),
+            }
+        bars = self.phases["strategy"].calls if "strategy" in self.phases else 0
+        return {
+            "bars": bars,
+            "loop_s": self.loop_ns / 1e9,
+            "bars_per_sec": bars / (self.loop_ns / 1e9) if self.loop_ns else 0.0,
+            "positions_opened": self.positions_opened,
+            "positions_closed": self.positions_closed,
+            "allocated_blocks": self.allocated_blocks,
+            "gc_collections": list(self.gc_collections),
+            "phases": phases,
+        }
+
+    def __repr__(self):
+        return f"PhaseProfiler(phases={list(self.phases)}, loop_s={self.loop_ns / 1e9:.3f})"
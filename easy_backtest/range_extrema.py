@@ -0,0 +1,71 @@
+import numpy as np
+
+
+class RangeExtrema:
+    """
+    Block maxima and minima of a series, to find the first element crossing a threshold after a given
+    position without scanning every element in between.
+
+    Level 0 is the series itself and each level above holds the maximum (and minimum) of BLOCK_SIZE
+    consecutive elements of the level below, so the levels take about 1/(BLOCK_SIZE - 1) of the series'
+    memory on top of it. A search climbs the levels until a block crossing the threshold is found, then
+    descends into it, looking at no more than BLOCK_SIZE elements per level: O(log n) array operations
+    whatever the distance to the crossing. NaNs, e.g. missing bars, never cross.
+    """
+
+    BLOCK_SIZE = 64
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        assert values.ndim == 1, "RangeExtrema takes a 1-D series"
+        self._max = [values]
+        self._min = [values]
+        while len(self._max[-1]) > self.BLOCK_SIZE:
+            starts = np.arange(0, len(self._max[-1]), self.BLOCK_SIZE)
+            # fmax/fmin skip NaNs, a block of NaNs stays NaN and never crosses
+            self._max.append(np.fmax.reduceat(self._max[-1], starts))
+            self._min.append(np.fmin.reduceat(self._min[-1], starts))
+        self._lengths = [len(level) for level in self._max]
+
+    def __len__(self):
+        return len(self._max[0])
+
+    def _first(self, levels: list, start: int, stop: int, crosses, threshold: float) -> int:
+        block = self.BLOCK_SIZE
+        lengths = self._lengths
+        stop = lengths[0] if stop is None else min(stop, lengths[0])
+        if start >= stop:
+            return stop
+        level, position = 0, start
+        # climb: look at the rest of the current block at each level, then move on to the blocks after it
+        while True:
+            end = min((position // block + 1) * block, lengths[level])
+            hits = crosses(levels[level][position:end], threshold)
+            found = int(hits.argmax())
+            if hits[found]:
+                found += position
+                break
+            if end == lengths[level] or level + 1 == len(levels):
+                return stop
+            level, position = level + 1, end // block
+            # blocks starting at or past stop can't hold an earlier crossing
+            if position * block ** level >= stop:
+                return stop
+        # descend: the first crossing element of the block found at each level
+        while level:
+            level -= 1
+            first = found * block
+            found = first + int(crosses(levels[level][first:first + block], threshold).argmax())
+        return min(found, stop)
+
+    def first_at_least(self, start: int, threshold: float, stop: int = None) -> int:
+        """Returns the first position in [start, stop) whose value is >= threshold, or stop if none is."""
+        if threshold is None or threshold != threshold:
+            return len(self) if stop is None else min(stop, len(self))
+        return self._first(self._max, start, stop, np.greater_equal, threshold)
+
+    def first_at_most(self, start: int, threshold: float, stop: int = None) -> int:
+        """Returns the first position in [start, stop) whose value is <= threshold, or stop if none is."""
+        if threshold is None or threshold != threshold:
+            return len(self) if stop is None else min(stop, len(self))
+        return self._first(self._min, start, stop, np.less_equal, threshold)
@@ -0,0 +1,200 @@
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import tempfile
+from .fingerprint import fingerprint_frame
+from .trade_history import TradeHistory
+
+# strategy class -> hash of its source, classes don't change within a process
+_source_hashes: dict = {}
+
+
+def strategy_source_hash(cls) -> str:
+    """Hash of the source of a strategy class and of its bases up to, not including, BacktestEngine."""
+    cached = _source_hashes.get(cls)
+    if cached is not None:
+        return cached
+    digest = hashlib.blake2b(digest_size=16)
+    for base in cls.__mro__:
+        if base is object or base.__module__ == "abc" or base.__module__.startswith("easy_backtest."):
+            continue
+        try:
+            digest.update(inspect.getsource(base).encode())
+        except (OSError, TypeError):
+            # e.g. classes defined in an interactive session, fall back on their name
+            digest.update(f"{base.__module__}.{base.__qualname__}".encode())
+    _source_hashes[cls] = digest.hexdigest()
+    return _source_hashes[cls]
+
+
+class ResultCache:
+    """
+    Persistent, content-addressed cache of backtest results, one pickle file per result in a directory.
+
+    Results are keyed by the fingerprints of the data streams, the source of the strategy class, its
+    strategy_version attribute, the commission, the portfolio size, the parameters and the other states,
+    the chunking of a data source and whether exits are scheduled, so a changed input never hits a
+    stale entry. Stats are always stored, trade histories only with store_trades.
+    When the directory grows past max_bytes, least recently used entries are removed. Writes are
+    atomic, so worker processes can share a cache directory.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 1024 ** 3, store_trades: bool = False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.store_trades = store_trades
+        self.hits = 0
+        self.misses = 0
+        # estimate of the directory size, refreshed by scanning whenever it exceeds max_bytes
+        self._nbytes = None
+        os.makedirs(directory, exist_ok=True)
+
+    def __getstate__(self):
+        # the size estimate and counters are per process
+        state = self.__dict__.copy()
+        state.update(_nbytes=None, hits=0, misses=0)
+        return state
+
+    def key(self, engine, params: dict, stop: int = None, start: int = None) -> str:
+        """Content key of running engine with params, over bars [start, stop) if given."""
+        strategy = type(engine)
+        parts = {
+            "strategy": f"{strategy.__module__}.{strategy.__qualname__}",
+            "source": strategy_source_hash(strategy),
+            "version": getattr(engine, "strategy_version", None),
+            "commission": engine.commission,
+            "portfolio_size": engine._portfolio_size,
+            "params": params,
+            "stop": stop,
+            # only the columns given to add_data_stream, preprocess_data may have added others
+            "data": self._data_fingerprint(engine),
+            "other_data": {name: fingerprint_frame(df) for name, df in sorted(engine.other_data_steams.items())},
+        }
+        if start is not None:
+            # only in keys of ranged runs, so keys of whole runs stay as they were
+            parts["start"] = start
+        states = {name: value for name, value in engine.states.items() if name != "params"}
+        if states:
+            # states other than the parameters can change a run too, e.g. a position size
+            parts["states"] = hashlib.blake2b(pickle.dumps(states, protocol=pickle.HIGHEST_PROTOCOL), digest_size=20).hexdigest()
+        if getattr(engine, "data_source", None) is not None:
+            # indicators at the edges of chunks depend on the chunking and warm-up
+            parts["chunking"] = [engine._chunk_size, engine._warmup_bars]
+        if getattr(engine, "_scheduled_exits", False):
+            # exits due on the same bar may be recorded in another order
+            parts["scheduled_exits"] = True
+        lower_timeframe = getattr(engine, "lower_timeframe", None)
+        if lower_timeframe is not None:
+            # resolves bars hitting both TP and SL, likewise only in the keys of runs using one
+            parts["lower_timeframe"] = [lower_timeframe.source.fingerprint(), str(lower_timeframe.bar_duration)]
+        return hashlib.blake2b(json.dumps(parts, sort_keys=True, default=str).encode(), digest_size=20).hexdigest()
+
+    @staticmethod
+    def _data_fingerprint(engine) -> str:
+        data_source = getattr(engine, "data_source", None)
+        if data_source is not None:
+            return data_source.fingerprint()
+        return fingerprint_frame(engine.data_stream, getattr(engine, "_data_columns", None))
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key: str):
+        """
+        Returns:
+            tuple: (stats, trade history or None) for a hit, None for a miss.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as entry_file:
+                entry = pickle.load(entry_file)
+            # bump the entry for LRU eviction
+            os.utime(path)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        trades = TradeHistory.from_arrays(entry["trades"]) if entry["trades"] is not None else None
+        return entry["stats"], trades
+
+    def put(self, key: str, engine, stats: dict, trade_history: TradeHistory = None):
+        """Stores the stats of a run, and its trades if store_trades is set."""
+        strategy = type(engine)
+        entry = {
+            "strategy": f"{strategy.__module__}.{strategy.__qualname__}",
+            "version": getattr(engine, "strategy_version", None),
+            "stats": stats,
+            "trades": trade_history.to_arrays() if self.store_trades and trade_history is not None else None,
+        }
+        handle, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(handle, "wb") as entry_file:
+            pickle.dump(entry, entry_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(key))
+
+        if self._nbytes is None:
+            self._nbytes = self._scan()[1]
+        else:
+            self._nbytes += os.path.getsize(self._path(key))
+        if self._nbytes > self.max_bytes:
+            self._evict()
+
+    def _scan(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pkl"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries, sum(size for _, size, _ in entries)
+
+    def _evict(self):
+        """Removes the least recently used entries until the cache fits in max_bytes."""
+        entries, total = self._scan()
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        self._nbytes = total
+
+    def invalidate(self, strategy=None, keep_version=None) -> int:
+        """
+        Removes the entries of a strategy, or every entry if strategy is None.
+
+        Args:
+            strategy (type or str, optional): Strategy class, or its "module.qualname".
+            keep_version (optional): Keep the entries whose strategy_version equals this.
+
+        Returns:
+            int: Number of entries removed.
+        """
+        if isinstance(strategy, type):
+            strategy = f"{strategy.__module__}.{strategy.__qualname__}"
+        removed = 0
+        for _, _, path in self._scan()[0]:
+            try:
+                with open(path, "rb") as entry_file:
+                    entry = pickle.load(entry_file)
+            except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+                continue
+            if strategy is not None and entry["strategy"] != strategy:
+                continue
+            if keep_version is not None and entry["version"] == keep_version:
+                continue
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        self._nbytes = None
+        return removed
+
+    def __repr__(self):
+        return f"ResultCache(directory={self.directory!r}, max_bytes={self.max_bytes}, store_trades={self.store_trades})"
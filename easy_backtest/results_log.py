@@ -0,0 +1,80 @@
+import json
+import os
+import pandas as pd
+
+
+def params_key(params: dict) -> str:
+    """Canonical key of a parameter set, as used to find the combinations already in a log."""
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+class ResultsLog:
+    """
+    Append-only JSON Lines log of optimization results, one result dict per line.
+
+    Each result is written and flushed as soon as it completes, so an interrupted optimization
+    loses at most the combinations still running, and a later run with the same log can skip the
+    parameter sets already done. A line cut short by a crash is dropped when the log is reopened.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._repair()
+
+    def _repair(self):
+        """Truncates a partially written last line, so appended results start on a fresh line."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as log_file:
+            data = log_file.read()
+            if data and not data.endswith(b"\n"):
+                log_file.truncate(data.rfind(b"\n") + 1)
+
+    def append(self, result: dict):
+        with open(self.path, "a") as log_file:
+            log_file.write(json.dumps(result, default=str) + "\n")
+
+    def _lines(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as log_file:
+            for line in log_file:
+                if line.strip():
+                    yield line
+
+    def completed(self) -> set:
+        """Keys of the parameter sets in the log, see params_key()."""
+        return {params_key(json.loads(line)["params"]) for line in self._lines()}
+
+    @staticmethod
+    def _decode(line: str) -> dict:
+        result = json.loads(line)
+        # written with str() since JSON has no timedelta
+        if isinstance(result.get("average_holding_period"), str):
+            result["average_holding_period"] = pd.Timedelta(result["average_holding_period"])
+        return result
+
+    def read(self, rows=None) -> list:
+        """
+        Returns the result dicts of the log, or only those at the given row numbers.
+        """
+        if rows is None:
+            return [self._decode(line) for line in self._lines()]
+        rows = set(int(row) for row in rows)
+        return [self._decode(line) for row, line in enumerate(self._lines()) if row in rows]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Loads the log into a DataFrame with one row per result, parameters being expanded
+        into "params.<name>" columns.
+        """
+        df = pd.json_normalize(self.read())
+        if "average_holding_period" in df:
+            df["average_holding_period"] = pd.to_timedelta(df["average_holding_period"], errors="coerce")
+        return df
+
+    def __len__(self):
+        return sum(1 for _ in self._lines())
+
+    def __repr__(self):
+        return f"ResultsLog(path={self.path!r})"
@@ -0,0 +1,88 @@
+import collections
+import numpy as np
+import pandas as pd
+
+
+def _extract(values):
+    """Extracts a column (or the index) into a contiguous numpy array and a function boxing a slice of it."""
+    if isinstance(values.dtype, pd.DatetimeTZDtype) or np.issubdtype(values.dtype, np.datetime64):
+        datetimes = pd.DatetimeIndex(values)
+        return np.ascontiguousarray(datetimes.asi8), lambda start, stop: list(datetimes[start:stop])
+    array = np.ascontiguousarray(values.to_numpy())
+    return array, lambda start, stop: array[start:stop].tolist()
+
+
+def _compile_iterator(fields):
+    """
+    Compiles a generator assigning each row's values straight into the cursor's slots. zip() reuses
+    its result tuple once it has been unpacked, so advancing the cursor allocates nothing per row.
+    """
+    targets = "".join(f"row.{name}, " for name in fields)
+    source = (
+        "def iterate(row, blocks):\n"
+        f"    for {targets}in zip(*blocks):\n"
+        "        yield row\n"
+    )
+    namespace = {}
+    exec(source, namespace)
+    return namespace["iterate"]
+
+
+class RowCursor:
+    """
+    A reusable row view over a DataFrame, used by run(row_cursor=True) in place of itertuples().
+
+    The index and every column are extracted once into contiguous NumPy arrays, available in
+    `arrays`. The cursor exposes the current row under the same attribute names itertuples()
+    would use (row.Index, row.close, ...), stored in __slots__ that are overwritten as the
+    cursor advances. Values are boxed into Python objects a block of rows at a time.
+    Note that the same cursor object is yielded for every row: copy values out instead of
+    keeping a reference to the row.
+    """
+    __slots__ = ()
+    BLOCK_SIZE = 4096
+    _fields = ()
+    _length = 0
+    _boxers = ()
+    _iterate = None
+    arrays = {}
+
+    @classmethod
+    def for_frame(cls, df: pd.DataFrame) -> "RowCursor":
+        """Creates a cursor over df with one attribute per column, named as itertuples() names them."""
+        fields = collections.namedtuple("Row", ["Index", *df.columns], rename=True)._fields
+        columns = [df.index, *(df.iloc[:, k] for k in range(df.shape[1]))]
+        arrays, boxers = {}, []
+        for name, values in zip(fields, columns):
+            arrays[name], boxer = _extract(values)
+            boxers.append(boxer)
+        namespace = {
+            "__slots__": fields,
+            "_fields": fields,
+            "_length": len(df),
+            "_boxers": tuple(boxers),
+            "_iterate": staticmethod(_compile_iterator(fields)),
+            "arrays": arrays,
+        }
+        return type("Row", (cls,), namespace)()
+
+    def seek(self, i: int):
+        """Moves the cursor to the i-th row."""
+        for name, boxer in zip(self._fields, self._boxers):
+            setattr(self, name, boxer(i, i + 1)[0])
+        return self
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for start in range(0, self._length, self.BLOCK_SIZE):
+            stop = min(start + self.BLOCK_SIZE, self._length)
+            yield from self._iterate(self, [boxer(start, stop) for boxer in self._boxers])
+
+    def _asdict(self):
+        return {name: getattr(self, name) for name in self._fields}
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self._fields)
+        return f"Row({values})"
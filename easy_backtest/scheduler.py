@@ -0,0 +1,85 @@
+from concurrent.futures import FIRST_COMPLETED, wait
+import itertools
+import math
+import time
+
+
+def _run_chunk(fn, chunk):
+    """Runs fn over a chunk of items in a worker, and times it so the scheduler can size the next chunks."""
+    start = time.perf_counter()
+    results = [fn(item) for item in chunk]
+    return results, time.perf_counter() - start
+
+
+class ChunkedScheduler:
+    """
+    Feeds items to an executor in chunks, with a bounded number of chunks in flight.
+
+    Items are pulled lazily from their iterator, so neither the items nor their futures are all held
+    in memory, and results are handed back as soon as their chunk completes. The chunk size adapts
+    to the measured time per item, aiming at target_seconds of work per chunk: small enough to keep
+    every worker busy and progress moving, large enough to amortise the cost of each submission.
+    """
+
+    def __init__(self, executor, max_workers: int, target_seconds: float = 0.5, in_flight_per_worker: int = 2,
+                 max_chunk_size: int = 1024):
+        assert max_workers > 0, "max_workers must be positive"
+        self.executor = executor
+        self.max_workers = max_workers
+        self.target_seconds = target_seconds
+        self.max_in_flight = max_workers * in_flight_per_worker
+        self.max_chunk_size = max_chunk_size
+        # start with single items to get a first measurement quickly
+        self.chunk_size = 1
+        self.seconds_per_item = None
+
+    def _observe(self, items: int, elapsed: float):
+        per_item = elapsed / items
+        # exponential moving average, so the estimate follows parameters that change the runtime
+        if self.seconds_per_item is None:
+            self.seconds_per_item = per_item
+        else:
+            self.seconds_per_item = 0.7 * self.seconds_per_item + 0.3 * per_item
+        size = self.target_seconds / self.seconds_per_item if self.seconds_per_item > 0 else self.max_chunk_size
+        self.chunk_size = max(1, min(self.max_chunk_size, int(size)))
+
+    def _next_chunk_size(self, remaining):
+        if remaining is None:
+            return self.chunk_size
+        # near the end, spread what is left over all workers rather than leave some idle
+        return max(1, min(self.chunk_size, math.ceil(remaining / self.max_workers)))
+
+    def run(self, fn, items, total: int = None):
+        """
+        Evaluates fn(item) for every item in the executor.
+
+        Args:
+            fn (callable): Picklable function of one item, e.g. a module level function.
+            items (iterable): Items to evaluate, consumed lazily.
+            total (int, optional): Number of items, used to balance the last chunks.
+
+        Yields:
+            tuple: (index, result) pairs in completion order, index being the item's position in items.
+        """
+        items = iter(items)
+        pending = {}
+        submitted = 0
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < self.max_in_flight:
+                remaining = None if total is None else total - submitted
+                chunk = list(itertools.islice(items, self._next_chunk_size(remaining)))
+                if not chunk:
+                    exhausted = True
+                    break
+                pending[self.executor.submit(_run_chunk, fn, chunk)] = submitted
+                submitted += len(chunk)
+            if not pending:
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                start = pending.pop(future)
+                results, elapsed = future.result()
+                self._observe(len(results), elapsed)
+                for offset, result in enumerate(results):
+                    yield start + offset, result
@@ -0,0 +1,84 @@
+from multiprocessing import shared_memory
+import numpy as np
+import pandas as pd
+
+
+def _open_shared_memory(name: str) -> shared_memory.SharedMemory:
+    try:
+        # python >= 3.13, the publishing process owns the segment's lifetime
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+class SharedFrame:
+    """
+    Publishes a DataFrame in shared memory so that worker processes can attach to it without copying.
+
+    The numeric columns, and a datetime index, are written once into a single shared memory segment.
+    Other columns and indexes are small enough to travel with the spec. The spec is a plain picklable
+    dict, pass it to the workers (e.g. through a pool initializer) and call SharedFrame.attach() there.
+    The publishing process must call close() once the workers are done, which releases the segment.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        numeric = [name for name, dtype in df.dtypes.items() if isinstance(dtype, np.dtype) and dtype.kind in "biuf"]
+        datetime_index = isinstance(df.index, pd.DatetimeIndex)
+        arrays = [df[name].to_numpy() for name in numeric]
+        if datetime_index:
+            arrays.append(df.index.asi8)
+
+        layout, offset = [], 0
+        for array in arrays:
+            # keep every column aligned on 8 bytes
+            layout.append((array.dtype.str, offset))
+            offset += -(-array.nbytes // 8) * 8
+        self._shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for array, (dtype, start) in zip(arrays, layout):
+            np.ndarray(array.shape, dtype=dtype, buffer=self._shm.buf, offset=start)[:] = array
+
+        self.spec = {
+            "name": self._shm.name,
+            "length": len(df),
+            "order": list(df.columns),
+            "numeric": list(zip(numeric, layout)),
+            "index": (layout[-1][1], df.index.unit, df.index.tz, df.index.freq, df.index.name) if datetime_index else df.index,
+            # other columns keep their pandas arrays, so e.g. categoricals survive the trip
+            "other": {name: df[name].array for name in df.columns if name not in set(numeric)},
+        }
+
+    @staticmethod
+    def attach(spec: dict):
+        """
+        Rebuilds the published DataFrame on top of the shared memory segment.
+
+        Returns:
+            tuple: (DataFrame, SharedMemory handle). Keep the handle alive as long as the DataFrame is used.
+        """
+        shm = _open_shared_memory(spec["name"])
+        length = spec["length"]
+
+        def view(dtype, offset):
+            array = np.ndarray((length,), dtype=dtype, buffer=shm.buf, offset=offset)
+            array.flags.writeable = False
+            return array
+
+        if isinstance(spec["index"], tuple):
+            offset, unit, tz, freq, name = spec["index"]
+            index = pd.DatetimeIndex(view("<i8", offset).view(f"M8[{unit}]"), name=name)
+            if tz is not None:
+                index = index.tz_localize("UTC").tz_convert(tz)
+            if freq is not None:
+                index = pd.DatetimeIndex(index, freq=freq)
+        else:
+            index = spec["index"]
+
+        columns = {name: view(dtype, offset) for name, (dtype, offset) in spec["numeric"]}
+        columns.update(spec["other"])
+        df = pd.DataFrame({name: columns[name] for name in spec["order"]}, index=index, copy=False)
+        return df, shm
+
+    def close(self):
+        """Releases the shared memory segment, workers must be done with it."""
+        self._shm.close()
+        self._shm.unlink()
@@ -1,9 +1,11 @@
+import copy
 from datetime import datetime
 import numpy as np
 import pandas as pd
+from .trade_stats import TradeStats
 
 class Trade:
-    def __init__(self, tag: str, mode: str, quantity: float, open_price: float, close_price: float, profit: float, pct: float, open_time: datetime = None, close_time: datetime = None):
+    def __init__(self, tag: str, mode: str, quantity: float, open_price: float, close_price: float, profit: float, pct: float, open_time: datetime = None, close_time: datetime = None, symbol: str = None):
         """
         Represents the trade log for a closed position.
         tag: the tag of the closed position
@@ -15,6 +17,7 @@ class Trade:
         pct: the percentage profit/loss from the closed position
         open_time: the time at which the position was opened
         close_time: the time at which the position was closed
+        symbol: the instrument the position was on, if any
         """
         self.tag = tag
         self.mode = mode
@@ -25,21 +28,213 @@ class Trade:
         self.pct = pct
         self.open_time = open_time
         self.close_time = close_time
+        self.symbol = symbol
+
+    def __eq__(self, other):
+        if not isinstance(other, Trade):
+            return NotImplemented
+        return vars(self) == vars(other)
 
     def __repr__(self):
         return (f"Trade(tag={self.tag}, mode={self.mode}, quantity={self.quantity}, "
                 f"open_price={self.open_price}, close_price={self.close_price}, profit={self.profit}, pct={self.pct})")
 
 
+class _TradeList:
+    """Read-only sequence of the trades in a TradeHistory, Trade objects are only built when accessed."""
+
+    def __init__(self, history: "TradeHistory"):
+        self._history = history
+
+    def __len__(self):
+        return self._history._size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._history._trade_at(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("trade index out of range")
+        return self._history._trade_at(index)
+
+    def __iter__(self):
+        return (self._history._trade_at(i) for i in range(len(self)))
+
+    def __repr__(self):
+        return repr(list(self))
+
+
 class TradeHistory:
-    def __init__(self):
-        self.trades: list[Trade] = []
-
-    def add_trade(self, tag: str, mode: str, quantity: float, open_price: float, close_price: float, profit: float, pct: float, open_time: datetime = None, close_time: datetime = None):
-        trade = Trade(tag, mode, quantity, open_price, close_price, profit, pct, open_time, close_time)
-        self.trades.append(trade)
-        return trade
-    
+    """
+    Log of closed trades, stored column by column in numpy arrays that grow by doubling.
+    tag and mode are stored as category codes and times as int64 nanoseconds, so recording a trade
+    allocates no Python objects. to_dataframe() is cached until the next trade is recorded, it has
+    a symbol column once a trade on a symbol was recorded.
+    When initial_portfolio is given, statistics are also accumulated as trades are recorded and
+    get_stats() for that portfolio size no longer has to go over the trades.
+    """
+    COLUMNS = ["tag", "mode", "quantity", "open_price", "close_price", "profit", "pct", "open_time", "close_time"]
+    _DTYPES = {
+        "tag": np.int32, "mode": np.int32, "quantity": np.float64, "open_price": np.float64, "close_price": np.float64,
+        "profit": np.float64, "pct": np.float64, "open_time": np.int64, "close_time": np.int64, "symbol": np.int32,
+    }
+    _CATEGORICAL = ("tag", "mode", "symbol")
+    _TIMES = ("open_time", "close_time")
+    _NAT = np.iinfo(np.int64).min
+
+    def __init__(self, initial_portfolio: float = None, capacity: int = 1024):
+        self._size = 0
+        self._stats = TradeStats(initial_portfolio) if initial_portfolio is not None else None
+        self._columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in self._DTYPES.items()}
+        # category -> code and code -> category for tag and mode, code -1 stands for None
+        self._codes = {name: {} for name in self._CATEGORICAL}
+        self._categories = {name: [] for name in self._CATEGORICAL}
+        # how times were given: None until the first one, then "datetime" or "int"
+        self._time_kind = None
+        self._tz = None
+        self._frame = None
+
+    @property
+    def trades(self) -> _TradeList:
+        return _TradeList(self)
+
+    def __len__(self):
+        return self._size
+
+    def _encode_category(self, name: str, value) -> int:
+        if value is None:
+            return -1
+        codes = self._codes[name]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+            self._categories[name].append(value)
+        return code
+
+    def _encode_time(self, value) -> int:
+        if value is None or value is pd.NaT:
+            return self._NAT
+        if isinstance(value, (int, np.integer)) and not isinstance(value, bool):
+            kind = "int"
+        else:
+            value = value if isinstance(value, pd.Timestamp) else pd.Timestamp(value)
+            if self._time_kind is None:
+                self._tz = value.tz
+            kind = "datetime"
+        if self._time_kind is None:
+            self._time_kind = kind
+        assert kind == self._time_kind, "Trade times must either all be datetimes or all be integers"
+        return int(value) if kind == "int" else value.value
+
+    def _grow(self):
+        for name, column in self._columns.items():
+            grown = np.empty(2 * len(column), dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            self._columns[name] = grown
+
+    def record_trade(self, tag: str, mode: str, quantity: float, open_price: float, close_price: float, profit: float, pct: float, open_time: datetime = None, close_time: datetime = None, symbol: str = None) -> int:
+        """
+        Appends a trade to the columns without creating a Trade object.
+
+        Returns:
+            int: The index of the recorded trade.
+        """
+        if self._size == len(self._columns["profit"]):
+            self._grow()
+        i = self._size
+        columns = self._columns
+        columns["tag"][i] = self._encode_category("tag", tag)
+        columns["mode"][i] = self._encode_category("mode", mode)
+        columns["quantity"][i] = quantity
+        columns["open_price"][i] = open_price
+        columns["close_price"][i] = close_price
+        columns["profit"][i] = profit
+        columns["pct"][i] = pct
+        columns["open_time"][i] = open_ns = self._encode_time(open_time)
+        columns["close_time"][i] = close_ns = self._encode_time(close_time)
+        columns["symbol"][i] = self._encode_category("symbol", symbol)
+        if self._stats is not None:
+            self._stats.update(profit, pct, open_ns, close_ns)
+        self._size += 1
+        self._frame = None
+        return i
+
+    def add_trade(self, tag: str, mode: str, quantity: float, open_price: float, close_price: float, profit: float, pct: float, open_time: datetime = None, close_time: datetime = None, symbol: str = None):
+        i = self.record_trade(tag, mode, quantity, open_price, close_price, profit, pct, open_time, close_time, symbol)
+        return self._trade_at(i)
+
+    def _decode_time(self, value: int):
+        if value == self._NAT:
+            return None
+        if self._time_kind == "int":
+            return value
+        return pd.Timestamp(value, tz="UTC").tz_convert(self._tz) if self._tz is not None else pd.Timestamp(value)
+
+    def _trade_at(self, i: int) -> Trade:
+        columns = self._columns
+        tag, mode, symbol = (columns[name][i] for name in self._CATEGORICAL)
+        return Trade(
+            tag=self._categories["tag"][tag] if tag >= 0 else None,
+            mode=self._categories["mode"][mode] if mode >= 0 else None,
+            quantity=float(columns["quantity"][i]),
+            open_price=float(columns["open_price"][i]),
+            close_price=float(columns["close_price"][i]),
+            profit=float(columns["profit"][i]),
+            pct=float(columns["pct"][i]),
+            open_time=self._decode_time(int(columns["open_time"][i])),
+            close_time=self._decode_time(int(columns["close_time"][i])),
+            symbol=self._categories["symbol"][symbol] if symbol >= 0 else None,
+        )
+
+    def _export_column(self, name: str):
+        values = self._columns[name][:self._size]
+        if name in self._CATEGORICAL:
+            return pd.Categorical.from_codes(values, categories=pd.Index(self._categories[name], dtype=object))
+        if name in self._TIMES:
+            if self._time_kind == "int":
+                return values.copy()
+            times = pd.DatetimeIndex(values.view("M8[ns]"))
+            return times.tz_localize("UTC").tz_convert(self._tz) if self._tz is not None else times
+        return values
+
+    def to_arrays(self) -> dict:
+        """
+        Compact state of the history: copies of the recorded part of each column, the categories
+        and time settings needed to decode them, and the accumulated statistics.
+        """
+        return {
+            "columns": {name: column[:self._size].copy() for name, column in self._columns.items()},
+            "categories": {name: list(categories) for name, categories in self._categories.items()},
+            "time_kind": self._time_kind,
+            "tz": self._tz,
+            "stats": copy.deepcopy(self._stats),
+        }
+
+    @classmethod
+    def from_arrays(cls, state: dict, copy_columns: bool = True) -> "TradeHistory":
+        """
+        Rebuilds a history from the output of to_arrays(). With copy_columns=False, writable columns of the
+        right dtype and the stats are used as they are, and must not be modified elsewhere afterwards.
+        """
+        size = len(state["columns"]["profit"])
+        history = cls(capacity=max(size, 1))
+        for name, column in history._columns.items():
+            given = state["columns"].get(name)
+            if not copy_columns and size and given is not None and given.dtype == column.dtype and given.flags.writeable:
+                history._columns[name] = given
+            else:
+                # -1 (None) for categories missing from older states
+                column[:size] = given if given is not None else -1
+        history._size = size
+        for name, categories in state["categories"].items():
+            history._categories[name] = list(categories)
+            history._codes[name] = {category: code for code, category in enumerate(categories)}
+        history._time_kind = state["time_kind"]
+        history._tz = state["tz"]
+        history._stats = copy.deepcopy(state["stats"]) if copy_columns else state["stats"]
+        return history
+
     def _convert_types(self, stats: dict) -> dict:
         """
         Converts numpy data types to native Python data types for a dictionary.
@@ -59,24 +254,16 @@ class TradeHistory:
         """
         Converts the trade history to a Pandas DataFrame.
         Each trade is represented as a row in the DataFrame.
+        The frame is cached until the next trade is recorded, so it is shared between callers:
+        copy it before modifying it.
 
         Returns:
             pd.DataFrame: DataFrame containing the trade history.
         """
-        if not self.trades:
-            return pd.DataFrame(columns=["tag", "mode", "quantity", "open_price", "close_price", "profit", "pct", "open_time", "close_time"])
-
-        return pd.DataFrame([{
-            "tag": trade.tag,
-            "mode": trade.mode,
-            "quantity": trade.quantity,
-            "open_price": trade.open_price,
-            "close_price": trade.close_price,
-            "profit": trade.profit,
-            "pct": trade.pct,
-            "open_time": trade.open_time,
-            "close_time": trade.close_time
-        } for trade in self.trades])
+        if self._frame is None:
+            columns = self.COLUMNS + ["symbol"] if self._categories["symbol"] else self.COLUMNS
+            self._frame = pd.DataFrame({name: self._export_column(name) for name in columns})
+        return self._frame
 
     def get_stats(self, initial_portfolio: float, periods_per_year: int = 365):
         """
@@ -90,6 +277,9 @@ class TradeHistory:
         Returns:
             dict: Dictionary containing calculated metrics.
         """
+        if self._stats is not None and self._size and initial_portfolio == self._stats.initial_portfolio:
+            return self._convert_types(self._stats.get_stats(self._time_kind or "datetime"))
+
         df = self.to_dataframe()
 
         if df.empty:
@@ -161,17 +351,17 @@ class TradeHistory:
         annualized_return = 0.0  # Initialize
         if total_trades > 1:
             # Ensure open_time and close_time are datetime objects
-            df['open_time'] = pd.to_datetime(df['open_time'])
-            df['close_time'] = pd.to_datetime(df['close_time'])
+            open_time = pd.to_datetime(df['open_time'])
+            close_time = pd.to_datetime(df['close_time'])
 
             # Calculate returns for each trade (profit relative to portfolio value at trade time)
             # Portfolio value at each trade = initial portfolio + cumulative profit before this trade
-            df['portfolio_before_trade'] = initial_portfolio + df['profit'].cumsum().shift(1).fillna(0)
-            df['return'] = df['profit'] / df['portfolio_before_trade']
+            portfolio_before_trade = initial_portfolio + df['profit'].cumsum().shift(1).fillna(0)
+            returns = df['profit'] / portfolio_before_trade
 
             # Calculate actual backtest duration (calendar time, not sum of trade durations)
-            backtest_start = df['open_time'].min()
-            backtest_end = df['close_time'].max()
+            backtest_start = open_time.min()
+            backtest_end = close_time.max()
             backtest_duration_seconds = (backtest_end - backtest_start).total_seconds()
             backtest_duration_years = backtest_duration_seconds / (365.25 * 24 * 60 * 60)
 
@@ -180,7 +370,7 @@ class TradeHistory:
             annualized_return = total_return / backtest_duration_years if backtest_duration_years > 0 else 0
 
             # Calculate volatility of returns
-            returns_std = df['return'].std()
+            returns_std = returns.std()
 
             # Annualize volatility based on trading frequency
             # Number of trades per year
@@ -196,12 +386,12 @@ class TradeHistory:
         expectancy = (win_rate * average_win) + ((1 - win_rate) * average_loss)
 
         # Adjusted Max Drawdown %
-        df["portfolio_value"] = initial_portfolio + df["profit"].cumsum()
-        df["peak_portfolio"] = df["portfolio_value"].cummax()
-        df["drawdown"] = df["portfolio_value"] - df["peak_portfolio"]
-        df["drawdown_percent"] = (df["drawdown"] / df["peak_portfolio"]) * 100
+        portfolio_value = initial_portfolio + df["profit"].cumsum()
+        peak_portfolio = portfolio_value.cummax()
+        drawdown = portfolio_value - peak_portfolio
+        drawdown_percent = (drawdown / peak_portfolio) * 100
 
-        max_drawdown_percent = df["drawdown_percent"].min()
+        max_drawdown_percent = drawdown_percent.min()
 
         # Calmar Ratio (annualized return / absolute max drawdown)
         # Convert max_drawdown_percent from percentage to decimal for calculation
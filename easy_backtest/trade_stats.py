@@ -0,0 +1,230 @@
+import math
+import numpy as np
+import pandas as pd
+
+NAT = np.iinfo(np.int64).min
+SECONDS_PER_YEAR = 365.25 * 24 * 60 * 60
+
+
+class TradeStats:
+    """
+    Streaming accumulator for the statistics of TradeHistory.get_stats().
+
+    Every statistic is updated in constant time as each trade is recorded: Welford mean/variance
+    of the per-trade returns, the running peak and max drawdown of the portfolio, current and max
+    win/loss streaks, and win/loss sums. Reading the stats is therefore O(1) at any point of a run,
+    and gives the same values as computing them from the full trade DataFrame.
+    """
+
+    def __init__(self, initial_portfolio: float):
+        self.initial_portfolio = initial_portfolio
+        self.count = 0
+        self.total_profit = 0.0
+        self.max_profit = -math.inf
+        self.max_loss = math.inf
+        # wins are trades with a strictly positive profit, everything else is a loss
+        self.wins = 0
+        self.win_sum = 0.0
+        self.win_pct_sum = 0.0
+        self.loss_sum = 0.0
+        self.loss_pct_sum = 0.0
+        # streaks
+        self.streak_is_win = None
+        self.streak_length = 0
+        self.win_streaks = 0
+        self.loss_streaks = 0
+        self.max_win_streak = 0
+        self.max_loss_streak = 0
+        # Welford mean/variance of profit relative to the portfolio before each trade
+        self.return_mean = 0.0
+        self.return_m2 = 0.0
+        # drawdown, the peak starts at the first trade as with cummax()
+        self.peak_portfolio = None
+        self.max_drawdown_percent = 0.0
+        # time span and holding period, in the integer units the trade history stores times in
+        self.first_open = None
+        self.last_close = None
+        self.holding_sum = 0
+        self.holding_count = 0
+
+    def update(self, profit: float, pct: float, open_time: int = NAT, close_time: int = NAT):
+        """Adds one trade, times are int64 nanoseconds (or raw integers) with NAT for missing."""
+        portfolio_before = self.initial_portfolio + self.total_profit
+        self.count += 1
+        self.total_profit += profit
+        self.max_profit = max(self.max_profit, profit)
+        self.max_loss = min(self.max_loss, profit)
+
+        is_win = profit > 0
+        if is_win:
+            self.wins += 1
+            self.win_sum += profit
+            self.win_pct_sum += pct
+        else:
+            self.loss_sum += profit
+            self.loss_pct_sum += pct
+
+        if is_win == self.streak_is_win:
+            self.streak_length += 1
+        else:
+            self.streak_is_win = is_win
+            self.streak_length = 1
+            if is_win:
+                self.win_streaks += 1
+            else:
+                self.loss_streaks += 1
+        if is_win:
+            self.max_win_streak = max(self.max_win_streak, self.streak_length)
+        else:
+            self.max_loss_streak = max(self.max_loss_streak, self.streak_length)
+
+        trade_return = profit / portfolio_before
+        delta = trade_return - self.return_mean
+        self.return_mean += delta / self.count
+        self.return_m2 += delta * (trade_return - self.return_mean)
+
+        portfolio_value = self.initial_portfolio + self.total_profit
+        self.peak_portfolio = portfolio_value if self.peak_portfolio is None else max(self.peak_portfolio, portfolio_value)
+        drawdown_percent = (portfolio_value - self.peak_portfolio) / self.peak_portfolio * 100
+        self.max_drawdown_percent = min(self.max_drawdown_percent, drawdown_percent)
+
+        if open_time != NAT:
+            self.first_open = open_time if self.first_open is None else min(self.first_open, open_time)
+        if close_time != NAT:
+            self.last_close = close_time if self.last_close is None else max(self.last_close, close_time)
+        if open_time != NAT and close_time != NAT:
+            self.holding_sum += int(close_time) - int(open_time)
+            self.holding_count += 1
+
+    @classmethod
+    def from_trades(cls, initial_portfolio: float, profit: np.ndarray, pct: np.ndarray, open_time: np.ndarray, close_time: np.ndarray) -> "TradeStats":
+        """
+        The accumulator after update() for each trade, computed over whole columns at once.
+        Sums are accumulated in trade order as update() does, the return variance may differ in the last bits.
+        """
+        stats = cls(initial_portfolio)
+        count = len(profit)
+        if count == 0:
+            return stats
+        profit = np.asarray(profit, dtype=np.float64)
+        pct = np.asarray(pct, dtype=np.float64)
+        totals = np.cumsum(profit)
+        stats.count = count
+        stats.total_profit = float(totals[-1])
+        stats.max_profit = float(profit.max())
+        stats.max_loss = float(profit.min())
+
+        is_win = profit > 0
+        stats.wins = int(is_win.sum())
+        stats.win_sum = float(np.cumsum(profit[is_win])[-1]) if stats.wins else 0.0
+        stats.win_pct_sum = float(np.cumsum(pct[is_win])[-1]) if stats.wins else 0.0
+        stats.loss_sum = float(np.cumsum(profit[~is_win])[-1]) if stats.wins < count else 0.0
+        stats.loss_pct_sum = float(np.cumsum(pct[~is_win])[-1]) if stats.wins < count else 0.0
+
+        # runs of consecutive wins or losses
+        starts = np.flatnonzero(np.concatenate([[True], is_win[1:] != is_win[:-1]]))
+        lengths = np.diff(np.append(starts, count))
+        run_is_win = is_win[starts]
+        stats.streak_is_win = bool(run_is_win[-1])
+        stats.streak_length = int(lengths[-1])
+        stats.win_streaks = int(run_is_win.sum())
+        stats.loss_streaks = len(starts) - stats.win_streaks
+        stats.max_win_streak = int(lengths[run_is_win].max()) if stats.win_streaks else 0
+        stats.max_loss_streak = int(lengths[~run_is_win].max()) if stats.loss_streaks else 0
+
+        portfolio_before = initial_portfolio + np.concatenate([[0.0], totals[:-1]])
+        returns = profit / portfolio_before
+        stats.return_mean = float(returns.mean())
+        stats.return_m2 = float(((returns - stats.return_mean) ** 2).sum())
+
+        portfolio_value = initial_portfolio + totals
+        peaks = np.maximum.accumulate(portfolio_value)
+        stats.peak_portfolio = float(peaks[-1])
+        stats.max_drawdown_percent = min(0.0, float(((portfolio_value - peaks) / peaks * 100).min()))
+
+        open_time = np.asarray(open_time, dtype=np.int64)
+        close_time = np.asarray(close_time, dtype=np.int64)
+        opened, closed = open_time != NAT, close_time != NAT
+        stats.first_open = int(open_time[opened].min()) if opened.any() else None
+        stats.last_close = int(close_time[closed].max()) if closed.any() else None
+        both = opened & closed
+        # summed as whole seconds and remainders, each fits in int64, so the Python int total is exact
+        seconds, remainders = np.divmod(close_time[both] - open_time[both], 10**9)
+        stats.holding_sum = int(seconds.sum()) * 10**9 + int(remainders.sum())
+        stats.holding_count = int(both.sum())
+        return stats
+
+    def get_stats(self, time_kind: str = "datetime") -> dict:
+        """
+        Returns the statistics of all trades added so far, see TradeHistory.get_stats().
+
+        Args:
+            time_kind (str): "datetime" if times are nanoseconds, "int" if they are raw integers.
+        """
+        total_trades = self.count
+        losses = total_trades - self.wins
+        win_rate = self.wins / total_trades
+
+        if losses and abs(self.loss_sum) > 1e-10:
+            profit_factor = self.win_sum / abs(self.loss_sum)
+        elif self.wins == 0:
+            profit_factor = 0.0
+        else:
+            profit_factor = 999999.0
+
+        average_win = self.win_sum / self.wins if self.wins else 0.0
+        average_loss = self.loss_sum / losses if losses else 0.0
+        average_win_pct = self.win_pct_sum / self.wins * 100 if self.wins else 0.0
+        average_loss_pct = self.loss_pct_sum / losses * 100 if losses else 0.0
+
+        annualized_return = 0.0
+        sharpe_ratio = 0.0
+        if total_trades > 1:
+            if self.first_open is not None and self.last_close is not None:
+                backtest_duration_years = (self.last_close - self.first_open) / 1e9 / SECONDS_PER_YEAR
+            else:
+                backtest_duration_years = math.nan
+            total_return = self.total_profit / self.initial_portfolio
+            annualized_return = total_return / backtest_duration_years if backtest_duration_years > 0 else 0
+            returns_std = math.sqrt(self.return_m2 / (total_trades - 1))
+            trades_per_year = total_trades / backtest_duration_years if backtest_duration_years > 0 else 0
+            annualized_std_dev = returns_std * math.sqrt(trades_per_year) if trades_per_year > 0 else 0
+            sharpe_ratio = annualized_return / annualized_std_dev if annualized_std_dev > 0 else 0.0
+
+        expectancy = (win_rate * average_win) + ((1 - win_rate) * average_loss)
+
+        if abs(self.max_drawdown_percent) > 0.001:
+            calmar_ratio = annualized_return / (abs(self.max_drawdown_percent) / 100)
+        else:
+            calmar_ratio = 0.0
+
+        if self.holding_count == 0:
+            average_holding_period = pd.NaT if time_kind == "datetime" else math.nan
+        elif time_kind == "datetime":
+            average_holding_period = pd.Timedelta(self.holding_sum // self.holding_count)
+        else:
+            average_holding_period = self.holding_sum / self.holding_count
+
+        return {
+            "total_trades": total_trades,
+            "total_profit": self.total_profit,
+            "win_rate": win_rate,
+            "expectancy": expectancy,
+            "sharpe_ratio": sharpe_ratio,
+            "calmar_ratio": calmar_ratio,
+            "annualized_return": annualized_return,
+            "max_drawdown_percent": self.max_drawdown_percent,
+            "average_holding_period": average_holding_period,
+            "average_profit": self.total_profit / total_trades,
+            "max_profit": self.max_profit,
+            "max_loss": self.max_loss,
+            "profit_factor": profit_factor,
+            "average_win": average_win,
+            "average_loss": average_loss,
+            "average_win_pct": average_win_pct,
+            "average_loss_pct": average_loss_pct,
+            "max_consecutive_wins": self.max_win_streak,
+            "max_consecutive_losses": self.max_loss_streak,
+            "avg_consecutive_wins": self.wins / self.win_streaks if self.win_streaks else 0.0,
+            "avg_consecutive_losses": losses / self.loss_streaks if self.loss_streaks else 0.0,
+        }
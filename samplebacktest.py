@@ -1,8 +1,6 @@
 import pprint
 from easy_backtest.backtest_engine import BacktestEngine
 
-import yfinance as yf
-
 
 
 # Step 1: Create a new class that inherits from BacktestEngine
@@ -11,7 +9,7 @@ import yfinance as yf
 class MyBacktest(BacktestEngine):
     def preprocess_data(self):
         # Custom preprocessing logic
-        self.data_stream['moving_avg'] = self.data_stream['close'].rolling(window=100).mean()
+        self.data_stream['moving_avg'] = self.indicator("sma", "close", 100)
         return self.data_stream
 
     def before_step(self, index, row):
@@ -49,6 +47,9 @@ class MyBacktest(BacktestEngine):
 
 
 if __name__ == "__main__":
+    # only needed to fetch the example data, MyBacktest itself can be imported without it
+    import yfinance as yf
+
     position_size = 100
     # Example usage
     # 2. Create a new backtest instance
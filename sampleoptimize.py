@@ -13,7 +13,7 @@ import yfinance as yf
 class MyBacktest(BacktestEngine):
     def preprocess_data(self):
         # Custom preprocessing logic
-        self.data_stream['moving_avg'] = self.data_stream['close'].rolling(window=100).mean()
+        self.data_stream['moving_avg'] = self.indicator("sma", "close", 100)
 
     def strategy(self, row):
         # position size
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+
+def make_ohlcv(n=2000, seed=0, tz=None, drop_every=None, name=None):
+    """
+    Hourly random-walk OHLCV bars from 2024-01-01, the same bars for the same seed.
+
+    Args:
+        n (int): The number of bars before any are dropped.
+        seed (int): The seed of the random walk.
+        tz (str): The time zone of the index, naive if None.
+        drop_every (int): Drops every drop_every-th bar (the second of each group) to leave gaps.
+        name (str): The name of the index.
+    """
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.005, n)) * close
+    df = pd.DataFrame({
+        "open": open_,
+        "high": np.maximum(open_, close) + spread,
+        "low": np.minimum(open_, close) - spread,
+        "close": close,
+        "volume": rng.integers(1, 1000, n).astype(float),
+    }, index=pd.date_range("2024-01-01", periods=n, freq="h", tz=tz, name=name))
+    if drop_every:
+        df = df.iloc[np.arange(n) % drop_every != 1]
+    return df
@@ -0,0 +1,477 @@
+import json
+import pickle
+import numpy as np
+import pandas as pd
+import pytest
+from easy_backtest import backtest_engine
+from easy_backtest.backtest_engine import BacktestEngine
+from easy_backtest.bar_buffer import BarBuffer
+from easy_backtest.param_grid import ParameterGrid
+from conftest import make_ohlcv
+
+
+class CrossStrategy(BacktestEngine):
+    def preprocess_data(self):
+        df = self.data_stream
+        df["ma"] = df["close"].rolling(window=20).mean()
+        side = np.sign(df["close"] - df["ma"]).fillna(0)
+        df["signal"] = side
+        df["cross"] = side.ne(side.shift()) & side.shift().ne(0)
+        return df
+
+    def strategy(self, row):
+        pos = self.position_book.get_position_by_tag("vectorized")
+        if pos is not None and row.cross:
+            self.position_book.close_position(tag="vectorized", close_price=row.close, close_time=row.Index)
+            pos = None
+        if pos is None and row.signal != 0:
+            mode = "long" if row.signal > 0 else "short"
+            tp = row.close * (1.03 if mode == "long" else 0.97)
+            sl = row.close * (0.98 if mode == "long" else 1.02)
+            self.position_book.open_position(quantity=2.0, open_price=row.close, mode=mode, tag="vectorized", tp=tp, sl=sl, open_time=row.Index)
+
+    def strategy_vectorized(self, df):
+        long = df["signal"] > 0
+        return pd.DataFrame({
+            "entry": df["signal"],
+            "exit": df["cross"],
+            "size": 2.0,
+            "tp": np.where(long, df["close"] * 1.03, df["close"] * 0.97),
+            "sl": np.where(long, df["close"] * 0.98, df["close"] * 1.02),
+        }, index=df.index)
+
+
+def test_run_vectorized_matches_run():
+    # The vectorized signal mode should produce the same trades as the per-row loop
+    loop = CrossStrategy(commission=0.001)
+    loop.add_data_stream(make_ohlcv())
+    loop.run()
+
+    vectorized = CrossStrategy(commission=0.001)
+    vectorized.add_data_stream(make_ohlcv())
+    vectorized.run_vectorized()
+
+    expected = loop.get_trade_history().to_dataframe()
+    result = vectorized.get_trade_history().to_dataframe()
+    assert len(result) == len(expected) > 0
+    pd.testing.assert_frame_equal(result, expected)
+    assert vectorized.get_portfolio_size() == pytest.approx(loop.get_portfolio_size())
+    assert vectorized.get_trading_stats()["total_trades"] == len(expected)
+
+
+def test_run_incremental_after_run_vectorized():
+    # Bars appended after a vectorized run are traded from where it stopped, not replayed from the first bar
+    data = make_ohlcv()
+    expected = CrossStrategy(commission=0.001)
+    expected.add_data_stream(data.copy())
+    expected.run()
+
+    engine = CrossStrategy(commission=0.001)
+    engine.add_data_stream(data.iloc[:1500].copy())
+    engine.run_vectorized()
+    assert engine.run_incremental(data.iloc[1500:]) == 500
+    pd.testing.assert_frame_equal(engine.get_trade_history().to_dataframe(), expected.get_trade_history().to_dataframe())
+
+
+def test_run_vectorized_requires_hook():
+    # Engines without strategy_vectorized() cannot use the vectorized mode
+    class LoopOnly(BacktestEngine):
+        def strategy(self, row):
+            pass
+
+    engine = LoopOnly(commission=0.001)
+    engine.add_data_stream(make_ohlcv(50))
+    with pytest.raises(NotImplementedError):
+        engine.run_vectorized()
+
+
+def test_run_row_cursor_matches_run():
+    # The row cursor execution mode should produce the same trades as itertuples()
+    loop = CrossStrategy(commission=0.001)
+    loop.add_data_stream(make_ohlcv())
+    loop.run()
+
+    cursor = CrossStrategy(commission=0.001)
+    cursor.add_data_stream(make_ohlcv())
+    cursor.run(row_cursor=True)
+
+    pd.testing.assert_frame_equal(cursor.get_trade_history().to_dataframe(), loop.get_trade_history().to_dataframe())
+
+
+class WindowStrategy(CrossStrategy):
+    def preprocess_data(self):
+        df = self.data_stream
+        df["ma"] = df["close"].rolling(window=self.states["params"]["window"]).mean()
+        side = np.sign(df["close"] - df["ma"]).fillna(0)
+        df["signal"] = side
+        df["cross"] = side.ne(side.shift()) & side.shift().ne(0)
+        return df
+
+
+def test_optimize_workers_match_in_process(tmp_path, monkeypatch):
+    # Workers attached to the shared data stream should give the same results as evaluating in process
+    monkeypatch.chdir(tmp_path)
+    data = make_ohlcv(500)
+    engine = WindowStrategy(commission=0.001)
+    engine.add_data_stream(data)
+    front = engine.optimize({"window": [5, 10, 20, 40]}, optimize_metrics=["total_profit"])
+
+    reference = WindowStrategy(commission=0.001)
+    reference.add_data_stream(make_ohlcv(500))
+    reference.param_names = ["window"]
+    expected = [reference.evaluate_combination((window,)) for window in [5, 10, 20, 40]]
+    assert front == reference.pareto_front(expected, ["total_profit"])
+    # the published frame is left untouched and the results file is written
+    assert list(engine.data_stream.columns) == ["open", "high", "low", "close", "volume"]
+    assert len(list(tmp_path.glob("optimization_results*.json"))) == 1
+
+
+def test_optimize_vectorized_constraints(tmp_path, monkeypatch):
+    # Vectorized constraints should select the same combinations as a per-combination function
+    monkeypatch.chdir(tmp_path)
+    engine = WindowStrategy(commission=0.001)
+    engine.add_data_stream(make_ohlcv(300))
+    choices = {"window": [5, 10, 20, 40], "unused": [1, 2]}
+    python = engine.optimize(choices, ["total_profit"], constraints=lambda p: p["window"] > p["unused"] * 10, max_workers=2)
+    vectorized = engine.optimize(choices, ["total_profit"], constraints=lambda p: p["window"] > p["unused"] * 10,
+                                 max_workers=2, vectorized_constraints=True)
+    assert python == vectorized
+    assert all(result["params"]["window"] > result["params"]["unused"] * 10 for result in python)
+
+    # valid combinations are streamed shard by shard to the workers, never gathered into one array first
+    def gather(*args, **kwargs):
+        raise AssertionError("valid_indices() materializes the whole grid")
+    monkeypatch.setattr(ParameterGrid, "valid_indices", gather)
+    streamed = engine.optimize(choices, ["total_profit"], constraints=lambda p: p["window"] > p["unused"] * 10,
+                               max_workers=2, vectorized_constraints=True)
+    assert streamed == vectorized
+
+
+def test_pareto_front_ranks_and_fronts():
+    # Pareto helpers should agree with each other and honour minimized metrics
+    engine = CrossStrategy(commission=0.001)
+    results = [
+        {"params": {"a": 0}, "total_profit": 3.0, "max_drawdown_percent": -5.0},
+        {"params": {"a": 1}, "total_profit": 2.0, "max_drawdown_percent": -1.0},
+        {"params": {"a": 2}, "total_profit": 1.0, "max_drawdown_percent": -6.0},
+        {"params": {"a": 3}, "total_profit": 2.5, "max_drawdown_percent": -5.5},
+    ]
+    metrics = ["total_profit", "max_drawdown_percent"]
+    assert engine.pareto_ranks(results, metrics) == [0, 0, 2, 1]
+    assert engine.pareto_front(results, metrics) == results[:2]
+    assert engine.pareto_fronts(results, metrics) == [results[:2], [results[3]], [results[2]]]
+    # a smaller drawdown percent is better when minimized
+    assert engine.pareto_front(results, metrics, minimize=["max_drawdown_percent"]) == [results[0], results[2], results[3]]
+
+
+def test_run_over_bar_range():
+    # Running over a prefix should trade like the full run up to that bar
+    full = CrossStrategy(commission=0.001)
+    full.add_data_stream(make_ohlcv(1000))
+    full.run()
+    prefix = CrossStrategy(commission=0.001)
+    prefix.add_data_stream(make_ohlcv(1000))
+    prefix.run(stop=500)
+
+    cutoff = prefix.data_stream.index[499]
+    expected = full.get_trade_history().to_dataframe()
+    expected = expected[expected["close_time"] <= cutoff]
+    pd.testing.assert_frame_equal(prefix.get_trade_history().to_dataframe(), expected)
+
+
+def test_optimize_halving(tmp_path, monkeypatch):
+    # Successive halving should report full length results for the surviving combinations
+    monkeypatch.chdir(tmp_path)
+    windows = [3, 5, 8, 13, 21, 34, 55, 89, 144]
+    engine = WindowStrategy(commission=0.001)
+    engine.add_data_stream(make_ohlcv(600))
+    front = engine.optimize_halving({"window": windows}, ["total_profit"], min_fraction=0.25, keep=0.5, max_workers=2)
+
+    reference = WindowStrategy(commission=0.001)
+    reference.add_data_stream(make_ohlcv(600))
+    reference.param_names = ["window"]
+    # 9 combinations on 150 bars, 5 on 300, 3 on 600
+    saved = json.loads(next(tmp_path.glob("optimization_results*.json")).read_text())
+    assert len(saved) == 3
+    for result in front:
+        assert result == reference.evaluate_combination((result["params"]["window"],))
+
+
+def test_optimize_resumes_from_results_log(tmp_path, monkeypatch):
+    # A second run with the same log should only evaluate the missing combinations
+    monkeypatch.chdir(tmp_path)
+    path = str(tmp_path / "results.jsonl")
+    engine = WindowStrategy(commission=0.001)
+    engine.add_data_stream(make_ohlcv(300))
+    engine.optimize({"window": [5, 10]}, ["total_profit"], max_workers=2, results_path=path)
+
+    evaluated = []
+    evaluate_all = BacktestEngine._evaluate_all
+
+    def recording(self, param_combinations, total, *args):
+        param_combinations = list(param_combinations)
+        evaluated.extend(param_combinations)
+        return evaluate_all(self, param_combinations, total, *args)
+
+    monkeypatch.setattr(BacktestEngine, "_evaluate_all", recording)
+    front = engine.optimize({"window": [5, 10, 20, 40]}, ["total_profit", "win_rate"], max_workers=2, results_path=path)
+    assert evaluated == [(20,), (40,)]
+
+    expected = engine.optimize({"window": [5, 10, 20, 40]}, ["total_profit", "win_rate"], max_workers=2)
+    assert sorted(r["params"]["window"] for r in front) == sorted(r["params"]["window"] for r in expected)
+    assert list(tmp_path.glob("optimization_results*.json")) != []
+
+
+def test_optimize_random_resumes_same_sample(tmp_path, monkeypatch):
+    # An interrupted random search picks up the same sample, ending with the combinations of an uninterrupted one
+    monkeypatch.chdir(tmp_path)
+    choices = {"window": list(range(2, 202))}
+    engine = WindowStrategy(commission=0.001)
+    engine.add_data_stream(make_ohlcv(300))
+    full = tmp_path / "full.jsonl"
+    engine.optimize_random(choices, ["total_profit"], n_samples=8, max_workers=2, results_path=str(full))
+    lines = full.read_text().splitlines()
+    assert len(lines) == 8
+
+    # the run was stopped after three results
+    interrupted = tmp_path / "interrupted.jsonl"
+    interrupted.write_text("\n".join(lines[:3]) + "\n")
+    engine.optimize_random(choices, ["total_profit"], n_samples=8, max_workers=2, results_path=str(interrupted))
+    windows = lambda path: sorted(json.loads(line)["params"]["window"] for line in path.read_text().splitlines())
+    assert windows(interrupted) == windows(full)
+
+    # an explicit seed draws its own sample, the same each time
+    for k in range(2):
+        engine.optimize_random(choices, ["total_profit"], n_samples=8, max_workers=2, results_path=str(tmp_path / f"seeded{k}.jsonl"), seed=7)
+    assert windows(tmp_path / "seeded0.jsonl") == windows(tmp_path / "seeded1.jsonl")
+
+
+def test_run_incremental_matches_full_run():
+    # Appending bars one batch at a time should trade exactly like a single run over all of them
+    data = make_ohlcv()
+    expected = CrossStrategy(commission=0.001)
+    expected.add_data_stream(data.copy())
+    expected.run()
+
+    engine = CrossStrategy(commission=0.001)
+    engine.add_data_stream(data.iloc[:1500].copy())
+    engine.run()
+    processed = sum(engine.run_incremental(data.iloc[i:i + 1], warmup_bars=30) for i in range(1500, 1550))
+    processed += sum(engine.run_incremental(data.iloc[i:i + 150], warmup_bars=30) for i in range(1550, 2000, 150))
+    assert processed == 500
+    assert len(engine.data_stream) == 2000
+
+    pd.testing.assert_frame_equal(engine.get_trade_history().to_dataframe(), expected.get_trade_history().to_dataframe())
+    latency = engine.get_latency_stats()
+    assert latency["bars"] == 500
+    assert 0 < latency["p50_us"] <= latency["p99_us"] <= latency["max_us"]
+
+    with pytest.raises(AssertionError):
+        engine.run_incremental(data.iloc[1990:])
+
+
+def test_worker_blueprint_leaves_run_state_behind():
+    # The engine sent to workers carries neither the bar history of run_incremental() nor its latencies
+    data = make_ohlcv(5000)
+    engine = CrossStrategy(commission=0.001)
+    engine.add_data_stream(data.iloc[:4000].copy())
+    engine.run()
+    for i in range(4000, 5000, 100):
+        engine.run_incremental(data.iloc[i:i + 100], warmup_bars=30)
+    engine.sweep_histories = [engine.get_trade_history()]
+
+    blueprint = engine._worker_blueprint()
+    assert blueprint._bar_buffer is None and len(blueprint._latencies) == 0 and blueprint.sweep_histories is None
+    fresh = CrossStrategy(commission=0.001)
+    fresh.add_data_stream(data)
+    assert len(pickle.dumps(blueprint)) < len(pickle.dumps(fresh._worker_blueprint())) + 1000
+    # the engine itself keeps them
+    assert len(engine._bar_buffer) == 5000 and len(engine._latencies) == 1000 and engine.sweep_histories
+
+
+class PreprocessCounting(CrossStrategy):
+    def preprocess_data(self):
+        self.preprocessed.append(len(self.data_stream))
+        return super().preprocess_data()
+
+
+def test_run_incremental_work_independent_of_history(monkeypatch):
+    # A one bar call preprocesses warmup_bars + 1 rows and appends one row, however long the history is
+    copied = []
+
+    class CountingBuffer(BarBuffer):
+        def __init__(self, frame, capacity=1024):
+            copied.append(len(frame))
+            super().__init__(frame, capacity)
+
+        def _grow(self, size):
+            copied.append(self._size)
+            super()._grow(size)
+
+    monkeypatch.setattr(backtest_engine, "BarBuffer", CountingBuffer)
+    history_bars, calls, warmup = 20_000, 200, 50
+    data = make_ohlcv(history_bars + calls)
+    engine = PreprocessCounting(commission=0.001)
+    engine.preprocessed = []
+    engine.add_data_stream(data.iloc[:history_bars].copy())
+    engine.run()
+    engine.preprocessed = []
+    for i in range(history_bars, history_bars + calls):
+        engine.run_incremental(data.iloc[i:i + 1], warmup_bars=warmup)
+    assert engine.preprocessed == [warmup + 1] * calls
+    # the history is copied into the buffer once, growing it copies at most as many rows again
+    assert copied[0] == history_bars
+    assert sum(copied[1:]) <= history_bars + calls
+    assert engine.get_latency_stats()["bars"] == calls
+
+
+@pytest.mark.parametrize("anchored", [False, True])
+def test_walk_forward_matches_window_by_window(anchored):
+    # Each window's choice and out-of-sample trades should match optimizing and testing it in process
+    windows = [5, 10, 20, 40]
+    engine = WindowStrategy(commission=0.001)
+    engine.add_data_stream(make_ohlcv(900))
+    result = engine.walk_forward({"window": windows}, ["total_profit"], train_bars=300, test_bars=200, anchored=anchored, max_workers=2)
+    assert [window["test"] for window in result] == [(300, 500), (500, 700), (700, 900)]
+    assert [window["train"][0] for window in result] == ([0, 0, 0] if anchored else [0, 200, 400])
+
+    reference = WindowStrategy(commission=0.001)
+    reference.add_data_stream(make_ohlcv(900))
+    reference.param_names = ["window"]
+    expected_trades = []
+    for window in result:
+        in_sample = [reference.evaluate_combination((w,), start=window["train"][0], stop=window["train"][1]) for w in windows]
+        best = max(in_sample, key=lambda r: r["total_profit"])
+        assert window["params"] == best["params"] and window["in_sample"] == best
+        assert window["out_of_sample"] == reference.evaluate_combination((best["params"]["window"],), start=window["test"][0], stop=window["test"][1])
+        expected_trades.append(reference.get_trade_history().to_dataframe())
+
+    expected = pd.concat(expected_trades, ignore_index=True)
+    trades = engine.get_trade_history().to_dataframe()
+    columns = ["quantity", "open_price", "close_price", "profit", "open_time", "close_time"]
+    pd.testing.assert_frame_equal(trades[columns], expected[columns])
+    assert engine.get_portfolio_size() == pytest.approx(100 + expected["profit"].sum())
+    assert engine.get_trading_stats()["total_trades"] == len(expected)
+
+
+def test_walk_forward_without_valid_combinations():
+    # Constraints rejecting every combination fail clearly instead of leaving windows without a choice
+    engine = WindowStrategy(commission=0.001)
+    engine.add_data_stream(make_ohlcv(900))
+    with pytest.raises(ValueError, match="accept none of the 4"):
+        engine.walk_forward({"window": [5, 10, 20, 40]}, ["total_profit"], train_bars=300, test_bars=200,
+                            constraints=lambda p: p["window"] > 100, max_workers=1)
+    with pytest.raises(ValueError):
+        engine.optimize_halving({"window": [5, 10, 20, 40]}, ["total_profit"], constraints=lambda p: p["window"] > 100, max_workers=1)
+
+
+class LadderStrategy(BacktestEngine):
+    def strategy(self, row):
+        # a new position every few bars, held until its TP or SL, so many are open at once
+        if row.Index.hour % 3 == 0:
+            mode = "long" if row.Index.hour % 2 == 0 else "short"
+            direction = 1 if mode == "long" else -1
+            self.position_book.open_position(quantity=1.0, open_price=row.close, mode=mode, tag=str(row.Index), open_time=row.Index,
+                                             tp=row.close * (1 + direction * 0.02), sl=row.close * (1 - direction * 0.01))
+
+
+class TrailingLadderStrategy(LadderStrategy):
+    def strategy(self, row):
+        super().strategy(row)
+        # trails every stop to the same distance from the close, so many positions exit on the same bar
+        for pos in list(self.position_book.position_collection):
+            if pos.is_long() and row.close * 0.995 > pos.sl:
+                pos.sl = row.close * 0.995
+            elif pos.is_short() and row.close * 1.005 < pos.sl:
+                pos.sl = row.close * 1.005
+
+
+@pytest.mark.parametrize("strategy_cls", [LadderStrategy, TrailingLadderStrategy])
+@pytest.mark.parametrize("columnar", [False, True])
+def test_scheduled_exits_match_per_bar_checks(columnar, strategy_cls):
+    # Exits found at entry should close the same positions, at the same bars and prices and in the same order, as checking every bar
+    expected = strategy_cls(commission=0.001, columnar_positions=columnar)
+    expected.add_data_stream(make_ohlcv())
+    expected.run()
+
+    data = make_ohlcv()
+    scheduled = strategy_cls(commission=0.001, columnar_positions=columnar, scheduled_exits=True)
+    scheduled.add_data_stream(data.iloc[:1200].copy())
+    scheduled.run(row_cursor=True)
+    scheduled.run_incremental(data.iloc[1200:])
+
+    trades = scheduled.get_trade_history().to_dataframe()
+    assert len(trades) > 200
+    pd.testing.assert_frame_equal(trades, expected.get_trade_history().to_dataframe())
+    assert len(scheduled.position_book.position_collection) == len(expected.position_book.position_collection)
+
+
+class SweepStrategy(CrossStrategy):
+    def strategy_sweep(self, df, params):
+        return {
+            "entry": df["signal"],
+            "exit": df["cross"],
+            "size": params["size"],
+            "tp_pct": params["tp_pct"],
+            "sl_pct": params["sl_pct"],
+        }
+
+
+class SweepReference(CrossStrategy):
+    def strategy_vectorized(self, df):
+        params = self.states["params"]
+        long = df["signal"] > 0
+        return pd.DataFrame({
+            "entry": df["signal"],
+            "exit": df["cross"],
+            "size": params["size"],
+            "tp": np.where(long, df["close"] * (1 + params["tp_pct"]), df["close"] * (1 - params["tp_pct"])),
+            "sl": np.where(long, df["close"] * (1 - params["sl_pct"]), df["close"] * (1 + params["sl_pct"])),
+        }, index=df.index)
+
+
+def test_sweep_matches_run_vectorized():
+    # Every parameter set of a sweep should trade exactly like run_vectorized() with those parameters
+    choices = {"tp_pct": [0.01, 0.03, 0.1], "sl_pct": [0.005, 0.02], "size": [1.0, 2.5]}
+    engine = SweepStrategy(commission=0.001)
+    engine.add_data_stream(make_ohlcv())
+    results = engine.sweep(choices, constraints=lambda p: p["tp_pct"] > p["sl_pct"] * 2, batch_size=5)
+    assert len(results) == len(engine.sweep_histories) == 6
+    assert engine._next_bar == len(engine.data_stream)
+
+    for result, history in zip(results, engine.sweep_histories):
+        reference = SweepReference(commission=0.001)
+        reference.add_data_stream(make_ohlcv())
+        reference.states["params"] = result["params"]
+        reference.run_vectorized()
+        pd.testing.assert_frame_equal(history.to_dataframe(), reference.get_trade_history().to_dataframe())
+        expected = reference.get_trading_stats()
+        assert result.keys() == {"params", *expected}
+        for name, value in expected.items():
+            assert result[name] == (pytest.approx(value) if isinstance(value, float) else value)
+
+
+def test_plot_trading_stats_without_showing(tmp_path):
+    # One WebGL line per side of trades, the close and PnL lines downsampled, saved to HTML
+    engine = CrossStrategy(commission=0.001)
+    engine.add_data_stream(make_ohlcv())
+    engine.run()
+    trades = engine.get_trade_history().to_dataframe()
+    fig = engine.plot_trading_stats(max_points=200, show=False, write_html=str(tmp_path / "report.html"))
+
+    close, long, short, pnl = fig.data[:4]
+    assert all(trace.type == "scattergl" for trace in (close, long, short, pnl))
+    assert len(close.x) <= 200 and close.x[0] == engine.data_stream.index[0]
+    assert len(long.x) == 3 * (trades["mode"] == "long").sum()
+    assert len(short.x) == 3 * (trades["mode"] == "short").sum()
+    assert np.isnan(long.y[2::3]).all()
+    assert len(pnl.x) == min(200, len(trades))
+    assert (tmp_path / "report.html").stat().st_size > 0
+
+    # A bar range is plotted in full, with the trades overlapping it
+    fig = engine.plot_trading_stats(downsample=None, start=500, stop=800, show=False)
+    close, long, short, _ = fig.data[:4]
+    assert len(close.x) == 300
+    first, last = engine.data_stream.index[500], engine.data_stream.index[799]
+    overlapping = ((trades["close_time"] >= first) & (trades["open_time"] <= last)).sum()
+    assert 0 < len(long.x) + len(short.x) == 3 * overlapping
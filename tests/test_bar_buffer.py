@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+from easy_backtest.bar_buffer import BarBuffer
+
+
+def test_appends_match_concat():
+    # Appending batches past the capacity gives the frame pd.concat would, time zone and dtypes included
+    index = pd.date_range("2024-01-01", periods=300, freq="h", tz="Europe/Paris")
+    df = pd.DataFrame({"close": np.arange(300.0), "volume": np.arange(300), "note": ["x"] * 300}, index=index)
+    buffer = BarBuffer(df.iloc[:10], capacity=16)
+    for start in range(10, 300, 37):
+        buffer.append(df.iloc[start:start + 37])
+    assert len(buffer) == 300
+    pd.testing.assert_frame_equal(buffer.frame(), df, check_freq=False)
+
+
+def test_frame_shares_memory_until_next_append():
+    # The frame is a view of the buffer, cached until bars are appended
+    df = pd.DataFrame({"close": np.arange(5.0)})
+    buffer = BarBuffer(df)
+    frame = buffer.frame()
+    assert buffer.frame() is frame
+    assert np.shares_memory(frame["close"].to_numpy(), buffer._arrays["close"])
+    buffer.append(pd.DataFrame({"close": [5.0]}, index=[5]))
+    assert buffer.frame() is not frame
+    assert buffer.frame()["close"].tolist() == [0.0, 1.0, 2.0, 3.0, 4.0, 5.0]
@@ -0,0 +1,23 @@
+import pytest
+from benchmarks import bench_row_cursor, suite
+
+TINY = {"bars": [300], "history": [300], "positions": [1, 5], "trades": [10], "results": [20], "optimize_bars": 300}
+
+
+@pytest.mark.parametrize("name", list(suite.BENCHMARKS))
+def test_benchmark_runs_at_tiny_scale(name):
+    # Every benchmark of the suite runs end to end and records a timing for each case
+    extra = ([1],) if name == "optimize" else ()
+    results = suite.BENCHMARKS[name](TINY, 1, *extra)
+    assert results
+    for result in results:
+        assert result["name"] == name
+        assert result["repeat"] == 1
+        assert result["seconds"] >= 0
+
+
+def test_row_cursor_benchmark_runs_at_tiny_scale():
+    # Both strategies are timed through both row paths
+    results = bench_row_cursor.compare(500)
+    assert [name for name, _, _ in results] == ["IdleStrategy", "MovingAverageStrategy"]
+    assert all(itertuples > 0 and cursor > 0 for _, itertuples, cursor in results)
@@ -0,0 +1,110 @@
+import time
+from datetime import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from easy_backtest.backtest_engine import BacktestEngine
+from easy_backtest.checkpoint import load_checkpoint, read_meta, save_checkpoint
+from easy_backtest.trade_history import TradeHistory
+from conftest import make_ohlcv
+
+
+class GridStrategy(BacktestEngine):
+    def strategy(self, row):
+        self.states["bars"] = self.states.get("bars", 0) + 1
+        if row.Index.hour % 4 == 0:
+            self.position_book.open_long_position(quantity=0.5, open_price=row.close, tag=f"grid{row.Index}", tp=row.close * 1.02, sl=row.close * 0.97, open_time=row.Index)
+
+
+class OtherStrategy(GridStrategy):
+    pass
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_restore_continues_like_uninterrupted_run(tmp_path, columnar):
+    # Saving at bar 800, restoring into a fresh engine and continuing gives the same trades and states
+    data = make_ohlcv(1200, tz="UTC")
+    expected = GridStrategy(commission=0.001, columnar_positions=columnar)
+    expected.add_data_stream(data.copy())
+    expected.run()
+
+    engine = GridStrategy(commission=0.001, columnar_positions=columnar)
+    engine.add_data_stream(data.iloc[:800].copy())
+    engine.run()
+    assert len(list(engine.position_book.position_collection)) > 0
+    path = str(tmp_path / "engine.ckpt")
+    engine.save_checkpoint(path)
+
+    restored = GridStrategy(commission=0.001, columnar_positions=columnar)
+    restored.add_data_stream(data.iloc[:800].copy())
+    meta = restored.load_checkpoint(path)
+    assert meta["next_bar"] == 800 and meta["columnar"] == columnar
+    assert restored.get_portfolio_size() == engine.get_portfolio_size()
+    restored.run_incremental(data.iloc[800:])
+
+    assert restored.states == expected.states
+    pd.testing.assert_frame_equal(restored.get_trade_history().to_dataframe(), expected.get_trade_history().to_dataframe())
+    assert restored.get_trading_stats() == expected.get_trading_stats()
+    assert [pos.tag for pos in restored.position_book.position_collection] == [pos.tag for pos in expected.position_book.position_collection]
+
+
+def test_checkpoint_rejects_other_strategy(tmp_path):
+    # A checkpoint only restores into the strategy class it was taken from
+    engine = GridStrategy(commission=0.001)
+    engine.add_data_stream(make_ohlcv(100, tz="UTC"))
+    engine.run()
+    path = str(tmp_path / "engine.ckpt")
+    save_checkpoint(engine, path)
+    assert read_meta(path)["strategy"].endswith("GridStrategy")
+    with pytest.raises(ValueError):
+        load_checkpoint(OtherStrategy(commission=0.001), path)
+    (tmp_path / "other.bin").write_bytes(b"not a checkpoint")
+    with pytest.raises(ValueError):
+        read_meta(str(tmp_path / "other.bin"))
+
+
+def test_restore_millions_of_trades(tmp_path):
+    # Restoring is dominated by reading the trade columns, not by the number of trades
+    engine = GridStrategy(commission=0.001)
+    n = 2_000_000
+    history = TradeHistory(initial_portfolio=100)
+    history.record_trade("a", "long", 1.0, 100.0, 101.0, 1.0, 0.01, datetime(2024, 1, 1), datetime(2024, 1, 2))
+    state = history.to_arrays()
+    state["columns"] = {name: np.resize(column, n) for name, column in state["columns"].items()}
+    engine.position_book.trade_history = TradeHistory.from_arrays(state)
+    path = str(tmp_path / "engine.ckpt")
+    engine.save_checkpoint(path)
+
+    restored = GridStrategy(commission=0.001)
+    began = time.perf_counter()
+    restored.load_checkpoint(path)
+    assert time.perf_counter() - began < 0.5
+    assert len(restored.get_trade_history()) == n
+    assert restored.get_trade_history().trades[-1] == history.trades[0]
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_restore_trailed_stop(tmp_path, columnar):
+    # A stop trailed past the entry is restored as it was, not checked against the open price again
+    engine = GridStrategy(commission=0.001, columnar_positions=columnar)
+    engine.position_book.open_long_position(quantity=1.0, open_price=100.0, tag="long", tp=110.0, sl=95.0)
+    engine.position_book.open_short_position(quantity=1.0, open_price=100.0, tag="short", tp=90.0, sl=105.0)
+    engine.position_book.update_tp_sl("long", tp=110.0, sl=100.05)
+    engine.position_book.update_tp_sl("short", tp=90.0, sl=99.95)
+    path = str(tmp_path / "engine.ckpt")
+    engine.save_checkpoint(path)
+
+    restored = GridStrategy(commission=0.001, columnar_positions=columnar)
+    restored.load_checkpoint(path)
+    assert [(pos.tag, pos.tp, pos.sl) for pos in restored.position_book.position_collection] == [
+        ("long", 110.0, 100.05), ("short", 90.0, 99.95)]
+
+
+def test_checkpoint_rejects_other_initial_portfolio(tmp_path):
+    # Stats are computed from the initial portfolio, restoring into another one would mix both
+    engine = GridStrategy(commission=0.001, portfolio_size=1000)
+    path = str(tmp_path / "engine.ckpt")
+    engine.save_checkpoint(path)
+    with pytest.raises(ValueError):
+        load_checkpoint(GridStrategy(commission=0.001), path)
+    assert load_checkpoint(GridStrategy(commission=0.001, portfolio_size=1000), path)["initial_portfolio"] == 1000
@@ -0,0 +1,138 @@
+import pickle
+import pandas as pd
+import pyarrow
+import pytest
+from easy_backtest.backtest_engine import BacktestEngine
+from easy_backtest.data_source import ArrowSource, DataSource, NumpyMemmapSource, ParquetSource
+from conftest import make_ohlcv
+
+
+class SmaStrategy(BacktestEngine):
+    def preprocess_data(self):
+        df = self.data_stream
+        df["ma"] = df["close"].rolling(window=50).mean()
+        df["above"] = df["close"] > df["ma"]
+        df["cross"] = df["above"] != df["above"].shift()
+        return df
+
+    def strategy(self, row):
+        pos = self.position_book.get_position_by_tag("sma")
+        if pos is not None and row.cross:
+            self.position_book.close_position(tag="sma", close_price=row.close, close_time=row.Index)
+        elif pos is None and row.cross and row.above:
+            self.position_book.open_long_position(quantity=1.0, open_price=row.close, tag="sma", sl=row.close * 0.97, open_time=row.Index)
+
+
+def test_memmap_source_round_trip(tmp_path):
+    # Written frames read back with the same index, timezone and columns, for any row range
+    df = make_ohlcv(500, tz="America/New_York", name="time")
+    source = NumpyMemmapSource.write(df, str(tmp_path / "bars"))
+    assert len(source) == 500
+    assert source.columns == list(df.columns)
+    pd.testing.assert_frame_equal(source.read(0, 500), df, check_freq=False)
+    pd.testing.assert_frame_equal(source.read(120, 130), df.iloc[120:130], check_freq=False)
+
+    # pickling keeps the path only, maps are reopened
+    restored = pickle.loads(pickle.dumps(source))
+    assert restored._arrays is None
+    pd.testing.assert_frame_equal(restored.read(10, 20), df.iloc[10:20], check_freq=False)
+
+
+def test_iter_chunks_with_warmup(tmp_path):
+    # Chunks cover the rows once, each preceded by up to warmup rows
+    source = NumpyMemmapSource.write(make_ohlcv(1000, name="time"), str(tmp_path / "bars"))
+    chunks = list(source.iter_chunks(300, warmup=40, start=100))
+    assert [warmup for _, warmup in chunks] == [40, 40, 40]
+    assert [len(frame) - warmup for frame, warmup in chunks] == [300, 300, 300]
+    assert chunks[0][0].index[0] == source.read(60, 61).index[0]
+
+    first, warmup = next(source.iter_chunks(300, warmup=40))
+    assert warmup == 0 and len(first) == 300
+
+
+def test_chunked_run_matches_in_memory(tmp_path):
+    # With warm-up bars covering the lookback, a chunked run trades exactly like an in-memory one
+    df = make_ohlcv(3000, name="time")
+    expected = SmaStrategy(commission=0.001)
+    expected.add_data_stream(df.copy())
+    expected.run()
+    expected_trades = expected.position_book.trade_history.to_dataframe()
+
+    for row_cursor in (False, True):
+        engine = SmaStrategy(commission=0.001)
+        engine.add_data_source(NumpyMemmapSource.write(df, str(tmp_path / "bars")), chunk_size=700, warmup_bars=51)
+        engine.run(row_cursor=row_cursor)
+        trades = engine.position_book.trade_history.to_dataframe()
+        assert len(trades) > 10
+        pd.testing.assert_frame_equal(trades, expected_trades)
+        assert engine.get_trading_stats()["sharpe_ratio"] == pytest.approx(expected.get_trading_stats()["sharpe_ratio"])
+
+
+class WindowStrategy(BacktestEngine):
+    def strategy(self, row):
+        if row.Index.hour % self.states["params"]["window"]:
+            return
+        if self.position_book.get_position_by_tag("w") is not None:
+            self.position_book.close_position(tag="w", close_price=row.close, close_time=row.Index)
+        else:
+            self.position_book.open_long_position(quantity=1.0, open_price=row.close, tag="w", open_time=row.Index)
+
+
+def test_optimize_over_data_source(tmp_path, monkeypatch):
+    # Workers open the source themselves instead of attaching to shared memory
+    monkeypatch.chdir(tmp_path)
+    df = make_ohlcv(1500, name="time")
+    engine = WindowStrategy(commission=0.001)
+    engine.add_data_source(NumpyMemmapSource.write(df, str(tmp_path / "bars")), chunk_size=400)
+    results = engine.optimize({"window": [2, 3, 5]}, optimize_metrics=["total_profit"], max_workers=2)
+
+    in_memory = WindowStrategy(commission=0.001)
+    in_memory.add_data_stream(df)
+    in_memory.param_names = ["window"]
+    expected = {window: in_memory.evaluate_combination((window,))["total_profit"] for window in (2, 3, 5)}
+    best = max(expected, key=expected.get)
+    assert [(result["params"]["window"], result["total_profit"]) for result in results] == [(best, pytest.approx(expected[best]))]
+
+
+def test_parquet_source_row_groups(tmp_path):
+    # Parquet row groups are read lazily, chunks may span several of them
+    df = make_ohlcv(1000, name="time")
+    path = str(tmp_path / "bars.parquet")
+    df.to_parquet(path, row_group_size=128)
+    source = ParquetSource(path)
+    assert len(source) == 1000
+    assert source.columns == list(df.columns)
+    pd.testing.assert_frame_equal(source.read(100, 400), df.iloc[100:400], check_freq=False)
+
+
+def test_arrow_source_record_batches(tmp_path):
+    # Arrow record batches are memory-mapped, a chunked run over them trades like an in-memory one
+    df = make_ohlcv(3000, name="time")
+    path = str(tmp_path / "bars.arrow")
+    table = pyarrow.Table.from_pandas(df)
+    with pyarrow.ipc.new_file(path, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=256):
+            writer.write_batch(batch)
+    source = ArrowSource(path)
+    assert len(source) == 3000
+    assert source.columns == list(df.columns)
+    pd.testing.assert_frame_equal(source.read(200, 900), df.iloc[200:900], check_freq=False)
+    pd.testing.assert_frame_equal(pickle.loads(pickle.dumps(source)).read(0, 10), df.iloc[:10], check_freq=False)
+
+    expected = SmaStrategy(commission=0.001)
+    expected.add_data_stream(df.copy())
+    expected.run()
+    engine = SmaStrategy(commission=0.001)
+    engine.add_data_source(source, chunk_size=700, warmup_bars=51)
+    engine.run()
+    pd.testing.assert_frame_equal(engine.position_book.trade_history.to_dataframe(), expected.position_book.trade_history.to_dataframe())
+
+
+def test_data_source_is_abstract():
+    # A source must implement its length, reads and fingerprint
+    class Incomplete(DataSource):
+        def __len__(self):
+            return 0
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from easy_backtest.downsample import downsample, lttb, min_max
+
+
+def test_short_series_are_kept_whole():
+    # Nothing to reduce when there are no more points than asked for
+    values = np.arange(10.0)
+    assert np.array_equal(lttb(values, 10), np.arange(10))
+    assert np.array_equal(min_max(values, 50), np.arange(10))
+
+
+def test_lttb_keeps_ends_and_peaks():
+    # The first and last points stay, and isolated spikes form the largest triangles of their buckets
+    values = np.sin(np.linspace(0, 20, 10_000))
+    values[[2_500, 7_000]] = [5.0, -5.0]
+    kept = lttb(values, 200)
+    assert len(kept) <= 200
+    assert kept[0] == 0 and kept[-1] == len(values) - 1
+    assert np.all(np.diff(kept) > 0)
+    assert {2_500, 7_000} <= set(kept)
+
+
+def test_min_max_keeps_every_bucket_extreme():
+    # The global minimum and maximum are always among the kept points, NaN never is
+    rng = np.random.default_rng(0)
+    values = np.cumsum(rng.normal(size=100_003))
+    values[:500] = np.nan
+    kept = min_max(values, 1000)
+    assert len(kept) <= 1002
+    assert {int(np.nanargmin(values)), int(np.nanargmax(values))} <= set(kept)
+    assert not np.isnan(values[kept[1:]]).any()
+
+
+def test_downsample_unknown_method():
+    # Methods are looked up by name
+    with pytest.raises(ValueError):
+        downsample(np.arange(10.0), 5, "mean")
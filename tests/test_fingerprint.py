@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+from easy_backtest import fingerprint as fp
+
+
+def test_fingerprint_depends_on_content():
+    # Test that equal values share a fingerprint and different values or dtypes don't
+    a = np.arange(100, dtype=float)
+    assert fp.fingerprint(a) == fp.fingerprint(a.copy())
+    assert fp.fingerprint(a) != fp.fingerprint(a[::-1])
+    assert fp.fingerprint(a) != fp.fingerprint(a.astype(np.float32))
+    assert fp.fingerprint(pd.Series(a)) == fp.fingerprint(a)
+
+
+def test_fingerprint_memoizes_read_only_arrays():
+    # Test that read-only arrays are hashed once, writable ones every time
+    frozen = np.arange(10, dtype=float)
+    frozen.flags.writeable = False
+    fp.fingerprint(frozen)
+    assert len([key for key in fp._memo if key[0] == id(frozen)]) == 1
+
+    writable = np.arange(10, dtype=float)
+    before = fp.fingerprint(writable)
+    writable[0] = 42
+    assert fp.fingerprint(writable) != before
+
+
+def test_fingerprint_frame():
+    # Test that frames differing in values, columns or index get different fingerprints
+    df = pd.DataFrame({"close": [1.0, 2.0]}, index=pd.date_range("2024-01-01", periods=2))
+    assert fp.fingerprint_frame(df) == fp.fingerprint_frame(df.copy())
+    assert fp.fingerprint_frame(df) != fp.fingerprint_frame(df.rename(columns={"close": "open"}))
+    assert fp.fingerprint_frame(df) != fp.fingerprint_frame(df.tz_localize("UTC"))
+    assert fp.fingerprint_frame(df) != fp.fingerprint_frame(df * 2)
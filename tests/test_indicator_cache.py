@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+from easy_backtest.backtest_engine import BacktestEngine
+from easy_backtest.indicator_cache import IndicatorCache
+
+
+class Engine(BacktestEngine):
+    def strategy(self, row):
+        pass
+
+
+def make_engine(n=300):
+    engine = Engine(commission=0.001)
+    close = np.linspace(100, 130, n)
+    engine.add_data_stream(pd.DataFrame({
+        "open": close, "high": close + 1, "low": close - 1, "close": close, "volume": 1.0,
+    }, index=pd.date_range("2024-01-01", periods=n, freq="h")))
+    return engine
+
+
+def test_cache_evicts_least_recently_used():
+    # Test that the cache keeps within its byte budget, dropping the oldest entries first
+    cache = IndicatorCache(max_bytes=3 * 800)
+    for key in "abc":
+        cache.get(key, lambda: np.zeros(100))
+    cache.get("a", lambda: pytest.fail("should be cached"))
+    cache.get("d", lambda: np.zeros(100))
+    assert "b" not in cache
+    assert all(key in cache for key in "acd")
+    assert cache.nbytes == 3 * 800
+
+
+def test_cache_returns_read_only_arrays():
+    # Test that cached arrays cannot be modified by callers
+    cache = IndicatorCache()
+    source = np.ones(5)
+    array = cache.get("key", lambda: source)
+    assert not array.flags.writeable
+    assert source.flags.writeable
+
+
+def test_indicator_matches_pandas_and_is_reused(monkeypatch):
+    # Test that engine.indicator computes each indicator once per distinct data
+    cache = IndicatorCache()
+    monkeypatch.setattr(IndicatorCache, "_shared", cache)
+    engine = make_engine()
+    close = engine.data_stream["close"]
+
+    sma = engine.indicator("sma", "close", 20)
+    pd.testing.assert_series_equal(sma, close.rolling(20).mean(), check_names=False)
+    pd.testing.assert_series_equal(engine.indicator("ema", "close", 10), close.ewm(span=10, adjust=False).mean(), check_names=False)
+    assert cache.misses == 2
+
+    # another engine on equal data reuses the cached arrays
+    assert make_engine().indicator("sma", "close", 20) is not sma
+    assert cache.hits == 1 and cache.misses == 2
+    # different arguments or data are computed again
+    engine.indicator("sma", "close", 30)
+    make_engine(200).indicator("sma", "close", 20)
+    assert cache.misses == 4
+
+
+def test_indicator_custom_function_and_errors(monkeypatch):
+    # Test indicators given as functions, and unknown names
+    monkeypatch.setattr(IndicatorCache, "_shared", IndicatorCache())
+    engine = make_engine()
+    result = engine.indicator(np.multiply, "close", 2)
+    np.testing.assert_allclose(result, engine.data_stream["close"] * 2)
+    with pytest.raises(ValueError):
+        engine.indicator("nope", "close", 3)
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+from easy_backtest.backtest_engine import BacktestEngine
+from easy_backtest.data_source import NumpyMemmapSource
+from easy_backtest.lower_timeframe import LowerTimeframe
+
+
+def make_minutes(n=60 * 400, seed=0, tz=None):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    open_ = np.concatenate([[close[0]], close[:-1]])
+    spread = np.abs(rng.normal(0, 0.0005, n)) * close
+    return pd.DataFrame({
+        "open": open_,
+        "high": np.maximum(open_, close) + spread,
+        "low": np.minimum(open_, close) - spread,
+        "close": close,
+        "volume": rng.integers(1, 100, n).astype(float),
+    }, index=pd.date_range("2024-01-01", periods=n, freq="min", tz=tz, name="time"))
+
+
+def to_hours(minutes):
+    return minutes.resample("h").agg({"open": "first", "high": "max", "low": "min", "close": "last", "volume": "sum"})
+
+
+class BracketStrategy(BacktestEngine):
+    def strategy(self, row):
+        if self.position_book.get_position_by_tag("b") is None:
+            mode = "long" if row.Index.hour % 2 == 0 else "short"
+            direction = 1 if mode == "long" else -1
+            self.position_book.open_position(quantity=1.0, open_price=row.close, mode=mode, tag="b", open_time=row.Index,
+                                             tp=row.close * (1 + direction * 0.01), sl=row.close * (1 - direction * 0.008))
+
+    def strategy_vectorized(self, df):
+        direction = np.where(df.index.hour % 2 == 0, 1, -1)
+        return pd.DataFrame({"entry": direction, "tp": df["close"] * (1 + direction * 0.01), "sl": df["close"] * (1 - direction * 0.008)}, index=df.index)
+
+
+def first_hit(minutes, trade):
+    # the first minute after the entry bar where TP or SL is crossed, stop loss when a minute crosses both
+    fine = minutes[minutes.index >= trade.open_time + pd.Timedelta("1h")]
+    long = trade.mode == "long"
+    tp = trade.open_price * (1.01 if long else 0.99)
+    sl = trade.open_price * (0.992 if long else 1.008)
+    sl_hits = (fine["low"] <= sl) if long else (fine["high"] >= sl)
+    tp_hits = (fine["high"] >= tp) if long else (fine["low"] <= tp)
+    sl_at = sl_hits.to_numpy().argmax() if sl_hits.any() else len(fine)
+    tp_at = tp_hits.to_numpy().argmax() if tp_hits.any() else len(fine)
+    return sl if sl_at <= tp_at else tp
+
+
+def test_stop_loss_first(tmp_path):
+    # The fine bars of the hour decide, a fine bar covering both or no fine bars stay stop loss first
+    minutes = make_minutes(180)
+    minutes.iloc[65, minutes.columns.get_loc("high")] = 150.0
+    minutes.iloc[70, minutes.columns.get_loc("low")] = 50.0
+    minutes.iloc[130, [minutes.columns.get_loc("high"), minutes.columns.get_loc("low")]] = [150.0, 50.0]
+    lower = LowerTimeframe(NumpyMemmapSource.write(minutes, str(tmp_path / "minutes")).directory, "1h")
+    hours = pd.date_range("2024-01-01", periods=4, freq="h")
+    assert not lower.stop_loss_first(hours[1], True, tp=140.0, sl=60.0)
+    assert lower.stop_loss_first(hours[1], False, tp=60.0, sl=140.0)
+    assert lower.stop_loss_first(hours[2], True, tp=140.0, sl=60.0)
+    assert lower.stop_loss_first(hours[3], True, tp=140.0, sl=60.0)
+    assert lower.counts == {"tp": 1, "sl": 1, "unresolved": 2}
+
+
+@pytest.mark.parametrize("tz", [None, "America/New_York"])
+def test_ambiguous_bars_follow_fine_bars(tmp_path, tz):
+    # With the minutes of each hour, every TP/SL exit matches the first crossing in the minute data
+    minutes = make_minutes(tz=tz)
+    source = NumpyMemmapSource.write(minutes, str(tmp_path / "minutes"))
+
+    for columnar, scheduled in [(False, False), (True, False), (False, True)]:
+        engine = BracketStrategy(commission=0.001, columnar_positions=columnar, scheduled_exits=scheduled)
+        engine.add_data_stream(to_hours(minutes))
+        engine.add_lower_timeframe(source)
+        engine.run()
+        trades = engine.get_trade_history().to_dataframe()
+        assert len(trades) > 50
+        assert engine.lower_timeframe.counts["tp"] > 0
+        assert trades["close_price"].tolist() == pytest.approx([first_hit(minutes, trade) for trade in trades.itertuples()])
+        resolved_tp = engine.lower_timeframe.counts["tp"]
+
+    # without it the same bars close, those where both are hit at the stop loss
+    engine = BracketStrategy(commission=0.001)
+    engine.add_data_stream(to_hours(minutes))
+    engine.run()
+    assumed = engine.get_trade_history().to_dataframe()
+    assert (assumed["close_time"] == trades["close_time"]).all()
+    assert (assumed["close_price"] != trades["close_price"]).sum() == resolved_tp
+
+
+def test_run_vectorized_resolves_ambiguous_bars(tmp_path):
+    # run_vectorized() asks the lower timeframe on the same bars
+    minutes = make_minutes()
+    engine = BracketStrategy(commission=0.001)
+    engine.add_data_stream(to_hours(minutes))
+    engine.add_lower_timeframe(NumpyMemmapSource.write(minutes, str(tmp_path / "minutes")))
+    engine.run_vectorized()
+    trades = engine.get_trade_history().to_dataframe()
+    assert engine.lower_timeframe.counts["tp"] > 0
+    assert trades["close_price"].tolist() == pytest.approx([first_hit(minutes, trade) for trade in trades.itertuples()])
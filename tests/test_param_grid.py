@@ -0,0 +1,66 @@
+import itertools
+import numpy as np
+import pytest
+from easy_backtest.param_grid import ParameterGrid
+
+CHOICES = {"tp_pct": [0.01, 0.02, 0.03], "short_window": [5, 10], "long_window": [10, 20, 50], "mode": ["a", "b"]}
+
+
+def test_grid_matches_itertools_product():
+    # Test that length, indexing and iteration follow itertools.product
+    grid = ParameterGrid(CHOICES)
+    expected = list(itertools.product(*CHOICES.values()))
+    assert len(grid) == len(expected)
+    assert list(grid) == expected
+    assert [grid[i] for i in range(len(grid))] == expected
+    assert grid[-1] == expected[-1]
+    with pytest.raises(IndexError):
+        grid[len(grid)]
+
+
+def test_decode_many_indices():
+    # Test that vectorized decoding agrees with single decoding
+    grid = ParameterGrid(CHOICES)
+    decoded = grid.decode(np.arange(len(grid)))
+    for i in range(len(grid)):
+        assert tuple(decoded[name][i] for name in grid.names) == grid[i]
+
+
+def test_vectorized_constraints_match_python_constraints():
+    # Test that both kinds of constraints keep the same combinations
+    grid = ParameterGrid(CHOICES)
+    python = grid.valid_indices(lambda p: p["short_window"] < p["long_window"] and p["mode"] == "a")
+    vectorized = grid.valid_indices(lambda p: (p["short_window"] < p["long_window"]) & (p["mode"] == "a"), vectorized=True)
+    np.testing.assert_array_equal(python, vectorized)
+    shards = list(grid.iter_shards(shard_size=7, constraints=lambda p: p["short_window"] < p["long_window"], vectorized=True))
+    assert len(shards) == -(-len(grid) // 7)
+    np.testing.assert_array_equal(np.concatenate(shards), grid.valid_indices(lambda p: p["short_window"] < p["long_window"]))
+
+
+def test_sample_huge_grid_without_replacement():
+    # Test sampling from a grid far too large to materialize
+    grid = ParameterGrid({f"p{i}": list(range(20)) for i in range(8)})
+    assert len(grid) == 20 ** 8
+    sampled = grid.sample(500, seed=1)
+    assert len(set(sampled)) == 500
+    constrained = grid.sample(200, lambda p: p["p0"] < p["p1"], vectorized=True, seed=1)
+    assert len(set(constrained)) == 200
+    assert all(grid[i][0] < grid[i][1] for i in constrained)
+
+
+def test_sample_small_grid_with_constraints():
+    # Test that sampling stops at the number of valid combinations
+    grid = ParameterGrid(CHOICES)
+    valid = set(grid.valid_indices(lambda p: p["mode"] == "b").tolist())
+    sampled = grid.sample(1000, lambda p: p["mode"] == "b", seed=0)
+    assert set(sampled) == valid
+
+
+def test_iter_batches_regroups_shards():
+    # Valid indices come in full batches across shard boundaries, in grid order, without valid_indices()
+    grid = ParameterGrid({"a": list(range(100)), "b": list(range(50))})
+    constraints = lambda p: p["a"] % 3 == 0
+    batches = list(grid.iter_batches(64, constraints, vectorized=True, shard_size=1000))
+    assert all(len(batch) == 64 for batch in batches[:-1]) and 0 < len(batches[-1]) <= 64
+    assert np.array_equal(np.concatenate(batches), grid.valid_indices(constraints, vectorized=True))
+
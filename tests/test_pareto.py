@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+from easy_backtest.pareto import nondominated_ranks, objective_matrix
+
+
+def reference_ranks(points):
+    # peel fronts with the original pairwise definition of dominance
+    ranks = np.full(len(points), -1)
+    remaining = set(range(len(points)))
+    rank = 0
+    while remaining:
+        front = {i for i in remaining
+                 if not any(all(points[j] >= points[i]) and any(points[j] > points[i]) for j in remaining)}
+        for i in front:
+            ranks[i] = rank
+        remaining -= front
+        rank += 1
+    return ranks
+
+
+@pytest.mark.parametrize("objectives", [1, 2, 3, 5])
+@pytest.mark.parametrize("seed", [0, 1])
+def test_ranks_match_pairwise_definition(objectives, seed):
+    # Test the sort-and-sweep and ENS-BS paths against the brute force definition, with ties
+    rng = np.random.default_rng(seed)
+    points = rng.integers(0, 6, size=(300, objectives)).astype(float)
+    np.testing.assert_array_equal(nondominated_ranks(points), reference_ranks(points))
+
+
+def test_duplicate_points_share_a_front():
+    # Test that equal points don't dominate each other
+    points = np.array([[1.0, 1.0], [1.0, 1.0], [0.0, 0.0]])
+    assert nondominated_ranks(points).tolist() == [0, 0, 1]
+
+
+def test_objective_matrix_directions_and_missing_values():
+    # Test minimized metrics, timedeltas and NaN handling
+    results = [
+        {"sharpe_ratio": 1.0, "max_loss": -5.0, "average_holding_period": pd.Timedelta(hours=1)},
+        {"sharpe_ratio": np.nan, "max_loss": -1.0, "average_holding_period": pd.NaT},
+    ]
+    points = objective_matrix(results, ["sharpe_ratio", "max_loss", "average_holding_period"], minimize=["max_loss"])
+    np.testing.assert_array_equal(points, [[1.0, 5.0, 3600.0], [-np.inf, 1.0, -np.inf]])
+    with pytest.raises(ValueError):
+        objective_matrix(results, ["sharpe_ratio"], minimize=["max_loss"])
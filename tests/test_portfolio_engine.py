@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+import pytest
+from easy_backtest.backtest_engine import BacktestEngine
+from easy_backtest.portfolio_engine import PortfolioBacktestEngine
+from conftest import make_ohlcv
+
+
+STREAMS = {"AAA": dict(n=600, seed=0), "BBB": dict(n=600, seed=1, drop_every=7), "CCC": dict(n=600, seed=2, drop_every=3)}
+
+
+class HourlySingle(BacktestEngine):
+    def strategy(self, row):
+        pos = self.position_book.get_position_by_tag("t")
+        if pos is not None and row.Index.hour % 5 == 3:
+            self.position_book.close_position(tag="t", close_price=row.close, close_time=row.Index)
+        elif pos is None and row.Index.hour % 5 == 0:
+            self.position_book.open_long_position(quantity=1.0, open_price=row.close, tag="t", tp=row.close * 1.01, sl=row.close * 0.99, open_time=row.Index)
+
+
+class HourlyPortfolio(PortfolioBacktestEngine):
+    def strategy(self, bar):
+        hour = bar.Index.hour
+        for k in np.flatnonzero(bar.available):
+            symbol = self.symbols[k]
+            close = bar.close[k]
+            pos = self.position_book.get_position_by_tag(symbol)
+            if pos is not None and hour % 5 == 3:
+                self.position_book.close_position(tag=symbol, close_price=close, close_time=bar.Index)
+            elif pos is None and hour % 5 == 0:
+                self.position_book.open_long_position(quantity=1.0, open_price=close, tag=symbol, tp=close * 1.01, sl=close * 0.99, open_time=bar.Index, symbol=symbol)
+
+
+def test_add_data_streams_aligns_on_union_index():
+    # Symbols with missing bars are NaN there, fields are (field, symbol) columns
+    engine = HourlyPortfolio(commission=0.001)
+    engine.add_data_streams({symbol: make_ohlcv(**kwargs) for symbol, kwargs in STREAMS.items()})
+    assert engine.symbols == ["AAA", "BBB", "CCC"]
+    assert len(engine.data_stream) == 600
+    assert list(engine.data_stream["close"].columns) == engine.symbols
+    assert engine.data_stream["close"]["BBB"].isna().sum() == len(range(1, 600, 7))
+    assert engine.data_stream["close"]["AAA"].notna().all()
+
+
+def test_portfolio_trades_match_single_asset_runs():
+    # Each symbol's trades, TP/SL included, should match a single-asset backtest of that symbol
+    engine = HourlyPortfolio(commission=0.001)
+    engine.add_data_streams({symbol: make_ohlcv(**kwargs) for symbol, kwargs in STREAMS.items()})
+    engine.run()
+    trades = engine.position_book.trade_history.to_dataframe()
+    assert "symbol" in trades
+    # a checkpoint of the run resumes after its last bar
+    assert engine._next_bar == len(engine.data_stream)
+
+    columns = ["tag", "mode", "quantity", "open_price", "close_price", "profit", "open_time", "close_time"]
+    for symbol, kwargs in STREAMS.items():
+        single = HourlySingle(commission=0.001)
+        single.add_data_stream(make_ohlcv(**kwargs))
+        single.run()
+        expected = single.position_book.trade_history.to_dataframe()
+        expected["tag"] = symbol
+        actual = trades[trades["symbol"] == symbol].astype({"tag": str, "mode": str})
+        expected = expected.astype({"tag": str, "mode": str})
+        assert len(actual) == len(expected) > 0
+        pd.testing.assert_frame_equal(
+            actual[columns].sort_values("close_time").reset_index(drop=True),
+            expected[columns].sort_values("close_time").reset_index(drop=True),
+        )
+
+
+def test_indicator_per_symbol():
+    # Indicators over a wide field are computed per symbol column
+    engine = HourlyPortfolio(commission=0.001)
+    engine.add_data_streams({symbol: make_ohlcv(**kwargs) for symbol, kwargs in STREAMS.items()})
+    sma = engine.indicator("sma", "close", 10)
+    assert list(sma.columns) == engine.symbols
+    pd.testing.assert_series_equal(sma["AAA"], engine.data_stream["close"]["AAA"].rolling(10).mean(), check_names=False)
+    engine.add_field("sma", sma)
+    assert list(engine.data_stream["sma"].columns) == engine.symbols
+
+
+class WindowPortfolio(PortfolioBacktestEngine):
+    def strategy(self, bar):
+        window = self.states["params"]["window"]
+        if bar.position % window:
+            return
+        for k in np.flatnonzero(bar.available):
+            symbol = self.symbols[k]
+            if self.position_book.get_position_by_tag(symbol) is not None:
+                self.position_book.close_position(tag=symbol, close_price=bar.close[k], close_time=bar.Index)
+            else:
+                self.position_book.open_long_position(quantity=1.0, open_price=bar.close[k], tag=symbol, open_time=bar.Index, symbol=symbol)
+
+
+def test_portfolio_optimize_with_workers(tmp_path, monkeypatch):
+    # Wide data streams go through shared memory to the workers unchanged
+    monkeypatch.chdir(tmp_path)
+    engine = WindowPortfolio(commission=0.001)
+    engine.add_data_streams({symbol: make_ohlcv(**kwargs) for symbol, kwargs in STREAMS.items()})
+    engine.param_names = ["window"]
+    expected = {window: engine.evaluate_combination((window,))["total_profit"] for window in (5, 11)}
+    results = engine.optimize({"window": [5, 11]}, optimize_metrics=["total_profit"], max_workers=2)
+    best = max(expected, key=expected.get)
+    assert [(result["params"]["window"], result["total_profit"]) for result in results] == [(best, expected[best])]
+
+
+def test_plot_one_close_line_per_symbol():
+    # Each symbol gets its own close line, trades of every symbol share the long and short lines
+    engine = HourlyPortfolio(commission=0.001)
+    engine.add_data_streams({symbol: make_ohlcv(**kwargs) for symbol, kwargs in STREAMS.items()})
+    engine.run()
+    fig = engine.plot_trading_stats(max_points=100, show=False)
+    names = [trace.name for trace in fig.data if trace.type == "scattergl"]
+    assert names == ["AAA Close", "BBB Close", "CCC Close", "Trades (long)", "Trades (short)", "Cumulative PnL"]
+    assert all(len(trace.x) <= 100 for trace in fig.data[:3])
+    assert len(fig.data[3].x) == 3 * len(engine.get_trade_history())
+
+
+def test_single_stream_methods_are_unsupported():
+    # Methods working on one data stream fail with a TypeError naming the alternative
+    engine = HourlyPortfolio(commission=0.001)
+    engine.add_data_streams({symbol: make_ohlcv(**kwargs) for symbol, kwargs in STREAMS.items()})
+    calls = {
+        "add_data_stream": lambda: engine.add_data_stream(make_ohlcv(10)),
+        "add_data_source": lambda: engine.add_data_source(None),
+        "add_lower_timeframe": lambda: engine.add_lower_timeframe(None),
+        "run_vectorized": lambda: engine.run_vectorized(),
+        "run_incremental": lambda: engine.run_incremental(make_ohlcv(10)),
+        "sweep": lambda: engine.sweep({"window": [1, 2]}),
+    }
+    for name, call in calls.items():
+        with pytest.raises(TypeError, match=f"{name}\\(\\) is not supported by PortfolioBacktestEngine"):
+            call()
+    assert engine.symbols == list(STREAMS)
@@ -1,4 +1,5 @@
 from datetime import datetime
+import numpy as np
 import pytest
 from easy_backtest.position_book import PositionBook
 from easy_backtest.position import Position
@@ -95,3 +96,46 @@ def test_incur_tp_sl():
     trade2 = book.trade_history.trades[1]
     assert trade2.tag == "pos2"
     assert trade2.profit == pytest.approx(194.5)  # (150 - 110) * 5 * (1 - 0.01)
+
+
+def test_scheduled_exits():
+    # Exits are found at entry and only due positions are closed, TP/SL updates reschedule them
+    high = np.array([101.0, 102.0, 104.0, 112.0, 103.0, 101.0])
+    low = np.array([99.0, 98.0, 97.0, 100.0, 89.0, 95.0])
+    book = PositionBook(commission=0.0, portfolio_size=100)
+    book.schedule_exits(high, low)
+    book.incur_tp_sl(current_close=100.0, current_high=high[0], current_low=low[0], current_open=100.0, current_time=0, bar=0)
+    book.open_long_position(quantity=1, open_price=100.0, tag="tp", tp=110.0, sl=90.0)
+    book.open_long_position(quantity=1, open_price=100.0, tag="moved", tp=110.0, sl=90.0)
+    book.update_tp_sl("moved", tp=103.0, sl=90.0)
+
+    closed = []
+    for bar in range(1, len(high)):
+        book.incur_tp_sl(current_close=100.0, current_high=high[bar], current_low=low[bar], current_open=100.0, current_time=bar, bar=bar)
+        closed.append([(trade.tag, trade.close_price) for trade in book.trade_history.trades])
+    assert closed[1] == [("moved", 103.0)]
+    assert closed[2] == [("moved", 103.0), ("tp", 110.0)]
+    assert len(book.position_collection) == 0
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_scheduled_exits_follow_direct_assignment(columnar):
+    # Setting pos.tp / pos.sl directly reschedules the exit from the next bar, as update_tp_sl() does
+    high = np.array([101.0, 102.0, 104.0, 112.0, 103.0, 101.0])
+    low = np.array([99.0, 98.0, 97.0, 100.0, 89.0, 95.0])
+    book = PositionBook(commission=0.0, portfolio_size=100, columnar=columnar)
+    book.schedule_exits(high, low)
+    book.incur_tp_sl(current_close=100.0, current_high=high[0], current_low=low[0], current_open=100.0, current_time=0, bar=0)
+    book.open_long_position(quantity=1, open_price=100.0, tag="trailed", tp=110.0, sl=90.0)
+    book.open_long_position(quantity=1, open_price=100.0, tag="cleared", tp=110.0, sl=90.0)
+    # scheduled for bar 3 (TP), the stop is now hit on bar 1
+    book.get_position_by_tag("trailed").sl = 98.0
+    cleared = book.get_position_by_tag("cleared")
+    cleared.tp = None
+    cleared.sl = None
+
+    for bar in range(1, len(high)):
+        book.incur_tp_sl(current_close=100.0, current_high=high[bar], current_low=low[bar], current_open=100.0, current_time=bar, bar=bar)
+    assert [(trade.tag, trade.close_price, trade.close_time) for trade in book.trade_history.trades] == [("trailed", 98.0, 1)]
+    assert [pos.tag for pos in book.position_collection] == ["cleared"]
+
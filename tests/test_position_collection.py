@@ -82,3 +82,50 @@ def test_repr():
 
     repr_string = repr(collection)
     assert repr_string == f"PositionCollection(positions={collection.positions})"
+
+def test_duplicate_tag():
+    # Tags must be unique among open positions, a closed tag can be reused
+    collection = PositionCollection()
+    position1 = Position(quantity=10, open_price=100, commission=0.01, mode="long", tag="pos1")
+    position2 = Position(quantity=5, open_price=150, commission=0.02, mode="short", tag="pos1")
+
+    collection.add_position(position1)
+    with pytest.raises(ValueError, match="already exists"):
+        collection.add_position(position2)
+
+    collection.remove_position(position1)
+    collection.add_position(position2)
+    assert collection.find_by_tag("pos1") == position2
+
+def test_untagged_positions():
+    # Several untagged positions can be held, find_by_tag(None) returns the first one
+    collection = PositionCollection()
+    position1 = Position(quantity=10, open_price=100, commission=0.01, mode="long")
+    position2 = Position(quantity=5, open_price=150, commission=0.02, mode="short")
+
+    collection.add_position(position1)
+    collection.add_position(position2)
+    assert len(collection) == 2
+    assert collection.find_by_tag(None) == position1
+
+    collection.remove_position(position1)
+    assert collection.find_by_tag(None) == position2
+
+def test_remove_missing_position():
+    # Removing a position that is not in the collection raises, as list.remove does
+    collection = PositionCollection()
+    position = Position(quantity=10, open_price=100, commission=0.01, mode="long", tag="pos1")
+
+    with pytest.raises(ValueError):
+        collection.remove_position(position)
+
+def test_remove_keeps_order():
+    # Removing from the middle keeps the insertion order of the remaining positions
+    collection = PositionCollection()
+    positions = [Position(quantity=1, open_price=100, commission=0.01, mode="long", tag=f"pos{i}") for i in range(5)]
+    for position in positions:
+        collection.add_position(position)
+
+    collection.remove_position(positions[2])
+    assert list(collection) == [positions[0], positions[1], positions[3], positions[4]]
+    assert collection.find_by_tag("pos2") is None
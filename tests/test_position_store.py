@@ -0,0 +1,113 @@
+from datetime import datetime
+import numpy as np
+import pytest
+from easy_backtest.position import Position
+from easy_backtest.position_book import PositionBook
+from easy_backtest.position_store import PositionStore, PositionView
+
+
+def test_add_position_returns_view():
+    # Adding a position copies it into the columns and hands back a view
+    store = PositionStore()
+    view = store.add_position(Position(quantity=10, open_price=100, commission=0.01, mode="long", tag="pos1", tp=110, sl=90))
+
+    assert isinstance(view, PositionView)
+    assert len(store) == 1
+    assert store.find_by_tag("pos1") is view
+    assert (view.quantity, view.open_price, view.mode, view.tp, view.sl) == (10, 100, "long", 110, 90)
+    assert store.quantity[0] == 10
+
+
+def test_view_writes_through():
+    # Partially closing through the view updates the store's columns
+    store = PositionStore()
+    view = store.add_position(Position(quantity=10, open_price=100, commission=0.01, mode="short", tag="pos1"))
+    result = view.close_position(close_price=90, close_amt=0.5)
+    assert result["remaining"] == 5
+    assert store.quantity[0] == 5
+    assert view.tp is None
+
+
+def test_remove_and_duplicate_tags():
+    # Removed positions keep their values, tags must be unique among open positions
+    store = PositionStore()
+    view = store.add_position(Position(quantity=10, open_price=100, commission=0.01, mode="long", tag="pos1"))
+    with pytest.raises(ValueError):
+        store.add_position(Position(quantity=1, open_price=100, commission=0.01, mode="long", tag="pos1"))
+
+    store.remove_position(view)
+    assert len(store) == 0
+    assert store.find_by_tag("pos1") is None
+    assert view.quantity == 10
+    with pytest.raises(ValueError):
+        store.remove_position(view)
+
+
+def test_growth_and_compaction_keep_order():
+    # Slots are reused and grown while iteration keeps insertion order
+    store = PositionStore(capacity=4)
+    for i in range(10):
+        store.add_position(Position(quantity=i + 1, open_price=100, commission=0, mode="long", tag=i))
+    for i in range(0, 10, 2):
+        store.remove_position(store.find_by_tag(i))
+    for i in range(10, 14):
+        store.add_position(Position(quantity=i + 1, open_price=100, commission=0, mode="long", tag=i))
+
+    assert [pos.tag for pos in store] == [1, 3, 5, 7, 9, 10, 11, 12, 13]
+    assert [pos.quantity for pos in store] == [2, 4, 6, 8, 10, 11, 12, 13, 14]
+    assert store[-1].tag == 13
+
+
+def test_vectorized_mark_to_market():
+    # Vectorized PnL, exposure and margin agree with Position.get_pnl
+    positions = [
+        Position(quantity=10, open_price=100, commission=0.01, mode="long", tag="pos1"),
+        Position(quantity=5, open_price=150, commission=0.01, mode="short", tag="pos2"),
+    ]
+    store = PositionStore()
+    for pos in positions:
+        store.add_position(pos)
+
+    views, profits, pcts = store.get_pnls(current_price=110)
+    for pos, view, profit, pct in zip(positions, views, profits, pcts):
+        assert view.tag == pos.tag
+        assert profit == pytest.approx(pos.get_pnl(110)["profit"])
+        assert pct == pytest.approx(pos.get_pnl(110)["pct"])
+    assert store.unrealized_pnl(110) == pytest.approx(sum(pos.get_pnl(110)["profit"] for pos in positions))
+    assert store.exposure(110) == {"gross": pytest.approx(1650), "net": pytest.approx(550)}
+    assert store.margin(leverage=2) == pytest.approx((1000 + 750) / 2)
+
+
+def test_columnar_book_matches_list_book():
+    # A columnar position book closes the same positions at the same prices as the default one
+    books = [PositionBook(commission=0.0006, portfolio_size=100), PositionBook(commission=0.0006, portfolio_size=100, columnar=True)]
+    for book in books:
+        book.open_long_position(quantity=10, open_price=100.0, tag="pos1", tp=110.0, sl=90.0)
+        book.open_short_position(quantity=5, open_price=150.0, tag="pos2", tp=110.0, sl=160.0)
+        book.open_long_position(quantity=1, open_price=100.0, tag="pos3", tp=120.0, sl=95.0)
+        book.incur_tp_sl(current_close=110.0, current_high=110.0, current_low=96.0, current_open=100.0, current_time=datetime.now())
+
+    expected, result = (book.trade_history.to_dataframe() for book in books)
+    assert list(result["tag"]) == list(expected["tag"]) == ["pos1", "pos2"]
+    assert list(result["profit"]) == pytest.approx(list(expected["profit"]))
+    assert books[1].get_all_pnls(105.0)["pos3"] == pytest.approx(books[0].get_all_pnls(105.0)["pos3"])
+    assert books[1].get_unrealized_pnl(100.0) == pytest.approx(books[0].get_unrealized_pnl(100.0))
+    assert books[1].get_exposure(100.0) == pytest.approx(books[0].get_exposure(100.0))
+    assert books[1].get_margin() == pytest.approx(books[0].get_margin())
+
+
+def test_symbol_prices():
+    # With symbols, each position is checked and valued against its own symbol's price
+    book = PositionBook(commission=0, portfolio_size=100, columnar=True, symbols=["a", "b"])
+    book.open_long_position(quantity=1, open_price=100.0, tag="a1", tp=110.0, symbol="a")
+    book.open_long_position(quantity=1, open_price=50.0, tag="b1", tp=55.0, symbol="b")
+    with pytest.raises(ValueError):
+        book.open_long_position(quantity=1, open_price=10.0, tag="c1", symbol="c")
+    assert book.get_unrealized_pnl(np.array([105.0, 52.0])) == pytest.approx(7.0)
+    assert [pos.tag for pos in book.get_positions_by_symbol("b")] == ["b1"]
+
+    # b has no bar here
+    book.incur_tp_sl(current_close=np.array([111.0, np.nan]), current_high=np.array([112.0, np.nan]), current_low=np.array([104.0, np.nan]), current_open=np.array([105.0, np.nan]), current_time=datetime.now())
+    trades = book.trade_history.to_dataframe()
+    assert list(trades["tag"]) == ["a1"] and list(trades["symbol"]) == ["a"]
+    assert book.get_position_by_tag("b1") is not None
@@ -0,0 +1,74 @@
+import json
+from easy_backtest.backtest_engine import BacktestEngine
+from easy_backtest.profiler import PhaseProfiler
+from conftest import make_ohlcv
+
+
+class WindowStrategy(BacktestEngine):
+    def preprocess_data(self):
+        df = self.data_stream
+        df["ma"] = df["close"].rolling(window=20).mean()
+        return df
+
+    def strategy(self, row):
+        window = self.states.get("params", {}).get("window", 4)
+        if row.Index.hour % window:
+            return
+        if self.position_book.get_position_by_tag("w") is not None:
+            self.position_book.close_position(tag="w", close_price=row.close, close_time=row.Index)
+        else:
+            self.position_book.open_long_position(quantity=1.0, open_price=row.close, tag="w", sl=row.close * 0.99, open_time=row.Index)
+
+
+def test_profile_report():
+    # Every phase is timed once per bar, counts match the trades, and the report is plain JSON
+    engine = WindowStrategy(commission=0.001)
+    engine.add_data_stream(make_ohlcv(1500))
+    engine.enable_profiling(sample_every=10)
+    engine.run(row_cursor=True)
+    stats = engine.get_trading_stats()
+    report = engine.get_profile()
+
+    assert report["bars"] == 1500
+    assert report["bars_per_sec"] > 0
+    assert {name: phase["calls"] for name, phase in report["phases"].items()} == {
+        "preprocess_data": 1, "before_step": 1500, "strategy": 1500, "after_step": 1500, "get_stats": 1}
+    assert report["positions_closed"] == stats["total_trades"]
+    assert report["positions_opened"] - report["positions_closed"] == len(engine.position_book.position_collection)
+    strategy = report["phases"]["strategy"]
+    assert 0 < strategy["p50_us"] <= strategy["max_us"]
+    assert strategy["total_s"] <= report["loop_s"]
+    assert json.loads(json.dumps(report)) == report
+
+
+def test_profiling_disabled_calls_methods_directly():
+    # Without profiling the loop calls the engine's own bound methods
+    engine = WindowStrategy(commission=0.001)
+    assert engine._step_functions() == (engine.before_step, engine.strategy, engine.after_step)
+    engine.enable_profiling()
+    assert engine._step_functions()[1] != engine.strategy
+    engine.disable_profiling()
+    assert engine.profiler is None
+
+
+def test_profile_attached_to_optimizer_results(tmp_path, monkeypatch):
+    # Each combination is profiled on its own, in the workers too
+    monkeypatch.chdir(tmp_path)
+    engine = WindowStrategy(commission=0.001)
+    engine.add_data_stream(make_ohlcv(1500))
+    engine.enable_profiling()
+    results = engine.optimize({"window": [2, 3, 6]}, optimize_metrics=["total_profit", "sharpe_ratio"], max_workers=2)
+    assert results
+    for result in results:
+        assert result["profile"]["bars"] == 1500
+        assert result["profile"]["positions_closed"] == result["total_trades"]
+
+
+def test_profiler_samples():
+    # One call in sample_every is kept for percentiles, all of them count towards the totals
+    profiler = PhaseProfiler(sample_every=4)
+    square = profiler.wrap("square", lambda x: x * x)
+    assert [square(x) for x in range(10)] == [x * x for x in range(10)]
+    phase = profiler.phases["square"]
+    assert phase.calls == 10 and len(phase.samples) == 2
+    assert profiler.report()["phases"]["square"]["calls"] == 10
@@ -0,0 +1,32 @@
+import numpy as np
+from easy_backtest.range_extrema import RangeExtrema
+
+
+def first_crossing(values, start, stop, hits):
+    found = np.flatnonzero(hits(values[start:stop]))
+    return start + int(found[0]) if len(found) else stop
+
+
+def test_first_crossing_matches_scan():
+    # Searches across block and level boundaries should find the same bar as a linear scan
+    rng = np.random.default_rng(0)
+    for n in (1, 64, 65, 4097, 20000):
+        values = np.cumsum(rng.normal(size=n))
+        index = RangeExtrema(values)
+        for _ in range(200):
+            start = int(rng.integers(0, n))
+            stop = int(rng.integers(start, n + 1))
+            threshold = values[start] + rng.normal() * 10
+            assert index.first_at_least(start, threshold, stop) == first_crossing(values, start, stop, lambda v: v >= threshold)
+            assert index.first_at_most(start, threshold) == first_crossing(values, start, n, lambda v: v <= threshold)
+
+
+def test_missing_values_and_thresholds():
+    # NaNs never cross, a missing threshold never triggers
+    values = np.full(1000, np.nan)
+    values[700] = 5.0
+    index = RangeExtrema(values)
+    assert index.first_at_least(0, 4.0) == 700
+    assert index.first_at_most(0, 4.0) == 1000
+    assert index.first_at_least(0, None, 500) == 500
+    assert index.first_at_most(0, np.nan) == 1000
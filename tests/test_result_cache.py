@@ -0,0 +1,115 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from easy_backtest.backtest_engine import BacktestEngine
+from easy_backtest.data_source import NumpyMemmapSource
+from easy_backtest.result_cache import ResultCache
+from easy_backtest.trade_history import TradeHistory
+
+
+class Flip(BacktestEngine):
+    def preprocess_data(self):
+        self.data_stream["ma"] = self.data_stream["close"].rolling(self.states["params"]["window"]).mean()
+        return self.data_stream
+
+    def strategy(self, row):
+        pos = self.position_book.get_position_by_tag("flip")
+        if pos is not None:
+            self.position_book.close_position(tag="flip", close_price=row.close, close_time=row.Index)
+        elif row.close > row.ma:
+            self.position_book.open_long_position(quantity=1.0, open_price=row.close, tag="flip", open_time=row.Index)
+
+
+def make_engine(cache, n=200, commission=0.001):
+    engine = Flip(commission=commission, result_cache=cache)
+    close = 100 + np.sin(np.arange(n) / 5) * 10
+    engine.add_data_stream(pd.DataFrame({
+        "open": close, "high": close + 1, "low": close - 1, "close": close, "volume": 1.0,
+    }, index=pd.date_range("2024-01-01", periods=n, freq="h")))
+    engine.param_names = ["window"]
+    return engine
+
+
+def test_hit_skips_the_backtest(tmp_path, monkeypatch):
+    # Test that a second evaluation of the same inputs is served from disk
+    cache = ResultCache(str(tmp_path), store_trades=True)
+    first = make_engine(cache)
+    expected = first.evaluate_combination((10,))
+    expected_trades = first.get_trade_history().to_dataframe()
+    assert cache.misses == 1
+
+    second = make_engine(ResultCache(str(tmp_path), store_trades=True))
+    monkeypatch.setattr(Flip, "run", lambda *args, **kwargs: pytest.fail("should be cached"))
+    assert second.evaluate_combination((10,)) == expected
+    assert second.result_cache.hits == 1
+    pd.testing.assert_frame_equal(second.get_trade_history().to_dataframe(), expected_trades)
+
+
+def test_key_depends_on_every_input(tmp_path):
+    # Test that parameters, states, commission, data, lower timeframe, exit scheduling, version and span change the key
+    cache = ResultCache(str(tmp_path))
+    engine = make_engine(cache)
+    key = cache.key(engine, {"window": 10})
+    assert cache.key(make_engine(cache), {"window": 10}) == key
+    assert cache.key(engine, {"window": 11}) != key
+    assert cache.key(engine, {"window": 10}, stop=100) != key
+    assert cache.key(make_engine(cache, commission=0.002), {"window": 10}) != key
+    assert cache.key(make_engine(cache, n=201), {"window": 10}) != key
+    drilled = make_engine(cache)
+    drilled.add_lower_timeframe(NumpyMemmapSource.write(drilled.data_stream, str(tmp_path / "fine")), "4h")
+    assert cache.key(drilled, {"window": 10}) != key
+    sized = make_engine(cache)
+    sized.states["qty"] = 1.0
+    assert cache.key(sized, {"window": 10}) != key
+    resized = make_engine(cache)
+    resized.states["qty"] = 5.0
+    assert cache.key(resized, {"window": 10}) != cache.key(sized, {"window": 10})
+    source = NumpyMemmapSource.write(engine.data_stream, str(tmp_path / "bars"))
+    chunked = [Flip(commission=0.001) for _ in range(3)]
+    for chunked_engine, (chunk_size, warmup_bars) in zip(chunked, [(50, 0), (100, 0), (50, 20)]):
+        chunked_engine.add_data_source(source, chunk_size=chunk_size, warmup_bars=warmup_bars)
+    assert len({cache.key(chunked_engine, {"window": 10}) for chunked_engine in chunked}) == 3
+    scheduled = make_engine(cache)
+    scheduled._scheduled_exits = True
+    assert cache.key(scheduled, {"window": 10}) != key
+    # columns added by preprocess_data don't count
+    engine.evaluate_combination((10,))
+    assert cache.key(engine, {"window": 10}) == key
+
+    class Flip2(Flip):
+        strategy_version = 2
+    versioned = Flip2(commission=0.001)
+    versioned.add_data_stream(engine.data_stream[["open", "high", "low", "close", "volume"]])
+    assert cache.key(versioned, {"window": 10}) != key
+
+
+def test_eviction_and_invalidation(tmp_path):
+    # Test that the cache stays within its budget and can be cleared per strategy
+    cache = ResultCache(str(tmp_path), max_bytes=10 ** 9)
+    engine = make_engine(cache)
+    for window in range(2, 8):
+        engine.evaluate_combination((window,))
+    sizes = [entry.stat().st_size for entry in os.scandir(tmp_path)]
+    assert len(sizes) == 6
+
+    cache.max_bytes = sum(sizes) // 2
+    engine.evaluate_combination((8,))
+    assert sum(entry.stat().st_size for entry in os.scandir(tmp_path)) <= cache.max_bytes
+
+    remaining = len(os.listdir(tmp_path))
+    assert cache.invalidate("other.Strategy") == 0
+    assert cache.invalidate(Flip, keep_version=1) == remaining
+    assert os.listdir(tmp_path) == []
+
+
+def test_trade_history_arrays_round_trip():
+    # Test that a history rebuilt from its arrays matches the original
+    history = TradeHistory(initial_portfolio=100)
+    history.record_trade("a", "long", 1.0, 10.0, 11.0, 1.0, 0.1, pd.Timestamp("2024-01-01", tz="UTC"), pd.Timestamp("2024-01-02", tz="UTC"))
+    history.record_trade(None, "short", 2.0, 11.0, 12.0, -2.0, -0.09, pd.Timestamp("2024-01-03", tz="UTC"), pd.Timestamp("2024-01-04", tz="UTC"))
+    rebuilt = TradeHistory.from_arrays(history.to_arrays())
+    pd.testing.assert_frame_equal(rebuilt.to_dataframe(), history.to_dataframe())
+    assert rebuilt.get_stats(100) == history.get_stats(100)
+    rebuilt.record_trade("a", "long", 1.0, 12.0, 13.0, 1.0, 0.08)
+    assert len(rebuilt) == 3 and len(history) == 2
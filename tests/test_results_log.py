@@ -0,0 +1,39 @@
+import pandas as pd
+from easy_backtest.results_log import ResultsLog, params_key
+
+
+def make_result(window, profit):
+    return {"params": {"window": window}, "total_profit": profit, "average_holding_period": pd.Timedelta(hours=window)}
+
+
+def test_append_and_read(tmp_path):
+    # Test that results round trip through the log, timedeltas included
+    log = ResultsLog(str(tmp_path / "results.jsonl"))
+    assert log.read() == [] and len(log) == 0
+    for window in [5, 10, 20]:
+        log.append(make_result(window, window / 10))
+    assert log.read() == [make_result(window, window / 10) for window in [5, 10, 20]]
+    assert log.read(rows=[2, 0]) == [make_result(5, 0.5), make_result(20, 2.0)]
+    assert log.completed() == {params_key({"window": window}) for window in [5, 10, 20]}
+
+
+def test_truncated_line_is_dropped(tmp_path):
+    # Test that a line cut short by a crash is removed when the log is reopened
+    path = tmp_path / "results.jsonl"
+    ResultsLog(str(path)).append(make_result(5, 0.5))
+    with open(path, "a") as log_file:
+        log_file.write('{"params": {"window": 1')
+    log = ResultsLog(str(path))
+    log.append(make_result(10, 1.0))
+    assert [result["params"]["window"] for result in log.read()] == [5, 10]
+
+
+def test_to_dataframe(tmp_path):
+    # Test the columnar view of the log
+    log = ResultsLog(str(tmp_path / "results.jsonl"))
+    log.append(make_result(5, 0.5))
+    log.append(make_result(10, 1.0))
+    df = log.to_dataframe()
+    assert list(df["params.window"]) == [5, 10]
+    assert list(df["total_profit"]) == [0.5, 1.0]
+    assert df["average_holding_period"].iloc[1] == pd.Timedelta(hours=10)
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+from easy_backtest.row_cursor import RowCursor
+
+
+def make_frame():
+    return pd.DataFrame({
+        "open": [1.0, 2.0, 3.0],
+        "close": [1.5, 2.5, 3.5],
+        "volume": [10, 20, 30],
+        "label": ["a", "b", "c"],
+        "has space": [True, False, True],
+    }, index=pd.date_range("2024-01-01", periods=3, freq="h", tz="UTC"))
+
+
+def test_cursor_matches_itertuples():
+    # Every attribute read through the cursor should equal the itertuples() value
+    df = make_frame()
+    cursor = RowCursor.for_frame(df)
+    assert len(cursor) == 3
+    for row, expected in zip(cursor, df.itertuples()):
+        assert row._asdict() == expected._asdict()
+        assert row.Index == expected.Index
+        assert type(row.close) is float
+
+
+def test_cursor_is_reused():
+    # Iterating the cursor yields the same object positioned on each row
+    cursor = RowCursor.for_frame(make_frame())
+    rows = [row for row in cursor]
+    assert all(row is cursor for row in rows)
+    assert cursor.seek(1).close == 2.5
+    assert cursor.Index == pd.Timestamp("2024-01-01 01:00", tz="UTC")
+
+
+def test_cursor_renames_like_itertuples():
+    # Columns that are not valid identifiers are renamed positionally, as with itertuples()
+    cursor = RowCursor.for_frame(make_frame()).seek(0)
+    assert cursor._fields == next(make_frame().itertuples())._fields
+    assert cursor._5 is True
+    with pytest.raises(AttributeError):
+        cursor.missing
+
+
+def test_cursor_arrays_are_contiguous():
+    # Column storage is extracted once into contiguous numpy arrays
+    cursor = RowCursor.for_frame(make_frame())
+    assert cursor.arrays["close"].flags["C_CONTIGUOUS"]
+    assert cursor.arrays["close"].dtype == np.float64
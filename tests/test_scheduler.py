@@ -0,0 +1,62 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+from easy_backtest.scheduler import ChunkedScheduler
+
+
+def square(x):
+    return x * x
+
+
+def test_run_returns_every_result_with_its_index():
+    # Test that every item is evaluated once and indexes match the input order
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        scheduler = ChunkedScheduler(executor, max_workers=3)
+        results = dict(scheduler.run(square, iter(range(1000)), total=1000))
+    assert results == {i: i * i for i in range(1000)}
+
+
+def test_run_bounds_chunks_in_flight():
+    # Test that no more than max_in_flight chunks are submitted at once
+    class CountingExecutor(ThreadPoolExecutor):
+        in_flight = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def submit(self, fn, *args):
+            with self.lock:
+                self.in_flight += 1
+                self.peak = max(self.peak, self.in_flight)
+            future = super().submit(fn, *args)
+            future.add_done_callback(self._done)
+            return future
+
+        def _done(self, future):
+            with self.lock:
+                self.in_flight -= 1
+
+    def slow(x):
+        time.sleep(0.001)
+        return x
+
+    with CountingExecutor(max_workers=2) as executor:
+        scheduler = ChunkedScheduler(executor, max_workers=2, in_flight_per_worker=2)
+        results = list(scheduler.run(slow, range(200)))
+    assert len(results) == 200
+    assert executor.peak <= scheduler.max_in_flight == 4
+
+
+def test_chunk_size_adapts_to_runtime():
+    # Test that cheap items get large chunks and slow items small ones
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        fast = ChunkedScheduler(executor, max_workers=2, target_seconds=0.05, max_chunk_size=256)
+        list(fast.run(square, range(2000)))
+        assert fast.chunk_size == 256
+
+        def slow(x):
+            time.sleep(0.02)
+            return x
+
+        slow_scheduler = ChunkedScheduler(executor, max_workers=2, target_seconds=0.05)
+        list(slow_scheduler.run(slow, range(20)))
+        assert 1 <= slow_scheduler.chunk_size <= 3
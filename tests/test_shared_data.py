@@ -0,0 +1,63 @@
+import pickle
+import numpy as np
+import pandas as pd
+import pytest
+from easy_backtest.shared_data import SharedFrame
+
+
+def make_frame(n=100, tz=None):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        "close": rng.normal(100, 1, n),
+        "volume": rng.integers(0, 1000, n).astype(np.int32),
+        "flag": rng.random(n) > 0.5,
+        "symbol": pd.Categorical(rng.choice(["a", "b"], n)),
+        "note": ["x"] * n,
+    }, index=pd.date_range("2024-01-01", periods=n, freq="min", tz=tz, name="time"))
+
+
+@pytest.mark.parametrize("tz", [None, "Asia/Singapore"])
+def test_attach_round_trip(tz):
+    # Test that an attached frame equals the published one, dtypes and index included
+    df = make_frame(tz=tz)
+    shared = SharedFrame(df)
+    try:
+        attached, handle = SharedFrame.attach(pickle.loads(pickle.dumps(shared.spec)))
+        pd.testing.assert_frame_equal(attached, df)
+        del attached
+        handle.close()
+    finally:
+        shared.close()
+
+
+def test_attached_columns_are_shared_and_read_only():
+    # Test that numeric columns are views on the shared memory segment
+    df = make_frame()
+    shared = SharedFrame(df)
+    try:
+        attached, handle = SharedFrame.attach(shared.spec)
+        close = attached["close"].to_numpy()
+        assert not close.flags.writeable
+        assert not close.flags.owndata
+        with pytest.raises(ValueError):
+            close[0] = 0
+        # new columns can still be added, e.g. by preprocess_data
+        attached["ma"] = attached["close"].rolling(5).mean()
+        assert "ma" in attached
+        del attached, close
+        handle.close()
+    finally:
+        shared.close()
+
+
+def test_attach_without_datetime_index():
+    # Test that other indexes travel with the spec
+    df = pd.DataFrame({"close": [1.0, 2.0, 3.0]}, index=[10, 20, 30])
+    shared = SharedFrame(df)
+    try:
+        attached, handle = SharedFrame.attach(shared.spec)
+        pd.testing.assert_frame_equal(attached, df)
+        del attached
+        handle.close()
+    finally:
+        shared.close()
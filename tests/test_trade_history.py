@@ -95,3 +95,38 @@ def test_trade_history_to_dataframe_empty():
     assert isinstance(df, pd.DataFrame)
     assert list(df.columns) == ["tag", "mode", "quantity", "open_price", "close_price", "profit", "pct", "open_time", "close_time"]
     assert df.empty
+
+def test_trade_history_grows_and_caches_dataframe():
+    # Trades are appended past the initial capacity and the DataFrame is rebuilt only after an append
+    trade_history = TradeHistory(capacity=2)
+    open_time = pd.Timestamp("2024-01-01", tz="UTC")
+    for i in range(5):
+        trade_history.record_trade(
+            tag=f"trade{i}", mode="long", quantity=1, open_price=100.0, close_price=101.0, profit=1.0, pct=0.01,
+            open_time=open_time, close_time=open_time + pd.Timedelta(hours=i)
+        )
+
+    df = trade_history.to_dataframe()
+    assert len(df) == 5
+    assert trade_history.to_dataframe() is df
+    assert list(df["tag"]) == [f"trade{i}" for i in range(5)]
+    assert df["close_time"].iloc[-1] == open_time + pd.Timedelta(hours=4)
+    assert str(df["close_time"].dt.tz) == "UTC"
+
+    trade_history.record_trade(tag="trade5", mode="short", quantity=1, open_price=100.0, close_price=99.0, profit=1.0, pct=0.01)
+    assert trade_history.to_dataframe() is not df
+    assert len(trade_history.to_dataframe()) == 6
+    assert pd.isna(trade_history.to_dataframe()["close_time"].iloc[-1])
+
+def test_trade_history_trades_view():
+    # trades gives Trade objects decoded from the columns
+    trade_history = TradeHistory()
+    trade_history.record_trade(tag=None, mode="long", quantity=2, open_price=100.0, close_price=110.0, profit=20.0, pct=0.2, open_time=1, close_time=5)
+
+    assert len(trade_history.trades) == 1
+    trade = trade_history.trades[-1]
+    assert trade.tag is None
+    assert trade.quantity == 2
+    assert (trade.open_time, trade.close_time) == (1, 5)
+    with pytest.raises(IndexError):
+        trade_history.trades[1]
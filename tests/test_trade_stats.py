@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+from easy_backtest.trade_history import TradeHistory
+from easy_backtest.trade_stats import TradeStats
+
+
+def fill(history, profits, tz=None):
+    open_time = pd.Timestamp("2024-01-01", tz=tz)
+    for i, profit in enumerate(profits):
+        history.record_trade(
+            tag=f"trade{i}", mode="long", quantity=1.0, open_price=100.0, close_price=100.0 + profit,
+            profit=profit, pct=profit / 100, open_time=open_time + pd.Timedelta(hours=2 * i),
+            close_time=open_time + pd.Timedelta(hours=2 * i + 1 + i % 3),
+        )
+
+
+def assert_same_stats(streaming, recomputed):
+    assert streaming.keys() == recomputed.keys()
+    for key, value in recomputed.items():
+        assert type(streaming[key]) is type(value), key
+        assert streaming[key] == pytest.approx(value, rel=1e-9, abs=1e-12), key
+
+
+@pytest.mark.parametrize("profits", [
+    np.random.default_rng(0).normal(0, 5, 500),
+    [1.0, 2.0, 3.0],
+    [-1.0, 0.0, -2.0, 5.0, 0.0],
+    [4.0],
+])
+def test_streaming_stats_match_dataframe_stats(profits):
+    # The O(1) streaming stats equal the stats computed from the trade DataFrame
+    history = TradeHistory(initial_portfolio=1000)
+    fill(history, list(profits), tz="UTC")
+
+    streaming = history.get_stats(initial_portfolio=1000)
+    reference = TradeHistory()
+    fill(reference, list(profits), tz="UTC")
+    assert_same_stats(streaming, reference.get_stats(initial_portfolio=1000))
+
+
+def test_other_portfolio_size_is_recomputed():
+    # Asking for a portfolio size other than the accumulated one falls back to the full computation
+    history = TradeHistory(initial_portfolio=1000)
+    fill(history, [10.0, -5.0, 20.0])
+    reference = TradeHistory()
+    fill(reference, [10.0, -5.0, 20.0])
+    assert_same_stats(history.get_stats(initial_portfolio=50), reference.get_stats(initial_portfolio=50))
+
+
+def test_stats_update_incrementally():
+    # Stats can be read in the middle of a run
+    stats = TradeStats(initial_portfolio=100)
+    stats.update(profit=10.0, pct=0.1)
+    stats.update(profit=-20.0, pct=-0.2)
+    result = stats.get_stats()
+    assert result["total_trades"] == 2
+    assert result["max_consecutive_wins"] == 1
+    assert result["max_drawdown_percent"] == pytest.approx(-20 / 110 * 100)
+    stats.update(profit=-1.0, pct=-0.01)
+    assert stats.get_stats()["max_consecutive_losses"] == 2
+
+
+def test_average_holding_period_is_exact():
+    # Long holding periods in nanoseconds are averaged without going through a float
+    open_time = np.array([0, 0, 0], dtype=np.int64)
+    close_time = np.array([10**17 + 1, 10**17 + 2, 10**17 + 2], dtype=np.int64)
+    expected = pd.Timedelta((3 * 10**17 + 5) // 3)
+    stats = TradeStats(initial_portfolio=100)
+    for open_ns, close_ns in zip(open_time, close_time):
+        stats.update(profit=1.0, pct=0.01, open_time=open_ns, close_time=close_ns)
+    assert stats.get_stats()["average_holding_period"] == expected
+    batch = TradeStats.from_trades(100, np.ones(3), np.full(3, 0.01), open_time, close_time)
+    assert batch.holding_sum == stats.holding_sum
+    assert batch.get_stats()["average_holding_period"] == expected